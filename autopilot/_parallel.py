@@ -0,0 +1,342 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Run a test suite in several worker processes at once.
+
+Each worker is a separate 'autopilot run' process with its own Xvfb display
+and its own DBus session bus, so the applications launched by one worker's
+tests can't be seen or driven by another worker's tests. Workers report their
+results as a subunit stream, which is merged into the result for the whole
+run.
+
+"""
+
+from collections import OrderedDict
+from contextlib import ExitStack
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from testtools import (
+    PlaceHolder,
+    StreamResult,
+    StreamSummary,
+    StreamTagger,
+    StreamToExtendedDecorator,
+    TestResultDecorator,
+    ThreadsafeForwardingResult,
+    iterate_tests,
+    try_import,
+)
+from testtools.content import text_content
+
+logger = logging.getLogger(__name__)
+
+_SCREEN = '1024x768x24'
+_WORKER_OUTPUT_NAME = 'stdout'
+
+
+def partition_tests(tests, count):
+    """Split *tests* into at most *count* lists of test ids.
+
+    Tests from the same class are kept together, so class and module level
+    fixtures (including shared applications) are set up once per worker
+    rather than once per test. The lists are balanced by the number of tests
+    in each, counting every scenario of a test.
+
+    """
+    groups = OrderedDict()
+    for test in tests:
+        groups.setdefault(_get_test_class_id(test), []).append(test)
+
+    shard_count = min(count, len(groups))
+    sizes = [0] * shard_count
+    group_shards = {}
+    # Placing the largest groups first keeps the shards even:
+    for key in sorted(groups, key=lambda k: _count_tests(groups[k]),
+                      reverse=True):
+        smallest = sizes.index(min(sizes))
+        group_shards[key] = smallest
+        sizes[smallest] += _count_tests(groups[key])
+
+    # Each worker runs its tests in the order they were loaded:
+    shards = [[] for i in range(shard_count)]
+    for key, group in groups.items():
+        shards[group_shards[key]].extend(test.id() for test in group)
+    return shards
+
+
+def _get_test_class_id(test):
+    return "%s.%s" % (type(test).__module__, type(test).__name__)
+
+
+def _count_tests(tests):
+    count = 0
+    for test in tests:
+        scenarios = getattr(test, 'scenarios', None)
+        count += len(scenarios) if type(scenarios) is list else 1
+    return count
+
+
+def run_test_suite(test_suite, result, args):
+    """Run *test_suite* in *args.parallel* worker processes, sending the
+    results to *result*.
+
+    :raises RuntimeError: if subunit, Xvfb or dbus-run-session isn't
+        installed, or a worker's display can't be started.
+
+    """
+    if not try_import('subunit'):
+        raise RuntimeError(
+            "Running tests in parallel requires python3-subunit to be "
+            "installed."
+        )
+    _raise_if_missing_executable(
+        'Xvfb', "Running tests in parallel requires Xvfb to be installed.")
+    _raise_if_missing_executable(
+        'dbus-run-session',
+        "Running tests in parallel requires dbus-run-session to be installed."
+    )
+    shards = partition_tests(iterate_tests(test_suite), args.parallel)
+    semaphore = threading.Semaphore(1)
+    with ExitStack() as stack:
+        directory = stack.enter_context(
+            tempfile.TemporaryDirectory(prefix='autopilot-parallel-')
+        )
+        workers = []
+        for index, test_ids in enumerate(shards):
+            load_list = os.path.join(directory, 'worker-%d.list' % index)
+            with open(load_list, 'w') as f:
+                f.write('\n'.join(test_ids) + '\n')
+            display = _start_virtual_display(stack)
+            process = subprocess.Popen(
+                _get_worker_command(args, index, load_list),
+                env=dict(os.environ, DISPLAY=display),
+                stdout=subprocess.PIPE,
+            )
+            stack.callback(_kill_worker, process)
+            logger.info(
+                "Started worker %d on display %s with %d tests.",
+                index,
+                display,
+                len(test_ids)
+            )
+            workers.append(_Worker(index, process, result, semaphore))
+
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    for worker in workers:
+        worker.report_unexpected_exit(result)
+    return result
+
+
+def _raise_if_missing_executable(name, message):
+    if shutil.which(name) is None:
+        raise RuntimeError(message)
+
+
+def _start_virtual_display(stack):
+    """Start an Xvfb server on an unused display, and return the display
+    name.
+
+    The server is killed when *stack* is closed.
+
+    """
+    read_fd, write_fd = os.pipe()
+    try:
+        # Xvfb writes the display number it picked to write_fd once it's
+        # ready for clients:
+        process = subprocess.Popen(
+            [
+                'Xvfb',
+                '-displayfd', str(write_fd),
+                '-screen', '0', _SCREEN,
+                '-nolisten', 'tcp',
+            ],
+            pass_fds=(write_fd,),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    finally:
+        os.close(write_fd)
+    stack.callback(_kill_worker, process)
+    with os.fdopen(read_fd) as f:
+        display_number = f.readline().strip()
+    if not display_number:
+        raise RuntimeError("Could not start Xvfb for a test worker.")
+    return ':' + display_number
+
+
+def _kill_worker(process):
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+
+
+def _get_worker_command(args, index, load_list):
+    """Return the command that runs worker *index*."""
+    command = [
+        'dbus-run-session', '--',
+        sys.executable, '-m', 'autopilot.run', 'run',
+        '--format', 'subunit',
+        '--load-list', load_list,
+        '--debug-profile', args.debug_profile,
+        '--timeout-profile', args.timeout_profile,
+        '--test-timeout', str(args.test_timeout),
+    ]
+    if args.failfast:
+        command.append('--failfast')
+    if args.random_order:
+        command.append('--random-order')
+    if args.verbose:
+        command.append('-' + 'v' * args.verbose)
+    if args.record:
+        command.append('--record')
+    if args.record_directory:
+        command.extend(['--record-directory', args.record_directory])
+    if args.record_options:
+        command.extend(['--record-options', args.record_options])
+    if args.test_config:
+        command.extend(['--config', args.test_config])
+    if args.record_introspection:
+        command.extend([
+            '--record-introspection',
+            _get_worker_recording_path(args.record_introspection, index)
+        ])
+    return command + list(args.suite)
+
+
+def _get_worker_recording_path(path, index):
+    """Return the file worker *index* records introspection traffic to, when
+    the run as a whole records to *path*.
+
+    """
+    if path.endswith('.gz'):
+        return "%s-worker%d.gz" % (path[:-len('.gz')], index)
+    return "%s-worker%d" % (path, index)
+
+
+class _Worker(threading.Thread):
+
+    """Reads the results of one worker process, and forwards them to the
+    result for the whole run.
+
+    """
+
+    def __init__(self, index, process, result, semaphore):
+        super().__init__(name='autopilot-worker-%d' % index)
+        self.index = index
+        self.process = process
+        self.summary = StreamSummary()
+        run_result = StreamToExtendedDecorator(
+            _WorkerTestResult(ThreadsafeForwardingResult(result, semaphore))
+        )
+        self.stream_result = _WorkerOutputFilter(
+            StreamTagger(
+                [run_result, self.summary],
+                add=['autopilot-worker-%d' % index]
+            ),
+            sys.stderr
+        )
+
+    def run(self):
+        from subunit import ByteStreamToStreamResult
+        self.stream_result.startTestRun()
+        try:
+            ByteStreamToStreamResult(
+                self.process.stdout,
+                non_subunit_name=_WORKER_OUTPUT_NAME
+            ).run(self.stream_result)
+        finally:
+            self.process.wait()
+            # Tests that were still running when the worker exited are
+            # reported as errors here:
+            self.stream_result.stopTestRun()
+
+    def report_unexpected_exit(self, result):
+        """Report an error to *result* if the worker exited with an error
+        code but didn't report a failing test, for example because it
+        couldn't load its tests.
+
+        """
+        if self.process.returncode and self.summary.wasSuccessful():
+            PlaceHolder(
+                'autopilot-worker-%d' % self.index,
+                outcome='addError',
+                details={
+                    'traceback': text_content(
+                        "Test worker exited with code %d."
+                        % self.process.returncode
+                    )
+                },
+            ).run(result)
+
+
+class _WorkerTestResult(TestResultDecorator):
+
+    """A result for one worker's tests.
+
+    The result for the whole run is started and stopped once, by the parent
+    process, rather than once for each worker.
+
+    """
+
+    def startTestRun(self):
+        pass
+
+    def stopTestRun(self):
+        pass
+
+
+class _WorkerOutputFilter(StreamResult):
+
+    """Writes anything a worker prints that isn't part of its subunit stream
+    to *output*, and forwards the rest of the stream to *target*.
+
+    """
+
+    def __init__(self, target, output):
+        super().__init__()
+        self.target = target
+        self.output = output
+
+    def startTestRun(self):
+        self.target.startTestRun()
+
+    def stopTestRun(self):
+        self.target.stopTestRun()
+
+    def status(self, test_id=None, file_name=None, file_bytes=None,
+               **kwargs):
+        if test_id is None and file_name == _WORKER_OUTPUT_NAME:
+            self.output.write(file_bytes.decode('utf-8', 'replace'))
+            self.output.flush()
+        else:
+            self.target.status(
+                test_id=test_id,
+                file_name=file_name,
+                file_bytes=file_bytes,
+                **kwargs
+            )
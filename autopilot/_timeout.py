@@ -37,15 +37,30 @@ forgetting to call ``time.sleep``.
 Finally, we support mocking out the ``sleep`` call, so autopilot tests can
 run quickly and verify the polling behavior of low-level function calls.
 
+Every wait in autopilot polls through a Poller, which measures its timeout
+against a monotonic clock (so time spent polling counts towards the timeout)
+and waits a short time between the first polls, backing off to longer waits
+(see :func:`autopilot.globals.set_poll_interval`). A condition that becomes
+true soon after a wait starts is noticed within milliseconds, while a long
+wait polls no more often than once every half second.
+
 """
 
+import random
+
 from autopilot.utilities import sleep
 from autopilot.globals import (
     get_default_timeout_period,
     get_long_timeout_period,
+    get_poll_interval,
 )
 
 
+# Every wait between polls is made up to this much shorter or longer at
+# random, so waits that start together don't poll in lockstep.
+_POLL_INTERVAL_JITTER = 0.1
+
+
 class Timeout(object):
 
     """Class for starting different timeout loops.
@@ -92,11 +107,73 @@ class Timeout(object):
             yield i
 
 
+class Poller(object):
+
+    """Poll until a deadline passes, backing off between polls.
+
+    The wait between polls starts at the initial poll interval and doubles
+    after every wait, up to the maximum poll interval. No wait goes past the
+    deadline. To poll for *condition* for up to *timeout* seconds::
+
+        poller = Poller(timeout)
+        while not condition():
+            if poller.expired:
+                raise AssertionError("Timed out")
+            poller.wait()
+
+    :param timeout: The number of seconds until the deadline.
+
+    """
+
+    def __init__(self, timeout):
+        self._start_time = sleep.monotonic()
+        self._deadline = self._start_time + timeout
+        self._interval, self._max_interval = get_poll_interval()
+
+    @property
+    def elapsed(self):
+        """The number of seconds since the poller was created."""
+        return sleep.monotonic() - self._start_time
+
+    @property
+    def time_left(self):
+        """The number of seconds until the deadline, or 0.0 if it has
+        passed.
+
+        """
+        return max(self._deadline - sleep.monotonic(), 0.0)
+
+    @property
+    def expired(self):
+        """True if the deadline has passed."""
+        return self.time_left <= 0.0
+
+    def next_interval(self):
+        """Return the number of seconds to wait before the next poll, and
+        back off.
+
+        """
+        interval = self._interval * random.uniform(
+            1.0 - _POLL_INTERVAL_JITTER,
+            1.0 + _POLL_INTERVAL_JITTER
+        )
+        self._interval = min(self._interval * 2, self._max_interval)
+        return min(interval, self.time_left)
+
+    def wait(self, wait_fn=sleep):
+        """Wait until it is time for the next poll.
+
+        :param wait_fn: Called with the number of seconds to wait. It may
+            return early, for example when the application under test
+            reports a change.
+
+        """
+        wait_fn(self.next_interval())
+
+
 def _do_timeout(timeout):
-    time_elapsed = 0.0
-    while timeout - time_elapsed > 0.0:
-        yield time_elapsed
-        time_to_sleep = min(timeout - time_elapsed, 1.0)
-        sleep(time_to_sleep)
-        time_elapsed += time_to_sleep
-    yield time_elapsed
+    poller = Poller(timeout)
+    while not poller.expired:
+        yield poller.elapsed
+        poller.wait()
+    yield poller.elapsed
@@ -25,10 +25,12 @@ from autopilot.application._launcher import (
     NormalApplicationLauncher,
     UpstartApplicationLauncher,
 )
+from autopilot.application._shared import SharedApplication
 
 __all__ = [
     'ClickApplicationLauncher',
     'NormalApplicationLauncher',
+    'SharedApplication',
     'UpstartApplicationLauncher',
     'get_application_launcher_wrapper',
 ]
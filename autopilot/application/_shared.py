@@ -0,0 +1,214 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Applications that are launched once and used by many tests."""
+
+import atexit
+from contextlib import contextmanager
+import logging
+import os
+
+from autopilot.application._launcher import NormalApplicationLauncher
+
+_logger = logging.getLogger(__name__)
+
+_SESSION_BUS_VARIABLE = 'DBUS_SESSION_BUS_ADDRESS'
+
+
+class SharedApplication(object):
+
+    """An application that is launched once, and used by many tests.
+
+    Launching an application is often the slowest part of a test. Tests that
+    can share an application pass a SharedApplication to
+    :meth:`~autopilot.testcase.AutopilotTestCase.use_shared_application`
+    instead of calling
+    :meth:`~autopilot.testcase.AutopilotTestCase.launch_test_application`.
+    The first test to use it launches the application, and later tests reuse
+    the same process and proxy object. Where the SharedApplication is created
+    decides how widely it is shared: a module level SharedApplication is
+    shared by every test in the module, and a class attribute by every test
+    in the class.
+
+    Before each test after the first, the application is checked and reset:
+
+    * If it has exited, it is launched again.
+    * If *health_check* is given, it is called with the application's proxy
+      object, and the application is launched again if it returns False or
+      raises an exception.
+    * If *reset* is given, it is called with the application's proxy object,
+      and should put the application back in the state tests expect to find
+      it in. If it raises an exception, the application is launched again.
+
+    The application is killed when :meth:`stop` is called, for example from
+    ``tearDownModule`` or ``tearDownClass``, or failing that when the test
+    run ends.
+
+    :param application: The application to launch, as for
+        :meth:`~autopilot.testcase.AutopilotTestCase.launch_test_application`.
+        Any further positional arguments are passed to the application.
+
+    :keyword reset: A callable that takes the application's proxy object,
+        and resets the application's state between tests.
+
+    :keyword health_check: A callable that takes the application's proxy
+        object, and returns False if the application can't be used by
+        another test.
+
+    :keyword app_type: As for
+        :meth:`~autopilot.testcase.AutopilotTestCase.launch_test_application`.
+
+    :keyword launch_dir: As for
+        :meth:`~autopilot.testcase.AutopilotTestCase.launch_test_application`.
+
+    :keyword capture_output: If set to True, the process output is captured.
+        The default is False, since nothing reads the output of a shared
+        application until it is killed, and an application that writes a lot
+        of output would block once the pipe is full.
+
+    :keyword emulator_base: If set, specifies the base class to be used for
+        all emulators for this application.
+
+    :keyword dbus_bus: The dbus bus the application is found on, as for
+        :class:`~autopilot.application.NormalApplicationLauncher`.
+
+    """
+
+    def __init__(self, application, *arguments, reset=None,
+                 health_check=None, app_type=None, launch_dir=None,
+                 capture_output=False, **kwargs):
+        self.application = application
+        self.arguments = list(arguments)
+        self._reset = reset
+        self._health_check = health_check
+        self._launch_args = dict(
+            app_type=app_type,
+            launch_dir=launch_dir,
+            capture_output=capture_output,
+        )
+        self._launcher_kwargs = kwargs
+        self._launcher = None
+        self._proxy = None
+        self._used = False
+        self._stop_registered = False
+        self.launch_count = 0
+
+    def get_proxy(self):
+        """Return the proxy object for the application, launching it if it
+        is not running, and checking and resetting it if it has been used
+        before.
+
+        :return: A proxy object that represents the application.
+
+        """
+        if self._proxy is not None and self._used and not self._prepare():
+            self.stop()
+        if self._proxy is None:
+            self._launch()
+        self._used = True
+        return self._proxy
+
+    def stop(self):
+        """Kill the application, if it is running.
+
+        The next call to :meth:`get_proxy` launches it again.
+
+        """
+        if self._launcher is not None:
+            launcher = self._launcher
+            self._launcher = None
+            self._proxy = None
+            with _session_bus_address_restored():
+                launcher.cleanUp()
+
+    def _prepare(self):
+        """Return True if the application can be used by another test, after
+        resetting it.
+
+        """
+        return_code = self._proxy.process.poll()
+        if return_code is not None:
+            _logger.warning(
+                "Shared application '%s' exited with code %d, launching it "
+                "again.",
+                self.application,
+                return_code
+            )
+            return False
+        try:
+            if (
+                self._health_check is not None
+                and not self._health_check(self._proxy)
+            ):
+                _logger.warning(
+                    "Shared application '%s' failed its health check, "
+                    "launching it again.",
+                    self.application
+                )
+                return False
+            if self._reset is not None:
+                self._reset(self._proxy)
+        except Exception:
+            _logger.exception(
+                "Could not reset shared application '%s', launching it again.",
+                self.application
+            )
+            return False
+        return True
+
+    def _launch(self):
+        launcher = NormalApplicationLauncher(**self._launcher_kwargs)
+        with _session_bus_address_restored():
+            launcher.setUp()
+            try:
+                self._proxy = launcher.launch(
+                    self.application,
+                    self.arguments,
+                    **self._launch_args
+                )
+            except BaseException:
+                launcher.cleanUp()
+                raise
+        self._launcher = launcher
+        self._used = False
+        self.launch_count += 1
+        if not self._stop_registered:
+            atexit.register(self.stop)
+            self._stop_registered = True
+
+
+@contextmanager
+def _session_bus_address_restored():
+    """Restore DBUS_SESSION_BUS_ADDRESS to its current value on exit.
+
+    A launcher for an application on a bus other than the session bus points
+    the variable at that bus until the launcher is cleaned up. A shared
+    application's launcher outlives the test that launched it, so the change
+    is undone once the application has been launched, rather than leaking
+    into later tests.
+
+    """
+    old_value = os.environ.get(_SESSION_BUS_VARIABLE)
+    try:
+        yield
+    finally:
+        if old_value is None:
+            os.environ.pop(_SESSION_BUS_VARIABLE, None)
+        else:
+            os.environ[_SESSION_BUS_VARIABLE] = old_value
@@ -91,3 +91,38 @@ def set_test_timeout(new_timeout):
 def get_test_timeout():
     global _test_timeout
     return _test_timeout
+
+
+# The maximum age, in seconds, that a proxy object's state may reach before
+# reading one of its attributes refreshes it. 0 means always refresh.
+_state_max_age = 0
+
+
+def set_state_max_age(new_max_age):
+    global _state_max_age
+    _state_max_age = new_max_age
+
+
+def get_state_max_age():
+    global _state_max_age
+    return _state_max_age
+
+
+# The interval, in seconds, between the first two polls of a wait, and the
+# longest interval that polls back off to.
+_poll_interval = (0.01, 0.5)
+
+
+def set_poll_interval(initial_interval, max_interval):
+    global _poll_interval
+    if not 0 < initial_interval <= max_interval:
+        raise ValueError(
+            "Poll intervals must be positive, and the initial interval may "
+            "not be longer than the maximum interval."
+        )
+    _poll_interval = (initial_interval, max_interval)
+
+
+def get_poll_interval():
+    global _poll_interval
+    return _poll_interval
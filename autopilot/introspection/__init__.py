@@ -37,7 +37,11 @@ For creating your own Custom Proxy Classes use
 
 """
 
-from autopilot.introspection.dbus import CustomEmulatorBase, is_element
+from autopilot.introspection.dbus import (
+    CustomEmulatorBase,
+    SubtreeSnapshot,
+    is_element,
+)
 from autopilot.introspection._xpathselect import (
     get_classname_from_path,
     get_path_root,
@@ -46,6 +50,8 @@ from autopilot.exceptions import ProcessSearchError
 from autopilot.introspection._search import (
     get_proxy_object_for_existing_process,
     get_proxy_object_for_existing_process_by_name,
+    get_proxy_object_for_recording,
+    get_proxy_object_for_tree,
 )
 
 # TODO: Remove ProcessSearchError from here once all our clients have stopped
@@ -57,8 +63,11 @@ __all__ = [
     'get_path_root',
     'ProxyBase',
     'ProcessSearchError',
+    'SubtreeSnapshot',
     'get_proxy_object_for_existing_process',
     'get_proxy_object_for_existing_process_by_name',
+    'get_proxy_object_for_recording',
+    'get_proxy_object_for_tree',
 ]
 
 ProxyBase = CustomEmulatorBase
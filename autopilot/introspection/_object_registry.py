@@ -40,6 +40,25 @@ connection id's (UUID objects). The values are described below.
    per-connection basis. For example, Qt-based apps allow us to monitor
    signals and slots in the application, but Gtk apps do not.
 
+Looking up the proxy class for an object happens for every proxy object
+autopilot creates, so the results are cached in three further dictionaries:
+
+* ``_proxy_class_indexes`` contains, for each connection id, the custom proxy
+  classes that use the default name based validation (indexed by class name),
+  and the classes that override ``validate_dbus_object``. It's rebuilt
+  whenever a new custom proxy class is registered, or the registry is patched.
+
+* ``_mixed_bases`` contains, for each connection id, the bases tuple for
+  each (custom proxy class, extensions) pair, so the mixed bases are only
+  computed once.
+
+* ``_default_proxy_classes`` contains, for each connection id, the generated
+  proxy classes, keyed by their bases and node type name.
+
+Autopilot makes a new default emulator base for every application launched
+without one, so everything stored for its connection id is removed with
+``_forget_proxy_base`` once the application's proxy objects are gone.
+
 """
 
 from uuid import uuid4
@@ -50,6 +69,9 @@ from contextlib import contextmanager
 
 _object_registry = {}
 _proxy_extensions = {}
+_proxy_class_indexes = {}
+_mixed_bases = {}
+_default_proxy_classes = {}
 
 
 def register_extension_classes_for_proxy_base(proxy_base, extensions):
@@ -111,6 +133,7 @@ class IntrospectableObjectMetaclass(type):
                 else:
                     _object_registry[class_object._id] = \
                         {classname: class_object}
+                _proxy_class_indexes.pop(class_object._id, None)
         # in all cases, return the class unchanged.
         return class_object
 
@@ -160,9 +183,14 @@ def _try_custom_proxy_classes(object_id, path, state):
     :raises ValueError: if more than one class matches
 
     """
-    proxy_class_dict = _object_registry[object_id]
-    possible_classes = [c for c in proxy_class_dict.values() if
+    classes_by_name, validating_classes = _get_proxy_class_index(object_id)
+    possible_classes = [c for c in validating_classes if
                         c.validate_dbus_object(path, state)]
+    name_match = classes_by_name.get(
+        _decode_name(get_classname_from_path(path))
+    )
+    if name_match is not None:
+        possible_classes.append(name_match)
     if len(possible_classes) > 1:
         raise ValueError(
             'More than one custom proxy class matches this object: '
@@ -173,16 +201,63 @@ def _try_custom_proxy_classes(object_id, path, state):
             )
         )
     if len(possible_classes) == 1:
+        kls = possible_classes[0]
         extended_proxy_bases = _get_proxy_bases_for_id(object_id)
-        mixed = _combine_base_and_extensions(
-            possible_classes[0],
-            extended_proxy_bases
-        )
-        possible_classes[0].__bases__ = mixed
-        return possible_classes[0]
+        mixed_bases = _mixed_bases.setdefault(object_id, {})
+        key = (kls, extended_proxy_bases)
+        mixed = mixed_bases.get(key)
+        if mixed is None:
+            mixed = _combine_base_and_extensions(kls, extended_proxy_bases)
+            mixed_bases[key] = mixed
+        # Assigning __bases__ recomputes the MRO, so only do it if needed.
+        if kls.__bases__ != mixed:
+            kls.__bases__ = mixed
+        return kls
     return None
 
 
+def _get_proxy_class_index(object_id):
+    """Return the custom proxy classes for *object_id*, ready for matching.
+
+    :returns: A tuple containing a dictionary of the classes that use the
+        default ``validate_dbus_object`` implementation, keyed by their class
+        name, and a list of the classes that override ``validate_dbus_object``
+        and must be asked whether they match.
+
+    """
+    index = _proxy_class_indexes.get(object_id)
+    if index is None:
+        classes_by_name = {}
+        validating_classes = []
+        for kls in _object_registry[object_id].values():
+            if _validates_by_class_name(kls):
+                classes_by_name[kls.__name__] = kls
+            else:
+                validating_classes.append(kls)
+        index = _proxy_class_indexes[object_id] = (
+            classes_by_name,
+            validating_classes
+        )
+    return index
+
+
+def _validates_by_class_name(kls):
+    """Return True if *kls* uses the default ``validate_dbus_object``, which
+    only compares the node type name with the class name.
+
+    """
+    from autopilot.introspection.dbus import DBusIntrospectionObject
+    default_validator = DBusIntrospectionObject.validate_dbus_object.__func__
+    validator = getattr(kls.validate_dbus_object, '__func__', None)
+    return validator is default_validator
+
+
+def _decode_name(name):
+    if isinstance(name, bytes):
+        name = name.decode('utf-8')
+    return name
+
+
 def _combine_base_and_extensions(kls, extensions):
     """Returns the bases of the given class augmented with extensions
 
@@ -251,12 +326,36 @@ def _get_default_proxy_class(id, name):
     :returns: custom proxy object class
 
     """
-    get_debug_logger().warning(
-        "Generating introspection instance for type '%s' based on generic "
-        "class.", name)
-    if isinstance(name, bytes):
-        name = name.decode('utf-8')
-    return type(name, _get_proxy_bases_for_id(id), dict(__generated=True))
+    name = _decode_name(name)
+    bases = _get_proxy_bases_for_id(id)
+    default_proxy_classes = _default_proxy_classes.setdefault(id, {})
+    key = (bases, name)
+    kls = default_proxy_classes.get(key)
+    if kls is None:
+        get_debug_logger().warning(
+            "Generating introspection instance for type '%s' based on generic "
+            "class.", name)
+        kls = default_proxy_classes[key] = type(
+            name,
+            bases,
+            dict(__generated=True)
+        )
+    return kls
+
+
+def _forget_proxy_base(id):
+    """Remove the proxy classes, extensions and cached classes stored for
+    the emulator base with _id *id*, so they can be garbage collected.
+
+    """
+    for registry in (
+            _object_registry,
+            _proxy_extensions,
+            _proxy_class_indexes,
+            _mixed_bases,
+            _default_proxy_classes,
+    ):
+        registry.pop(id, None)
 
 
 @contextmanager
@@ -271,9 +370,11 @@ def patch_registry(new_registry):
     global _object_registry
     old_registry = _object_registry
     _object_registry = new_registry
+    _proxy_class_indexes.clear()
     try:
         yield
     except Exception:
         raise
     finally:
         _object_registry = old_registry
+        _proxy_class_indexes.clear()
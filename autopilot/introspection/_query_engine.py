@@ -0,0 +1,490 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""A pure-Python implementation of the server side of the xpathselect
+protocol.
+
+This is an internal module, and should not be used directly.
+
+The protocol is described in docs/appendix/protocol.rst. This module
+implements both the basic attribute filter grammar and the extended grammar
+(wire protocol version 1.5 and later), so it can answer any query the
+autopilot client sends.
+
+An introspection tree is made of Node instances. To run a query against it::
+
+    >>> root = Node('App', dict(id=[0, 1]))
+    >>> root.add_child(Node('Button', dict(id=[0, 2], label=[0, 'OK'])))
+    >>> execute_query(root, b'//Button[label="OK"]')
+    [('/App/Button', {'id': [0, 2], 'label': [0, 'OK']})]
+
+Queries walk the tree. A tree that won't change can be indexed once with
+TreeIndex, which makes queries that search for descendants, or filter on 'id'
+or 'objectName', much faster on large trees.
+
+"""
+
+from collections import defaultdict
+import re
+
+from autopilot.exceptions import InvalidXPathQuery
+
+
+class Node(object):
+
+    """An object in an introspection tree.
+
+    :param name: The node name (usually the type name of the object).
+    :param state: The state dictionary of the object, in wire protocol
+        format. It must contain an 'id' key.
+    :param children: The child nodes of this object.
+
+    """
+
+    def __init__(self, name, state, children=()):
+        if 'id' not in state:
+            raise ValueError(
+                "State dictionary does not contain required 'id' key."
+            )
+        self.name = name
+        self.state = dict(state)
+        self.parent = None
+        self.children = []
+        for child in children:
+            self.add_child(child)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Make a tree of nodes from a dictionary, as returned by to_dict.
+
+        The dictionary has a 'name' key, a 'state' key holding the state
+        dictionary in wire protocol format, and optionally a 'children' key
+        holding a list of dictionaries in the same format. This is plain
+        data, so a tree can be saved and loaded with the json module.
+
+        :raises ValueError: if the dictionary is not in this format.
+
+        """
+        try:
+            name = data['name']
+            state = data['state']
+            children = data.get('children', ())
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError(
+                "Tree dictionary must have 'name' and 'state' keys, not %r"
+                % (data,)
+            )
+        return cls(name, state, [cls.from_dict(c) for c in children])
+
+    def to_dict(self):
+        """Return this node and its descendants as a dictionary."""
+        data = dict(name=self.name, state=dict(self.state))
+        if self.children:
+            data['children'] = [c.to_dict() for c in self.children]
+        return data
+
+    @property
+    def id(self):
+        return self.state['id'][1]
+
+    @property
+    def path(self):
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return '/' + '/'.join(reversed(names))
+
+    def add_child(self, child):
+        child.parent = self
+        self.children.append(child)
+
+    def remove_child(self, child):
+        self.children.remove(child)
+        child.parent = None
+
+    def iter_descendants(self):
+        """Yield every node below this one, in document order."""
+        for child in self.children:
+            yield child
+            for descendant in child.iter_descendants():
+                yield descendant
+
+    def __repr__(self):
+        return "<Node %s id=%r>" % (self.path, self.id)
+
+
+class TreeIndex(object):
+
+    """An index of the nodes in a tree, by name, id and objectName.
+
+    The index is not updated when the tree changes.
+
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.nodes = [root] + list(root.iter_descendants())
+        self._by_name = defaultdict(list)
+        self._by_id = defaultdict(list)
+        self._by_object_name = defaultdict(list)
+        for node in self.nodes:
+            self._by_name[node.name].append(node)
+            self._by_id[node.id].append(node)
+            object_name = node.state.get('objectName')
+            if object_name is not None and len(object_name) == 2:
+                self._by_object_name[object_name[1]].append(node)
+
+    def get_candidates(self, name, filters):
+        """Return the nodes that might match a query step that selects
+        *name* with *filters*, in document order.
+
+        """
+        for key, operator, value in filters:
+            if operator != '=':
+                continue
+            if key == 'id':
+                return self._by_id.get(value, [])
+            if key == 'objectName':
+                return self._by_object_name.get(value, [])
+        if name == '*':
+            return self.nodes
+        return self._by_name.get(name, [])
+
+
+def execute_query(root, query, index=None, properties=None):
+    """Execute *query* against the tree with *root* as its root node.
+
+    :param query: The xpathselect query, as bytes or str.
+    :param index: A TreeIndex for the tree, if there is one.
+    :param properties: If given, a list of property names. The state
+        dictionaries returned only contain these properties and 'id', like
+        the reply to the GetStateProperties dbus method.
+    :returns: A list of (path, state) tuples, one for each object that
+        matches, like the reply to the GetState dbus method.
+    :raises InvalidXPathQuery: if the query could not be parsed.
+
+    """
+    nodes = find_nodes(root, query, index)
+    if properties is None:
+        return [(n.path, n.state) for n in nodes]
+    return [(n.path, project_state(n.state, properties)) for n in nodes]
+
+
+def project_state(state, properties):
+    """Return a copy of the state dictionary *state* with only 'id' and the
+    properties named in *properties* left in it.
+
+    As in attribute filters, '-' and '_' in property names are treated as
+    the same character.
+
+    """
+    wanted = set(p.replace('-', '_') for p in properties)
+    wanted.add('id')
+    return {k: v for k, v in state.items() if k.replace('-', '_') in wanted}
+
+
+def find_nodes(root, query, index=None):
+    """Return a list of the nodes in the tree with *root* as its root node
+    that match *query*.
+
+    """
+    steps = parse_query(query)
+    if not steps:
+        # The pseudo-tree-root query ('/') selects the root of the tree.
+        return [root]
+
+    nodes = None
+    for operation, name, filters in steps:
+        if index is not None and name != '..':
+            candidates = _get_indexed_candidates(
+                index,
+                nodes,
+                operation,
+                name,
+                filters
+            )
+        else:
+            candidates = _get_candidates(root, nodes, operation, name)
+        nodes = _unique(
+            n for n in candidates
+            if (name in ('*', '..') or n.name == name)
+            and _node_passes_filters(n, filters)
+        )
+    return nodes
+
+
+def parse_query(query):
+    """Parse an xpathselect query.
+
+    :returns: A list of (operation, name, filters) tuples, one for each step
+        in the query. 'operation' is either b'/' or b'//', 'name' is a str,
+        and 'filters' is a list of (key, operator, value) tuples.
+    :raises InvalidXPathQuery: if the query could not be parsed.
+
+    """
+    if isinstance(query, str):
+        query = query.encode('utf-8')
+    if query in (b'', b'/'):
+        return []
+
+    parser = _QueryParser(query)
+    return parser.parse()
+
+
+class _QueryParser(object):
+
+    def __init__(self, query):
+        self._query = query
+        self._position = 0
+
+    def parse(self):
+        steps = []
+        while self._position < len(self._query):
+            if self._query.startswith(b'//', self._position):
+                operation = b'//'
+            elif self._query.startswith(b'/', self._position):
+                operation = b'/'
+            else:
+                self._fail("Expected '/' or '//'")
+            self._position += len(operation)
+            name = self._read_name()
+            filters = []
+            if self._peek() == b'[':
+                filters = self._read_filters()
+            steps.append((operation, name, filters))
+        return steps
+
+    def _peek(self):
+        return self._query[self._position:self._position + 1]
+
+    def _fail(self, message):
+        raise InvalidXPathQuery(
+            "%s at position %d in query %r" % (
+                message,
+                self._position,
+                self._query
+            )
+        )
+
+    def _read_name(self):
+        match = re.compile(br'[^/\[\]]+').match(self._query, self._position)
+        if match is None:
+            self._fail("Expected a node name")
+        self._position = match.end()
+        return match.group().decode('utf-8')
+
+    def _read_filters(self):
+        # skip the opening bracket:
+        self._position += 1
+        filters = []
+        while True:
+            filters.append(self._read_filter())
+            next_char = self._peek()
+            self._position += 1
+            if next_char == b']':
+                return filters
+            if next_char != b',':
+                self._fail("Expected ',' or ']'")
+
+    def _read_filter(self):
+        match = re.compile(
+            br'([a-zA-Z0-9_\- ]+?)(!=|=|<|>)'
+        ).match(self._query, self._position)
+        if match is None:
+            self._fail("Expected an attribute filter")
+        self._position = match.end()
+        key = match.group(1).decode('utf-8')
+        operator = match.group(2).decode('utf-8')
+        return key, operator, self._read_value()
+
+    def _read_value(self):
+        next_char = self._peek()
+        if next_char == b'"':
+            return self._read_string()
+        if next_char == b'[':
+            return self._read_compound_value()
+        match = re.compile(br'[^,\]]+').match(self._query, self._position)
+        if match is None:
+            self._fail("Expected a value")
+        self._position = match.end()
+        return _parse_scalar(match.group(), self._fail)
+
+    def _read_string(self):
+        start = self._position + 1
+        position = start
+        while True:
+            end = self._query.find(b'"', position)
+            if end == -1:
+                self._fail("Unterminated string")
+            escaped = _count_trailing_backslashes(self._query[start:end]) % 2
+            # A quote ends the string if it isn't escaped, and is followed by
+            # the end of the filter.
+            if (
+                not escaped
+                and self._query[end + 1:end + 2] in (b',', b']', b'')
+            ):
+                break
+            position = end + 1
+        self._position = end + 1
+        return _unescape(self._query[start:end].decode('utf-8'))
+
+    def _read_compound_value(self):
+        end = self._query.find(b']', self._position)
+        if end == -1:
+            self._fail("Unterminated compound value")
+        parts = self._query[self._position + 1:end].split(b',')
+        self._position = end + 1
+        return [_parse_number(p.strip(), self._fail) for p in parts]
+
+
+def _parse_scalar(token, fail):
+    token = token.strip()
+    if token == b'True':
+        return True
+    if token == b'False':
+        return False
+    return _parse_number(token, fail)
+
+
+def _parse_number(token, fail):
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        fail("Invalid value %r" % token)
+
+
+def _count_trailing_backslashes(value):
+    return len(value) - len(value.rstrip(b'\\'))
+
+
+_ESCAPES = {
+    'a': '\a',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    'v': '\v',
+    '\\': '\\',
+    '"': '"',
+    "'": "'",
+}
+
+
+def _unescape(value):
+    def replace(match):
+        escape = match.group(1)
+        if escape[0] in 'xuU':
+            return chr(int(escape[1:], 16))
+        return _ESCAPES.get(escape, '\\' + escape)
+
+    return re.sub(
+        r'\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|.)',
+        replace,
+        value
+    )
+
+
+def _get_candidates(root, nodes, operation, name):
+    if nodes is None:
+        # The first step is relative to a virtual parent of the root node.
+        if operation == b'/':
+            return [root]
+        return [root] + list(root.iter_descendants())
+    if name == '..':
+        return [n.parent or n for n in nodes]
+    if operation == b'/':
+        return [c for n in nodes for c in n.children]
+    return [d for n in nodes for d in n.iter_descendants()]
+
+
+def _get_indexed_candidates(index, nodes, operation, name, filters):
+    candidates = index.get_candidates(name, filters)
+    if nodes is None:
+        if operation == b'/':
+            return [n for n in candidates if n is index.root]
+        return candidates
+
+    selected = set(id(n) for n in nodes)
+    if operation == b'/':
+        return [
+            n for n in candidates
+            if n.parent is not None and id(n.parent) in selected
+        ]
+    return [n for n in candidates if _has_ancestor_in(n, selected)]
+
+
+def _has_ancestor_in(node, selected):
+    node = node.parent
+    while node is not None:
+        if id(node) in selected:
+            return True
+        node = node.parent
+    return False
+
+
+def _unique(nodes):
+    seen = set()
+    result = []
+    for node in nodes:
+        if id(node) not in seen:
+            seen.add(id(node))
+            result.append(node)
+    return result
+
+
+def _node_passes_filters(node, filters):
+    if not filters:
+        return True
+    state = {k.replace('-', '_'): v for k, v in node.state.items()}
+    for key, operator, expected in filters:
+        value = state.get(key.replace('-', '_'))
+        if value is None or not _value_passes(value, operator, expected):
+            return False
+    return True
+
+
+def _value_passes(value, operator, expected):
+    """Return whether the wire format *value* satisfies the filter."""
+    values = list(value[1:])
+    if isinstance(expected, list):
+        actual = values
+    elif len(values) == 1:
+        actual = values[0]
+    else:
+        return False
+
+    try:
+        if operator == '=':
+            return actual == expected
+        if operator == '!=':
+            return actual != expected
+        if operator == '<':
+            return actual < expected
+        if operator == '>':
+            return actual > expected
+    except TypeError:
+        pass
+    return False
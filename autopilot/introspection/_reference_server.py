@@ -0,0 +1,293 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""A reference implementation of the server side of the autopilot wire
+protocol.
+
+This is an internal module, used to test autopilot itself and as an example
+for toolkit authors. Run it with::
+
+    python3 -m autopilot.introspection._reference_server
+
+It exports a small introspection tree on the session bus, and implements
+every version of the wire protocol autopilot supports, including state change
+notifications and property projection. The tree can be changed over dbus with
+the methods on the 'com.canonical.Autopilot.ReferenceServer' interface, each
+of which takes a delay in milliseconds so tests can make changes happen while
+autopilot is waiting for them.
+
+"""
+
+import argparse
+import itertools
+import logging
+
+import dbus
+import dbus.service
+from gi.repository import GLib
+
+from autopilot.dbus_handler import get_session_bus
+from autopilot.introspection import _query_engine
+from autopilot.introspection.backends import _parse_version
+from autopilot.introspection.constants import (
+    AP_INTROSPECTION_IFACE,
+    AUTOPILOT_PATH,
+    CHANGE_NOTIFICATIONS_WIRE_PROTOCOL_VERSION,
+    PROPERTY_PROJECTION_WIRE_PROTOCOL_VERSION,
+)
+
+_logger = logging.getLogger(__name__)
+
+REFERENCE_SERVER_IFACE = 'com.canonical.Autopilot.ReferenceServer'
+
+
+def make_default_tree():
+    """Return the root node of the tree the reference server exports if no
+    other tree is given.
+
+    """
+    Node = _query_engine.Node
+    return Node('ReferenceApp', dict(id=[0, 1]), [
+        Node('Window', dict(id=[0, 2], title=[0, 'Reference Server']), [
+            Node('Label', dict(id=[0, 3], text=[0, 'Hello'])),
+            Node(
+                'Button',
+                dict(id=[0, 4], text=[0, 'Click Me'], enabled=[0, True])
+            ),
+        ]),
+    ])
+
+
+class ReferenceServer(dbus.service.Object):
+
+    """Export an introspection tree over dbus."""
+
+    def __init__(self, bus, root, version):
+        super().__init__(bus, AUTOPILOT_PATH)
+        self._root = root
+        self._version = version
+        self._object_ids = itertools.count(
+            max(n.id for n in self._iter_nodes()) + 1
+        )
+        self._subscription_ids = itertools.count(1)
+        self._subscribe_calls = 0
+        # subscription id -> (query, properties, last snapshot)
+        self._subscriptions = {}
+
+    def _iter_nodes(self):
+        yield self._root
+        for node in self._root.iter_descendants():
+            yield node
+
+    def _get_node(self, object_id):
+        for node in self._iter_nodes():
+            if node.id == object_id:
+                return node
+        raise dbus.DBusException(
+            "No object with id %d" % object_id,
+            name=REFERENCE_SERVER_IFACE + '.Error.NoSuchObject'
+        )
+
+    @dbus.service.method(AP_INTROSPECTION_IFACE, out_signature='s')
+    def GetVersion(self):
+        return self._version
+
+    @dbus.service.method(
+        AP_INTROSPECTION_IFACE,
+        in_signature='s',
+        out_signature='a(sa{sv})'
+    )
+    def GetState(self, query):
+        return self._get_state(query)
+
+    @dbus.service.method(
+        AP_INTROSPECTION_IFACE,
+        in_signature='sas',
+        out_signature='a(sa{sv})'
+    )
+    def GetStateProperties(self, query, properties):
+        self._check_supports(PROPERTY_PROJECTION_WIRE_PROTOCOL_VERSION)
+        return self._get_state(query, [str(p) for p in properties])
+
+    def _get_state(self, query, properties=None):
+        try:
+            results = _query_engine.execute_query(
+                self._root,
+                query,
+                properties=properties
+            )
+        except Exception as e:
+            raise dbus.DBusException(
+                str(e),
+                name=AP_INTROSPECTION_IFACE + '.Error.InvalidQuery'
+            )
+        return [
+            (path, {k: dbus.Array(v, signature='v') for k, v in state.items()})
+            for path, state in results
+        ]
+
+    @dbus.service.method(
+        AP_INTROSPECTION_IFACE,
+        in_signature='sas',
+        out_signature='u'
+    )
+    def Subscribe(self, query, properties):
+        self._subscribe_calls += 1
+        self._check_supports(CHANGE_NOTIFICATIONS_WIRE_PROTOCOL_VERSION)
+        subscription_id = next(self._subscription_ids)
+        properties = [str(p) for p in properties]
+        self._subscriptions[subscription_id] = (
+            query,
+            properties,
+            self._get_snapshot(query, properties)
+        )
+        return subscription_id
+
+    @dbus.service.method(AP_INTROSPECTION_IFACE, in_signature='u')
+    def Unsubscribe(self, subscription_id):
+        self._check_supports(CHANGE_NOTIFICATIONS_WIRE_PROTOCOL_VERSION)
+        self._subscriptions.pop(subscription_id, None)
+
+    @dbus.service.signal(AP_INTROSPECTION_IFACE, signature='u')
+    def StateChanged(self, subscription_id):
+        pass
+
+    def _check_supports(self, minimum_version):
+        """Raise UnknownMethod if the wire protocol version we report is
+        older than *minimum_version*.
+
+        """
+        if _parse_version(self._version) < _parse_version(minimum_version):
+            raise dbus.DBusException(
+                "This method needs wire protocol version %s" % minimum_version,
+                name='org.freedesktop.DBus.Error.UnknownMethod'
+            )
+
+    def _get_snapshot(self, query, properties):
+        nodes = _query_engine.find_nodes(self._root, query)
+        return [
+            (
+                node.path,
+                node.id,
+                sorted(
+                    _query_engine.project_state(node.state, properties).items()
+                    if properties else node.state.items()
+                )
+            )
+            for node in nodes
+        ]
+
+    def _notify_subscribers(self):
+        for subscription_id, subscription in list(self._subscriptions.items()):
+            query, properties, snapshot = subscription
+            new_snapshot = self._get_snapshot(query, properties)
+            if new_snapshot != snapshot:
+                self._subscriptions[subscription_id] = (
+                    query,
+                    properties,
+                    new_snapshot
+                )
+                self.StateChanged(subscription_id)
+
+    def _after(self, delay_ms, callback, *args):
+        """Call 'callback' after 'delay_ms' milliseconds, or now if 'delay_ms'
+        is 0.
+
+        """
+        def change():
+            callback(*args)
+            self._notify_subscribers()
+            return False
+
+        if delay_ms:
+            GLib.timeout_add(delay_ms, change)
+        else:
+            change()
+
+    @dbus.service.method(REFERENCE_SERVER_IFACE, in_signature='usavu')
+    def SetProperty(self, object_id, name, value, delay_ms):
+        """Set property 'name' of an object to 'value', given in wire
+        protocol format.
+
+        """
+        node = self._get_node(object_id)
+        self._after(delay_ms, node.state.__setitem__, str(name), list(value))
+
+    @dbus.service.method(
+        REFERENCE_SERVER_IFACE,
+        in_signature='usa{sav}u',
+        out_signature='u'
+    )
+    def AddObject(self, parent_id, name, properties, delay_ms):
+        """Add a child object to the object with id 'parent_id', and return
+        the id of the new object.
+
+        """
+        parent = self._get_node(parent_id)
+        object_id = next(self._object_ids)
+        state = {str(k): list(v) for k, v in properties.items()}
+        state['id'] = [0, object_id]
+        node = _query_engine.Node(str(name), state)
+        self._after(delay_ms, parent.add_child, node)
+        return object_id
+
+    @dbus.service.method(REFERENCE_SERVER_IFACE, out_signature='u')
+    def GetSubscribeCount(self):
+        """Return the number of times Subscribe has been called, whether or
+        not the call succeeded.
+
+        """
+        return self._subscribe_calls
+
+    @dbus.service.method(REFERENCE_SERVER_IFACE, in_signature='uu')
+    def RemoveObject(self, object_id, delay_ms):
+        """Remove an object, and all its children, from the tree."""
+        node = self._get_node(object_id)
+        if node.parent is None:
+            raise dbus.DBusException(
+                "Cannot remove the root object",
+                name=REFERENCE_SERVER_IFACE + '.Error.InvalidArgs'
+            )
+        self._after(delay_ms, node.parent.remove_child, node)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export an introspection tree over dbus, for testing "
+        "autopilot."
+    )
+    parser.add_argument(
+        '--version',
+        default=PROPERTY_PROJECTION_WIRE_PROTOCOL_VERSION,
+        help="The wire protocol version to report (default: %(default)s)."
+    )
+    args = parser.parse_args()
+
+    bus = get_session_bus()
+    server = ReferenceServer(bus, make_default_tree(), args.version)
+    _logger.info("Reference server running as %s", bus.get_unique_name())
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
+    server.remove_from_connection()
+
+
+if __name__ == '__main__':
+    main()
@@ -24,12 +24,15 @@ import logging
 import os
 import psutil
 import subprocess
+import weakref
+from contextlib import contextmanager
 from functools import partial
 from operator import methodcaller
 
 from autopilot import dbus_handler
-from autopilot._timeout import Timeout
+from autopilot._timeout import Poller
 from autopilot.exceptions import ProcessSearchError
+from autopilot.globals import get_default_timeout_period
 from autopilot.introspection import backends
 from autopilot.introspection import constants
 from autopilot.introspection import dbus as ap_dbus
@@ -41,7 +44,7 @@ from autopilot.introspection.utilities import (
     _pid_is_running,
     process_util,
 )
-from autopilot.utilities import deprecated
+from autopilot.utilities import deprecated, sleep
 
 
 logger = logging.getLogger(__name__)
@@ -110,6 +113,12 @@ def get_proxy_object_for_existing_process(**kwargs):
         resulting proxy object.
         Defaults to None
 
+    Unless a **process** is supplied, the proxy object is remembered for the
+    rest of the test run. A later call with the same search criteria, bus and
+    emulator base returns the same proxy object without searching the bus
+    again, as long as the connection it was found on is still on the bus and
+    the process that owns it is still running.
+
     **Exceptions possibly thrown by this function:**
 
     :raises ProcessSearchError: If no search criteria match.
@@ -153,7 +162,7 @@ def get_proxy_object_for_existing_process(**kwargs):
 
     """
     # Pop off non-search stuff.
-    dbus_bus = _get_dbus_bus_from_string(kwargs.pop('dbus_bus', 'session'))
+    dbus_string = kwargs.pop('dbus_bus', 'session')
     process = kwargs.pop('process', None)
     emulator_base = kwargs.pop('emulator_base', None)
 
@@ -164,24 +173,44 @@ def get_proxy_object_for_existing_process(**kwargs):
     if pid is not None:
         kwargs['pid'] = pid
 
-    matcher_function = _filter_function_from_search_params(kwargs)
-
-    connections = _find_matching_connections(
-        dbus_bus,
-        matcher_function,
-        process
-    )
+    dbus_bus = _get_dbus_bus_from_string(dbus_string)
+
+    # A process object is watched by the proxy object made for it, so a proxy
+    # object can't be shared by calls that pass one.
+    cache_key = None
+    if process is None:
+        cache_key = _get_proxy_cache_key(
+            dbus_string,
+            dbus_bus,
+            kwargs,
+            emulator_base
+        )
+    if cache_key is not None:
+        proxy = _proxy_objects.get(cache_key)
+        if proxy is not None:
+            return proxy
 
-    if pid is not None:
-        # Due to the filtering including children parents, if there exists a
-        # top-level pid, take that instead of any children that may have
-        # matched.
-        connections = _filter_parent_pids_from_children(
-            pid,
-            connections,
-            dbus_bus
+    matcher_function = _filter_function_from_search_params(kwargs)
+    interface_check = _interface_check_from_search_params(kwargs)
+
+    with _connection_details.caching(dbus_bus):
+        connections = _find_matching_connections(
+            dbus_bus,
+            matcher_function,
+            process,
+            interface_check
         )
 
+        if pid is not None:
+            # Due to the filtering including children parents, if there
+            # exists a top-level pid, take that instead of any children that
+            # may have matched.
+            connections = _filter_parent_pids_from_children(
+                pid,
+                connections,
+                dbus_bus
+            )
+
     _raise_if_not_single_result(
         connections,
         _get_search_criteria_string_representation(**kwargs)
@@ -189,10 +218,17 @@ def get_proxy_object_for_existing_process(**kwargs):
 
     object_path = kwargs['object_path']
     connection_name = connections[0]
-    return _make_proxy_object(
-        _get_dbus_address_object(connection_name, object_path, dbus_bus),
-        emulator_base
+    dbus_address = _get_dbus_address_object(
+        connection_name,
+        object_path,
+        dbus_bus
     )
+    if process is not None:
+        dbus_address.watch_process(process)
+    proxy = _make_proxy_object(dbus_address, emulator_base)
+    if cache_key is not None:
+        _proxy_objects.add(cache_key, proxy, dbus_bus, connection_name)
+    return proxy
 
 
 def get_proxy_object_for_existing_process_by_name(
@@ -218,9 +254,132 @@ def get_proxy_object_for_existing_process_by_name(
     )
 
 
+def get_proxy_object_for_tree(tree, emulator_base=None):
+    """Return a proxy object for the root of an introspection tree held in
+    memory, rather than in a running application.
+
+    Searches from the returned proxy object, and from the proxy objects it
+    returns, are answered from *tree* the same way an application would
+    answer them, so custom proxy classes and the code that uses them can be
+    unit tested without launching an application::
+
+        tree = {
+            'name': 'MyApp',
+            'state': {'id': [0, 1]},
+            'children': [
+                {'name': 'QPushButton',
+                 'state': {'id': [0, 2], 'text': [0, 'OK']}},
+            ],
+        }
+        app = get_proxy_object_for_tree(tree, emulator_base=MyEmulatorBase)
+        button = app.select_single('QPushButton', text='OK')
+
+    :param tree: A dictionary with 'name', 'state' and (optionally)
+        'children' keys. 'state' is the state dictionary of the object in
+        wire protocol format, and must contain an 'id' key. 'children' is a
+        list of dictionaries in the same format. This is plain data, so a
+        tree can be stored as JSON: see
+        :meth:`~autopilot.introspection.SubtreeSnapshot.to_dict`.
+
+    :param emulator_base: emulator base to use with the custom proxy object.
+
+    :raises ValueError: if *tree* is not in the right format.
+
+    :return: proxy object for the root of the tree.
+    """
+    backend = backends.InMemoryBackend(tree)
+    return _make_offline_proxy_object(
+        backend,
+        backend.root.path,
+        backend.root.state,
+        emulator_base
+    )
+
+
+def get_proxy_object_for_recording(filename, emulator_base=None,
+                                   timing=False, connection=None):
+    """Return a proxy object for the root of an application's introspection
+    tree, whose queries are answered from a recording of an earlier test
+    run rather than by the application.
+
+    Recordings are made with the ``--record-introspection`` option of
+    ``autopilot run``. Each query is answered with the replies the
+    application gave to the same query when it was recorded, in the same
+    order, so a test can be rerun without the application as long as it
+    makes the same queries.
+
+    :param filename: The name of the recording file.
+
+    :param emulator_base: emulator base to use with the custom proxy object.
+
+    :param timing: If True, each reply is delayed by as long as the
+        application took to send it when it was recorded.
+
+    :param connection: The DBus connection name of the application to
+        replay, if the recording holds the traffic of several applications.
+        Defaults to the first application recorded.
+
+    :raises ValueError: if *filename* is not an introspection recording, or
+        does not contain the root of the introspection tree for the
+        application.
+
+    :return: proxy object for the root of the recorded tree.
+    """
+    backend = backends.ReplayBackend(filename, timing, connection)
+    path, state = backend.get_root_state()
+    return _make_offline_proxy_object(backend, path, state, emulator_base)
+
+
+def _make_offline_proxy_object(backend, path, state, emulator_base):
+    """Return a proxy object for the root of a tree served by *backend*,
+    which is not connected to an application.
+
+    """
+    if emulator_base is None:
+        emulator_base = _make_default_emulator_base(backend)
+    _raise_if_base_class_not_actually_base(emulator_base)
+    # Keep any extension classes registered for an application that uses the
+    # same emulator base:
+    if not _object_registry._get_proxy_bases_for_id(emulator_base._id):
+        _object_registry.register_extension_classes_for_proxy_base(
+            emulator_base,
+            (),
+        )
+
+    path = path.encode('utf-8')
+    proxy_class = _object_registry._get_proxy_object_class(
+        emulator_base._id,
+        path,
+        state
+    )
+    return proxy_class(dict(state), path, backend)
+
+
+def _get_proxy_cache_key(dbus_string, dbus_bus, search_params,
+                         emulator_base):
+    """Return the key a proxy object found with *search_params* on *dbus_bus*
+    is cached under, or None if it can't be cached.
+
+    A custom bus is identified by its address. 'session' and 'system' are
+    not addresses, so the connection they resolved to is used instead: a
+    proxy object is never returned for a search of a different bus.
+
+    """
+    if dbus_string in ('session', 'system'):
+        bus_key = dbus_bus
+    else:
+        bus_key = dbus_string
+    try:
+        key = (bus_key, frozenset(search_params.items()), emulator_base)
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
 def _map_connection_to_pid(connection, dbus_bus):
     try:
-        return _get_bus_connections_pid(dbus_bus, connection)
+        return _connection_details.get_pid(dbus_bus, connection)
     except dbus.DBusException as e:
         logger.info(
             "dbus.DBusException while attempting to get PID for %s: %r" %
@@ -307,6 +466,33 @@ def _filter_lookup_map():
     )
 
 
+def _interface_check_from_search_params(search_params):
+    """Returns a 2 length tuple containing (object_path, connection_matcher)
+    describing the Autopilot interface check made by the search, or None if
+    the search doesn't make one.
+
+    connection_matcher takes the argument (dbus_tuple) and runs only the
+    filters that come before the interface check, so it tells which
+    connections the search would check for the Autopilot interface at
+    object_path.
+
+    """
+    if 'object_path' not in search_params:
+        return None
+    filters = _mandatory_filters() + _filters_from_search_parameters(
+        search_params
+    )
+    interface_priority = ConnectionHasPathWithAPInterface.priority()
+    earlier_filters = [
+        f for f in filters
+        if f.priority() > interface_priority
+    ]
+    return (
+        search_params['object_path'],
+        _filter_function_with_sorted_filters(earlier_filters, search_params)
+    )
+
+
 def _filters_from_search_parameters(parameters, filter_lookup=None):
     parameter_filter_lookup = filter_lookup or _filter_lookup_map()
     try:
@@ -359,7 +545,12 @@ def _filter_runner(filter_list, search_parameters, dbus_tuple):
     )
 
 
-def _find_matching_connections(bus, connection_matcher, process=None):
+def _find_matching_connections(
+        bus,
+        connection_matcher,
+        process=None,
+        interface_check=None
+):
     """Returns a list of connection names that have passed the
     connection_matcher.
 
@@ -371,13 +562,31 @@ def _find_matching_connections(bus, connection_matcher, process=None):
         dbus connection.
         Used to ensure that the process is in fact still running
         while we're searching for it.
+    :param interface_check: (optional) A 2 length tuple containing
+        (object_path, connection_matcher), as returned by
+        _interface_check_from_search_params. The connections that pass its
+        connection_matcher are checked for the Autopilot interface at
+        object_path all at once, before connection_matcher is run.
+
+    The bus is scanned again as soon as a new connection appears on it, as
+    well as after each poll interval, since an application can connect to
+    the bus before it exports the Autopilot interface.
 
     """
-    for _ in Timeout.default():
+    poller = Poller(float(get_default_timeout_period()))
+    while True:
         _get_child_pids.reset_cache()
         _raise_if_process_has_exited(process)
 
         connections = bus.list_names()
+        _connection_details.prefetch_pids(bus, connections)
+        if interface_check is not None:
+            object_path, interface_check_matcher = interface_check
+            _connection_details.prefetch_interfaces(
+                bus,
+                [c for c in connections if interface_check_matcher((bus, c))],
+                object_path
+            )
 
         valid_connections = [
             c for c
@@ -387,8 +596,9 @@ def _find_matching_connections(bus, connection_matcher, process=None):
 
         if len(valid_connections) >= 1:
             return _dedupe_connections_on_pid(valid_connections, bus)
-
-    return []
+        if poller.expired:
+            return []
+        poller.wait(partial(_connection_details.wait_for_new_connection, bus))
 
 
 def _raise_if_process_has_exited(process):
@@ -410,7 +620,7 @@ def _dedupe_connections_on_pid(valid_connections, bus):
     deduped_connections = []
 
     for connection in valid_connections:
-        pid = _get_bus_connections_pid(bus, connection)
+        pid = _connection_details.get_pid(bus, connection)
         if pid not in seen_pids:
             seen_pids.append(pid)
             deduped_connections.append(connection)
@@ -450,13 +660,17 @@ def _make_proxy_object(dbus_address, emulator_base):
     :param emulator_base: The emulator base object (or None), as provided by
         the user.
     """
+    backend = backends.Backend(dbus_address)
     # make sure we always have an emulator base. Either use the one the user
     # gave us, or make one:
-    emulator_base = emulator_base or _make_default_emulator_base()
+    if emulator_base is None:
+        emulator_base = _make_default_emulator_base(backend)
     _raise_if_base_class_not_actually_base(emulator_base)
 
-    # Get the dbus introspection Xml for the backend.
-    intro_xml = _get_introspection_xml_from_backend(dbus_address)
+    # Get the dbus introspection Xml and the state of the root of the tree
+    # from the backend.
+    intro_xml, (cls_name, path, cls_state) = \
+        _get_introspection_xml_and_root_details(dbus_address)
     try:
         # Figure out if the backend has any extension methods, and return
         # classes that understand how to use each of those extensions:
@@ -475,10 +689,6 @@ def _make_proxy_object(dbus_address, emulator_base):
         )
         raise e
 
-    cls_name, path, cls_state = _get_proxy_object_class_name_and_state(
-        dbus_address
-    )
-
     proxy_class = _object_registry._get_proxy_object_class(
         emulator_base._id,
         path,
@@ -488,12 +698,27 @@ def _make_proxy_object(dbus_address, emulator_base):
     # root of the tree. Ideally this would be nicer...
     if ApplicationProxyObject not in proxy_class.__bases__:
         proxy_class.__bases__ += (ApplicationProxyObject, )
-    return proxy_class(cls_state, path, backends.Backend(dbus_address))
+    return proxy_class(cls_state, path, backend)
 
 
-def _make_default_emulator_base():
-    """Make a default base class for all proxy classes to derive from."""
-    return type("DefaultEmulatorBase", (ap_dbus.DBusIntrospectionObject,), {})
+def _make_default_emulator_base(backend):
+    """Make a default base class for all proxy classes to derive from.
+
+    The base class, and the proxy classes generated for it, are removed from
+    the object registry once *backend* is garbage collected.
+
+    """
+    emulator_base = type(
+        "DefaultEmulatorBase",
+        (ap_dbus.DBusIntrospectionObject,),
+        {}
+    )
+    weakref.finalize(
+        backend,
+        _object_registry._forget_proxy_base,
+        emulator_base._id
+    )
+    return emulator_base
 
 
 WRONG_CPO_CLASS_MSG = '''\
@@ -562,9 +787,7 @@ def _make_proxy_object_async(
             path,
             cls_state
         )
-        reply_handler(
-            proxy_class(cls_state, path, backends.Backend(data_source))
-        )
+        reply_handler(proxy_class(cls_state, path, backend))
 
     # Phase 2: We recieve the introspection string, and make an asynchronous
     # dbus call to get the state information for the root of this applicaiton.
@@ -577,7 +800,9 @@ def _make_proxy_object_async(
 
     # Phase 1: Make an asynchronous dbus call to get the introspection xml
     # from the data_source provided for us.
-    emulator_base = emulator_base or _make_default_emulator_base()
+    backend = backends.Backend(data_source)
+    if emulator_base is None:
+        emulator_base = _make_default_emulator_base(backend)
 
     _get_introspection_xml_from_backend(
         data_source,
@@ -586,6 +811,35 @@ def _make_proxy_object_async(
     )
 
 
+def _get_introspection_xml_and_root_details(backend):
+    """Get the DBus Introspection xml from a backend, and details of the root
+    of its introspection tree.
+
+    Both dbus calls are made at once, so this takes a single round trip.
+
+    :returns: A tuple containing the introspection xml, and the tuple of
+        details returned by :func:`_get_proxy_object_class_name_and_state`.
+    :raises DBusException: if either dbus call fails.
+
+    """
+    replies = {}
+    errors = []
+    _get_introspection_xml_from_backend(
+        backend,
+        reply_handler=partial(replies.__setitem__, 'xml'),
+        error_handler=errors.append
+    )
+    _get_proxy_object_class_name_and_state(
+        backend,
+        reply_handler=lambda *details: replies.__setitem__('root', details),
+        error_handler=errors.append
+    )
+    backends._iterate_main_loop_until(lambda: errors or len(replies) == 2)
+    if errors:
+        raise errors[0]
+    return replies['xml'], replies['root']
+
+
 def _get_introspection_xml_from_backend(
         backend, reply_handler=None, error_handler=None):
     """Get DBus Introspection xml from a backend.
@@ -769,6 +1023,279 @@ class _cached_get_child_pids(object):
 _get_child_pids = _cached_get_child_pids()
 
 
+class _cached_connection_details(object):
+    """Get details of dbus connections that don't change while a connection
+    has the same owner.
+
+    A search scans the bus once a second until it finds the connection it's
+    looking for, and each scan checks every connection on the bus. Within a
+    'caching' block, the pid of each connection is only looked up once, and
+    the connections found to have the Autopilot interface are remembered, so
+    each scan only makes dbus calls for connections that are new, or that
+    haven't got the Autopilot interface yet. Those calls are made for all the
+    connections at once, rather than one connection at a time. The details
+    of a connection are forgotten when the bus reports (with
+    NameOwnerChanged) that its owner has changed.
+
+    Outside a 'caching' block, nothing is cached.
+
+    """
+
+    def __init__(self):
+        self._bus = None
+        self._pids = {}
+        self._interfaces = set()
+        self._missing_interfaces = set()
+        self._new_connection = False
+
+    @contextmanager
+    def caching(self, bus):
+        """Cache the details of connections on *bus* within the block."""
+        signal_match = bus.add_signal_receiver(
+            self._on_name_owner_changed,
+            signal_name='NameOwnerChanged',
+            dbus_interface='org.freedesktop.DBus',
+            bus_name='org.freedesktop.DBus',
+            path='/org/freedesktop/DBus'
+        )
+        self._bus = bus
+        try:
+            yield
+        finally:
+            signal_match.remove()
+            self._bus = None
+            self._pids = {}
+            self._interfaces = set()
+            self._missing_interfaces = set()
+            self._new_connection = False
+
+    def get_pid(self, bus, connection_name):
+        """Return the pid of the owner of *connection_name* on *bus*.
+
+        :raises DBusException: if the pid can't be found.
+
+        """
+        if bus is not self._bus:
+            return _get_bus_connections_pid(bus, connection_name)
+        try:
+            return self._pids[connection_name]
+        except KeyError:
+            pid = _get_bus_connections_pid(bus, connection_name)
+            self._pids[connection_name] = pid
+            return pid
+
+    def prefetch_pids(self, bus, connection_names):
+        """Look up the pids of all the connections in *connection_names*
+        whose pids aren't cached yet, in a single round trip.
+
+        Connections whose pids can't be found are left out of the cache, so
+        get_pid looks them up (and fails) again.
+
+        """
+        if bus is not self._bus:
+            return
+        # Signals that arrived while we weren't iterating the main loop may
+        # say some cached details are out of date:
+        backends._dispatch_pending_main_loop_events()
+        names = [n for n in connection_names if n not in self._pids]
+        if len(names) < 2:
+            return
+
+        bus_iface = dbus.Interface(
+            bus.get_object('org.freedesktop.DBus', '/org/freedesktop/DBus'),
+            'org.freedesktop.DBus'
+        )
+        pending = set(names)
+
+        def reply_handler(name, pid):
+            self._pids[name] = pid
+            pending.discard(name)
+
+        def error_handler(name, error):
+            pending.discard(name)
+
+        for name in names:
+            bus_iface.GetConnectionUnixProcessID(
+                name,
+                reply_handler=partial(reply_handler, name),
+                error_handler=partial(error_handler, name)
+            )
+        backends._iterate_main_loop_until(lambda: not pending)
+
+    def prefetch_interfaces(self, bus, connection_names, object_path):
+        """Check whether the connections in *connection_names* have the
+        Autopilot interface at *object_path*, sending the calls for all of
+        them at once.
+
+        Connections already known to have the interface aren't called. The
+        connections found not to have the interface are remembered until the
+        next prefetch, since an application can export the Autopilot
+        interface some time after it connects to the bus.
+
+        """
+        if bus is not self._bus:
+            return
+        self._missing_interfaces = set()
+        probes = {
+            (name, object_path) for name in connection_names
+            if (name, object_path) not in self._interfaces
+        }
+        if len(probes) < 2:
+            return
+
+        pending = set(probes)
+
+        def reply_handler(probe, version):
+            self._interfaces.add(probe)
+            pending.discard(probe)
+
+        def error_handler(probe, error):
+            self._missing_interfaces.add(probe)
+            pending.discard(probe)
+
+        for probe in probes:
+            name, path = probe
+            try:
+                iface = dbus.Interface(
+                    bus.get_object(name, path),
+                    'com.canonical.Autopilot.Introspection'
+                )
+                iface.GetVersion(
+                    reply_handler=partial(reply_handler, probe),
+                    error_handler=partial(error_handler, probe)
+                )
+            except dbus.DBusException as e:
+                error_handler(probe, e)
+        backends._iterate_main_loop_until(lambda: not pending)
+
+    def lacks_interface(self, bus, connection_name, object_path):
+        """Return True if *connection_name* on *bus* was found not to have
+        the Autopilot interface at *object_path* by the last prefetch.
+
+        """
+        return (
+            bus is self._bus
+            and (connection_name, object_path) in self._missing_interfaces
+        )
+
+    def has_interface(self, bus, connection_name, object_path):
+        """Return True if *connection_name* on *bus* is known to have the
+        Autopilot interface at *object_path*.
+
+        """
+        return (
+            bus is self._bus
+            and (connection_name, object_path) in self._interfaces
+        )
+
+    def add_interface(self, bus, connection_name, object_path):
+        """Remember that *connection_name* on *bus* has the Autopilot
+        interface at *object_path*.
+
+        """
+        if bus is self._bus:
+            self._interfaces.add((connection_name, object_path))
+
+    def wait_for_new_connection(self, bus, timeout):
+        """Wait until a new connection appears on *bus*, or *timeout* seconds
+        pass.
+
+        Outside a 'caching' block for *bus*, this just sleeps for *timeout*
+        seconds.
+
+        :returns: The number of seconds waited.
+
+        """
+        if bus is not self._bus:
+            sleep(timeout)
+            return timeout
+        waited = backends._iterate_main_loop_until_or_timeout(
+            lambda: self._new_connection,
+            timeout
+        )
+        self._new_connection = False
+        return waited
+
+    def _on_name_owner_changed(self, name, old_owner, new_owner):
+        if new_owner:
+            self._new_connection = True
+        self._pids.pop(name, None)
+        self._interfaces = {
+            (n, path) for n, path in self._interfaces if n != name
+        }
+        self._missing_interfaces = {
+            (n, path) for n, path in self._missing_interfaces if n != name
+        }
+
+
+_connection_details = _cached_connection_details()
+
+
+class _cached_proxy_objects(object):
+    """Root proxy objects for processes that have already been found.
+
+    Tests often attach to the same long-lived process, such as a shell or a
+    system service, in every test. Finding it again means searching the bus,
+    introspecting the connection, registering its extension classes and
+    fetching the root of its tree. Instead, the proxy object is cached, and
+    returned while the unique name of the connection it was made for is still
+    on the bus and the pid that owned it is still running. Unique names are
+    never reused on a bus, so the cached proxy object can't belong to a
+    different process.
+
+    """
+
+    def __init__(self):
+        self._proxies = {}
+
+    def get(self, key):
+        """Return the proxy object cached under *key*, or None if there
+        isn't one or its process has gone away.
+
+        """
+        try:
+            proxy, bus, unique_name, pid = self._proxies[key]
+        except KeyError:
+            return None
+        try:
+            still_running = (
+                _pid_is_running(pid) and bus.name_has_owner(unique_name)
+            )
+        except dbus.DBusException:
+            still_running = False
+        if not still_running:
+            del self._proxies[key]
+            return None
+        return proxy
+
+    def add(self, key, proxy, bus, connection_name):
+        """Cache *proxy*, which was made for *connection_name* on *bus*,
+        under *key*.
+
+        Nothing is cached if the owner of the connection can't be found.
+        Proxy objects for processes that are no longer running are dropped,
+        so the cache doesn't keep every application a test run launches.
+
+        """
+        self._proxies = {
+            k: v for k, v in self._proxies.items() if _pid_is_running(v[3])
+        }
+        try:
+            unique_name = bus.get_name_owner(connection_name)
+            pid = _connection_details.get_pid(bus, unique_name)
+        except dbus.DBusException as e:
+            logger.info(
+                "Not caching proxy object for %s: %r", connection_name, e)
+            return
+        self._proxies[key] = (proxy, bus, unique_name, pid)
+
+    def reset_cache(self):
+        self._proxies = {}
+
+
+_proxy_objects = _cached_proxy_objects()
+
+
 # Filters
 
 class ConnectionIsNotOrgFreedesktopDBus(object):
@@ -799,7 +1326,7 @@ class ConnectionIsNotOurConnection(object):
     def matches(cls, dbus_tuple, params):
         try:
             bus, connection_name = dbus_tuple
-            bus_pid = _get_bus_connections_pid(bus, connection_name)
+            bus_pid = _connection_details.get_pid(bus, connection_name)
             return bus_pid != os.getpid()
         except dbus.DBusException:
             return False
@@ -849,7 +1376,7 @@ class ConnectionHasPid(object):
         bus, connection_name = dbus_tuple
 
         try:
-            bus_pid = _get_bus_connections_pid(bus, connection_name)
+            bus_pid = _connection_details.get_pid(bus, connection_name)
         except dbus.DBusException as e:
             logger.info(
                 "dbus.DBusException while attempting to get PID for %s: %r" %
@@ -879,11 +1406,16 @@ class ConnectionHasPathWithAPInterface(object):
         try:
             bus, connection_name = dbus_tuple
             path = params['object_path']
+            if _connection_details.has_interface(bus, connection_name, path):
+                return True
+            if _connection_details.lacks_interface(bus, connection_name, path):
+                return False
             obj = bus.get_object(connection_name, path)
             dbus.Interface(
                 obj,
                 'com.canonical.Autopilot.Introspection'
             ).GetVersion()
+            _connection_details.add_interface(bus, connection_name, path)
             return True
         except dbus.DBusException:
             return False
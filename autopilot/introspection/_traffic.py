@@ -0,0 +1,208 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Record the introspection queries autopilot sends, and the replies it gets.
+
+This is an internal module, and should not be used directly.
+
+While a recording is running, every GetState call made through a Backend is
+written to the recording file. The file can then be replayed offline with
+autopilot.introspection.backends.ReplayBackend.
+
+A recording file is a sequence of JSON documents, one per line. The first
+line is a header::
+
+    {"format": "autopilot-introspection-recording", "version": 1, ...}
+
+Every following line records one query::
+
+    {"time": 1.25, "duration": 0.004, "connection": ":1.42",
+     "query": "/App/Window[id=2]",
+     "reply": [["/App/Window", {"id": [0, 2], ...}]]}
+
+'time' is the number of seconds between the start of the recording and the
+query being sent, and 'duration' is the number of seconds the application
+took to reply. 'connection' is the DBus connection name of the application
+the query was sent to, so the traffic of several applications can be told
+apart. Queries that only asked for some of the properties of each object
+have a 'properties' key too, with the list of property names. Byte array
+values are written as {"__bytes__": "<base64>"}. Files whose names end in
+'.gz' are compressed with gzip.
+
+"""
+
+import base64
+import gzip
+import json
+import logging
+from time import monotonic, time
+
+_logger = logging.getLogger(__name__)
+
+RECORDING_FORMAT = 'autopilot-introspection-recording'
+RECORDING_FORMAT_VERSION = 1
+
+_recorder = None
+
+
+class TrafficRecorder(object):
+
+    """Write introspection queries and their replies to a file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = _open_recording(filename, 'wt')
+        self._started = monotonic()
+        self._write(dict(
+            format=RECORDING_FORMAT,
+            version=RECORDING_FORMAT_VERSION,
+            started=time(),
+        ))
+
+    def record(self, query, reply, started, duration, properties=None,
+               connection=None):
+        """Record a single query.
+
+        :param query: The query sent to the application, as bytes.
+        :param reply: The reply, as a list of (path, state) pairs made of
+            plain Python types.
+        :param started: The monotonic() time the query was sent.
+        :param duration: The number of seconds the reply took.
+        :param properties: The properties the query asked for, if it didn't
+            ask for all of them.
+        :param connection: The DBus connection name of the application.
+
+        """
+        entry = dict(
+            time=round(started - self._started, 6),
+            duration=round(duration, 6),
+            query=query.decode('utf-8'),
+            reply=reply,
+        )
+        if connection is not None:
+            entry['connection'] = connection
+        if properties is not None:
+            entry['properties'] = list(properties)
+        self._write(entry)
+
+    def close(self):
+        self._file.close()
+
+    def _write(self, document):
+        self._file.write(json.dumps(
+            document,
+            separators=(',', ':'),
+            default=encode_json_value
+        ))
+        self._file.write('\n')
+
+
+def start_recording(filename):
+    """Start recording introspection traffic to *filename*.
+
+    Any recording already running is stopped first.
+
+    """
+    global _recorder
+    stop_recording()
+    _logger.info("Recording introspection traffic to %s", filename)
+    _recorder = TrafficRecorder(filename)
+
+
+def stop_recording():
+    """Stop recording introspection traffic, if a recording is running."""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+def get_recorder():
+    """Return the running TrafficRecorder, or None."""
+    return _recorder
+
+
+def read_recording(filename):
+    """Return the list of queries recorded in *filename*.
+
+    Each query is a dictionary with 'time', 'duration', 'query' and 'reply'
+    keys, and perhaps 'connection' and 'properties' keys, as described in the
+    module docstring.
+
+    :raises ValueError: if *filename* is not a recording autopilot
+        understands.
+
+    """
+    with _open_recording(filename, 'rt') as f:
+        lines = f.read().splitlines()
+    try:
+        header = json.loads(lines[0])
+        entries = [
+            json.loads(line, object_hook=decode_json_object)
+            for line in lines[1:] if line
+        ]
+    except (IndexError, ValueError):
+        raise ValueError(
+            "%s is not an introspection recording." % filename
+        )
+    if (
+        not isinstance(header, dict)
+        or header.get('format') != RECORDING_FORMAT
+    ):
+        raise ValueError(
+            "%s is not an introspection recording." % filename
+        )
+    if header.get('version') != RECORDING_FORMAT_VERSION:
+        raise ValueError(
+            "%s is version %r of the introspection recording format, but "
+            "only version %d is supported."
+            % (filename, header.get('version'), RECORDING_FORMAT_VERSION)
+        )
+    return entries
+
+
+def encode_json_value(value):
+    """Return a JSON serializable version of *value*, for the 'default'
+    argument of json.dumps. Byte arrays are encoded as described in the
+    module docstring.
+
+    :raises TypeError: if *value* can't be serialized.
+
+    """
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(
+        "Object of type %s is not JSON serializable" % type(value).__name__
+    )
+
+
+def decode_json_object(document):
+    """Decode byte arrays encoded by encode_json_value, for the
+    'object_hook' argument of json.loads.
+
+    """
+    if list(document) == ['__bytes__']:
+        return base64.b64decode(document['__bytes__'])
+    return document
+
+
+def _open_recording(filename, mode):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode, encoding='utf-8')
+    return open(filename, mode[0], encoding='utf-8')
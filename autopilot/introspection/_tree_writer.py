@@ -0,0 +1,157 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Write introspection trees to streams, for ProxyBase.print_tree.
+
+This is an internal module, and should not be used directly.
+
+Three formats are supported:
+
+'text'
+    A human readable listing of each object's path and properties, indented
+    by depth.
+
+'json'
+    One JSON document per line for each object, with 'path', 'depth' and
+    'state' keys. 'state' is the state dictionary in wire protocol format,
+    with byte arrays encoded as {"__bytes__": "<base64>"}. If the children of
+    an object couldn't be fetched, it is followed by a document with 'path',
+    'depth' and 'error' keys.
+
+'binary'
+    The 'json' format, compressed with gzip.
+
+Objects are written one at a time, in the order they're given, so a tree
+can be written as it's fetched from the application without holding all of
+it in memory.
+
+"""
+
+from contextlib import contextmanager
+import gzip
+import io
+import json
+import logging
+import sys
+
+from autopilot.introspection import _traffic
+from autopilot.introspection.types import create_value_instance
+from autopilot.introspection.utilities import translate_state_keys
+
+_logger = logging.getLogger(__name__)
+
+
+TREE_FORMATS = ('text', 'json', 'binary')
+
+
+def write_tree(objects, output=None, format='text'):
+    """Write the objects in a tree to *output*.
+
+    :param objects: An iterable of (path, state, depth) tuples, one for each
+        object, depth first. 'state' is the state dictionary in wire protocol
+        format, with plain Python values, and 'depth' is the depth below the
+        first object. If the children of an object couldn't be fetched, it
+        is followed by a tuple whose 'state' is the exception raised.
+    :param output: A file object or path name. If not given, write to stdout.
+        A path is opened and closed again once the tree is written. A file
+        object is left open. For the 'binary' format, a file object must be
+        opened in binary mode.
+    :param format: One of TREE_FORMATS.
+    :raises ValueError: if *format* is not supported.
+
+    """
+    check_tree_format(format)
+    write_node = _write_text_node if format == 'text' else _write_json_node
+    with _open_output(output, format) as stream:
+        for path, state, depth in objects:
+            write_node(stream, path, state, depth)
+
+
+def check_tree_format(format):
+    """Raise ValueError if *format* is not one of TREE_FORMATS."""
+    if format not in TREE_FORMATS:
+        raise ValueError(
+            "Unknown tree format %r, must be one of %s."
+            % (format, ', '.join(TREE_FORMATS))
+        )
+
+
+@contextmanager
+def _open_output(output, format):
+    if format == 'binary':
+        if output is None:
+            output = sys.stdout.buffer
+        if isinstance(output, str):
+            compressed = gzip.open(output, 'wb')
+        else:
+            # Closing the GzipFile flushes it, without closing 'output':
+            compressed = gzip.GzipFile(fileobj=output, mode='wb')
+        with io.TextIOWrapper(compressed, encoding='utf-8') as stream:
+            yield stream
+    elif output is None:
+        yield sys.stdout
+    elif isinstance(output, str):
+        with open(output, 'w', encoding='utf-8') as stream:
+            yield stream
+    else:
+        yield output
+
+
+def _write_text_node(stream, path, state, depth):
+    indent = "  " * depth
+    if isinstance(state, Exception):
+        stream.write("%sError: %s\n" % (indent, state))
+        return
+    if depth > 0:
+        stream.write("\n")
+    stream.write("%s== %s ==\n" % (indent, path))
+    properties = _decode_state(path, state)
+    for key in sorted(properties.keys()):
+        stream.write("%s%s: %r\n" % (indent, key, properties[key]))
+
+
+def _write_json_node(stream, path, state, depth):
+    if isinstance(state, Exception):
+        document = dict(path=path, depth=depth, error=str(state))
+    else:
+        document = dict(path=path, depth=depth, state=state)
+    stream.write(json.dumps(
+        document,
+        separators=(',', ':'),
+        default=_traffic.encode_json_value
+    ))
+    stream.write("\n")
+
+
+def _decode_state(path, state):
+    properties = {}
+    for key, value in translate_state_keys(state).items():
+        if key == 'id':
+            continue
+        try:
+            properties[key] = create_value_instance(value, None, key)
+        except ValueError as e:
+            _logger.warning(
+                "While constructing attribute '%s.%s': %s",
+                path.rsplit('/', 1)[-1],
+                key,
+                str(e)
+            )
+    properties['id'] = int(state['id'][1])
+    return properties
@@ -43,12 +43,28 @@ the server side. Query instnaces are intelligent enough to know when they must
 invoke some client-side processing - in this case the
 'needs_client_side_filtering' method will return True.
 
+Servers that speak wire protocol version 1.5 or later understand an extended
+filter grammar, which supports floats, UTF-8 strings, compound values and the
+'!=', '<' and '>' operators. The 'server_query_bytes',
+'needs_client_side_filtering' and 'get_client_side_filters' methods all accept
+an 'extended_filters' argument, which moves the filters that only the extended
+grammar can express from the client-side to the server-side.
+
 Queries are executed in the autopilot.introspection.backends module.
 
 """
+import math
 from pathlib import Path
 import re
 
+from testtools.matchers import (
+    Equals,
+    GreaterThan,
+    LessThan,
+    MatchesAll,
+    Not,
+)
+
 from autopilot.utilities import compatible_repr
 from autopilot.exceptions import InvalidXPathQuery
 
@@ -148,11 +164,12 @@ class Query(object):
             )
 
     @staticmethod
-    def root(app_name):
+    def root(app_name, filters={}):
         """Create a root query object.
 
         :param app_name: The name of the root node in the introspection tree.
             This is also typically the application name.
+        :param filters: A dictionary of filters the root node must match.
 
         :returns: A new Query instance, representing the root of the tree.
         """
@@ -160,7 +177,8 @@ class Query(object):
         return Query(
             None,
             Query.Operation.ROOT,
-            app_name
+            app_name,
+            filters
         )
 
     @staticmethod
@@ -228,50 +246,65 @@ class Query(object):
         child_name = _try_encode_type_name(child_name)
         return Query(None, Query.Operation.DESCENDANT, child_name, filters)
 
-    def needs_client_side_filtering(self):
+    def needs_client_side_filtering(self, extended_filters=False):
         """Return true if this query requires some filtering on the client-side
+
+        :param extended_filters: Whether the server supports the extended
+            filter grammar.
+
         """
-        return self._client_filters or (
-            self._parent.needs_client_side_filtering()
+        return bool(self.get_client_side_filters(extended_filters)) or (
+            self._parent.needs_client_side_filtering(extended_filters)
             if self._parent else False
         )
 
-    def get_client_side_filters(self):
+    def get_client_side_filters(self, extended_filters=False):
         """Return a dictionary of filters that must be processed on the client
         rather than the server.
+
+        :param extended_filters: Whether the server supports the extended
+            filter grammar.
+
         """
-        return self._client_filters
+        if not extended_filters:
+            return self._client_filters
+        return {
+            k: v for k, v in self._client_filters.items()
+            if _get_extended_filter_terms(k, v) is None
+        }
 
-    def server_query_bytes(self):
+    def server_query_bytes(self, extended_filters=False):
         """Get a bytestring representing the entire query.
 
         This method returns a bytestring suitable for sending to the server.
+
+        :param extended_filters: Whether the server supports the extended
+            filter grammar. If it does, filters that only the extended grammar
+            can express are included in the query.
+
         """
-        parent_query = self._parent.server_query_bytes() \
+        parent_query = \
+            self._parent.server_query_bytes(extended_filters) \
             if self._parent is not None else b''
 
         return parent_query + \
             self._operation + \
             self._query + \
-            self._get_server_filter_bytes()
-
-    def _get_server_filter_bytes(self):
-        if self._server_filters:
-            keys = sorted(self._server_filters.keys())
-            return b'[' + \
-                b",".join(
-                    [
-                        _get_filter_string_for_key_value_pair(
-                            k,
-                            self._server_filters[k]
-                        ) for k in keys
-                        if _is_valid_server_side_filter_param(
-                            k,
-                            self._server_filters[k]
-                        )
-                    ]
-                ) + \
-                b']'
+            self._get_server_filter_bytes(extended_filters)
+
+    def _get_server_filter_bytes(self, extended_filters=False):
+        terms = [
+            _get_filter_string_for_key_value_pair(k, self._server_filters[k])
+            for k in sorted(self._server_filters.keys())
+        ]
+        if extended_filters:
+            for k in sorted(self._client_filters.keys()):
+                terms.extend(
+                    _get_extended_filter_terms(k, self._client_filters[k])
+                    or []
+                )
+        if terms:
+            return b'[' + b",".join(terms) + b']'
         return b''
 
     @compatible_repr
@@ -337,15 +370,19 @@ def _try_encode_type_name(name):
     return name
 
 
+def _is_valid_filter_key(key):
+    return re.match(
+        r'^[a-zA-Z0-9_\-]+( [a-zA-Z0-9_\-])*$',
+        key
+    ) is not None
+
+
 def _is_valid_server_side_filter_param(key, value):
     """Return True if the key and value parameters are valid for server-side
     processing.
 
     """
-    key_is_valid = re.match(
-        r'^[a-zA-Z0-9_\-]+( [a-zA-Z0-9_\-])*$',
-        key
-    ) is not None
+    key_is_valid = _is_valid_filter_key(key)
 
     if type(value) == int:
         return key_is_valid and (-2**31 <= value <= 2**31 - 1)
@@ -391,6 +428,92 @@ def _get_filter_string_for_key_value_pair(key, value):
         )
 
 
+def _get_extended_filter_terms(key, value):
+    """Return a list of filter terms (as bytes) that express the filter for
+    this key/value pair in the extended filter grammar.
+
+    As well as plain values, *value* may be a GreaterThan, LessThan or
+    Not(Equals(...)) matcher, or a MatchesAll combining those, which are
+    expressed with the '>', '<' and '!=' operators.
+
+    :returns: A list of bytes, or None if the filter cannot be expressed in
+        the extended grammar.
+
+    """
+    if not _is_valid_filter_key(key):
+        return None
+    key = key.encode('utf-8')
+    value_bytes = _get_extended_filter_value_bytes(value)
+    if value_bytes is not None:
+        return [key + b'=' + value_bytes]
+
+    if isinstance(value, MatchesAll):
+        terms = []
+        for matcher in value.matchers:
+            matcher_terms = _get_extended_filter_terms(
+                key.decode('utf-8'),
+                matcher
+            )
+            if matcher_terms is None:
+                return None
+            terms.extend(matcher_terms)
+        return terms or None
+
+    if isinstance(value, (GreaterThan, LessThan)):
+        if not _is_number(value.expected):
+            return None
+        operator = b'>' if isinstance(value, GreaterThan) else b'<'
+        return [key + operator + _get_number_bytes(value.expected)]
+
+    if isinstance(value, Not) and isinstance(value.matcher, Equals):
+        value_bytes = _get_extended_filter_value_bytes(value.matcher.expected)
+        if value_bytes is not None:
+            return [key + b'!=' + value_bytes]
+    return None
+
+
+def _get_extended_filter_value_bytes(value):
+    """Return bytes representing *value* in the extended filter grammar, or
+    None if it cannot be represented.
+
+    """
+    if isinstance(value, bool):
+        return repr(value).encode('utf-8')
+    if _is_number(value):
+        return _get_number_bytes(value)
+    if isinstance(value, bytes):
+        try:
+            value = value.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+    if isinstance(value, str):
+        escaped_value = value.replace('\\', '\\\\').replace('"', '\\"')
+        return b'"' + escaped_value.encode('utf-8') + b'"'
+    if (
+        isinstance(value, (list, tuple))
+        and value
+        and all(_is_number(v) for v in value)
+    ):
+        return b'[' + b','.join(_get_number_bytes(v) for v in value) + b']'
+    return None
+
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -2**63 <= value <= 2**63 - 1
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return False
+
+
+def _get_number_bytes(value):
+    if isinstance(value, int):
+        return str(int(value)).encode('utf-8')
+    return repr(float(value)).encode('utf-8')
+
+
 def _get_node(object_path, index):
     # TODO: Find places where paths are strings, and convert them to
     # bytestrings. Figure out what to do with the whole string vs. bytestring
@@ -31,9 +31,18 @@ class, and contains code that turns a query object into proxy classes.
 
 """
 
-from collections import namedtuple
+import asyncio
+from collections import defaultdict, deque, namedtuple
+from functools import lru_cache, partial
 import dbus
+import inspect
 import logging
+import re
+import threading
+from time import monotonic
+import weakref
+
+from gi.repository import GLib
 
 from autopilot.dbus_handler import (
     get_session_bus,
@@ -42,20 +51,34 @@ from autopilot.dbus_handler import (
 )
 from autopilot.introspection.constants import (
     AP_INTROSPECTION_IFACE,
+    CHANGE_NOTIFICATIONS_WIRE_PROTOCOL_VERSION,
     CURRENT_WIRE_PROTOCOL_VERSION,
     DBUS_INTROSPECTION_IFACE,
+    EXTENDED_FILTERS_WIRE_PROTOCOL_VERSION,
+    PROPERTY_PROJECTION_WIRE_PROTOCOL_VERSION,
     QT_AUTOPILOT_IFACE,
+    SUPPORTED_WIRE_PROTOCOL_VERSIONS,
+)
+from autopilot.exceptions import StateNotFoundError
+from autopilot.utilities import Timer, sleep
+from autopilot.introspection import (
+    _query_engine,
+    _traffic,
+    _xpathselect as xpathselect,
 )
-from autopilot.utilities import Timer
+from autopilot.introspection.types import create_value_instance
 from autopilot.introspection.utilities import (
     _pid_is_running,
     _get_bus_connections_pid,
+    translate_state_keys,
 )
 from autopilot.introspection._object_registry import _get_proxy_object_class
 
 
 _logger = logging.getLogger(__name__)
 
+_REGEX_TYPE = type(re.compile(''))
+
 
 class WireProtocolVersionMismatch(RuntimeError):
     """Wire protocols mismatch."""
@@ -65,6 +88,7 @@ class DBusAddress(object):
     """Store information about an Autopilot dbus backend, from keyword
     arguments."""
     _checked_backends = []
+    _backend_versions = {}
 
     AddrTuple = namedtuple(
         'AddressTuple', ['bus', 'connection', 'object_path'])
@@ -105,6 +129,21 @@ class DBusAddress(object):
         # created at module import time, at which point the bus backend
         # probably does not exist yet.
         self._addr_tuple = DBusAddress.AddrTuple(bus, connection, object_path)
+        self._proxy_obj = None
+        self._introspection_iface = None
+        self._name_owner_watched = False
+        self._name_has_owner = True
+        self._process = None
+
+    def watch_process(self, process):
+        """Use *process* to detect when the application has exited.
+
+        :param process: The subprocess.Popen object of the application this
+            address belongs to. Checking whether it has exited is much cheaper
+            than asking the dbus daemon.
+
+        """
+        self._process = process
 
     @property
     def introspection_iface(self):
@@ -113,43 +152,143 @@ class DBusAddress(object):
         if not isinstance(self._addr_tuple.object_path, str):
             raise TypeError("Object name must be a string")
 
-        if not self._check_pid_running():
+        if not self._backend_is_alive():
             raise RuntimeError(
                 "Lost dbus backend communication. It appears the "
                 "application under test exited before the test "
                 "finished!"
             )
 
-        proxy_obj = self._addr_tuple.bus.get_object(
+        if self._introspection_iface is None:
+            iface = dbus.Interface(
+                self._get_proxy_object(),
+                AP_INTROSPECTION_IFACE
+            )
+            if self._addr_tuple not in DBusAddress._checked_backends:
+                try:
+                    version = self._check_version(iface)
+                except WireProtocolVersionMismatch:
+                    raise
+                else:
+                    DBusAddress._checked_backends.append(self._addr_tuple)
+                    DBusAddress._backend_versions[self._addr_tuple] = version
+            self._introspection_iface = iface
+        return self._introspection_iface
+
+    @property
+    def supports_extended_filters(self):
+        """True if the application understands the extended attribute filter
+        grammar.
+
+        This is only known once the wire protocol version has been checked,
+        which happens the first time introspection_iface is used.
+
+        """
+        return self._wire_protocol_version_is_at_least(
+            EXTENDED_FILTERS_WIRE_PROTOCOL_VERSION
+        )
+
+    @property
+    def supports_change_notifications(self):
+        """True if the application can notify autopilot of state changes.
+
+        This is only known once the wire protocol version has been checked,
+        which happens the first time introspection_iface is used.
+
+        """
+        return self._wire_protocol_version_is_at_least(
+            CHANGE_NOTIFICATIONS_WIRE_PROTOCOL_VERSION
+        )
+
+    @property
+    def supports_property_projection(self):
+        """True if the application can leave properties autopilot did not ask
+        for out of the state it returns.
+
+        This is only known once the wire protocol version has been checked,
+        which happens the first time introspection_iface is used.
+
+        """
+        return self._wire_protocol_version_is_at_least(
+            PROPERTY_PROJECTION_WIRE_PROTOCOL_VERSION
+        )
+
+    def _wire_protocol_version_is_at_least(self, minimum_version):
+        version = DBusAddress._backend_versions.get(self._addr_tuple)
+        if version is None:
+            return False
+        return _parse_version(version) >= _parse_version(minimum_version)
+
+    def _get_proxy_object(self):
+        if self._proxy_obj is None:
+            self._proxy_obj = self._addr_tuple.bus.get_object(
+                self._addr_tuple.connection,
+                self._addr_tuple.object_path
+            )
+        return self._proxy_obj
+
+    def _backend_is_alive(self):
+        """Return True if the application behind this address is running.
+
+        The first call checks with the dbus daemon, and then subscribes to
+        NameOwnerChanged for the connection, so later calls only need to look
+        at signals that have already arrived.
+
+        """
+        if self._process is not None and self._process.poll() is not None:
+            return False
+        if not self._name_owner_watched:
+            if not self._check_pid_running():
+                return False
+            self._watch_name_owner()
+        else:
+            _dispatch_pending_main_loop_events()
+        return self._name_has_owner
+
+    def _watch_name_owner(self):
+        # The bus keeps a reference to the callback for as long as the watch
+        # exists, so only hold a weak reference to ourselves, and cancel the
+        # watch once we've been garbage collected.
+        address_ref = weakref.ref(self)
+
+        def on_name_owner_changed(new_owner):
+            address = address_ref()
+            if address is not None:
+                address._on_name_owner_changed(new_owner)
+
+        watch = self._addr_tuple.bus.watch_name_owner(
             self._addr_tuple.connection,
-            self._addr_tuple.object_path
+            on_name_owner_changed
         )
-        iface = dbus.Interface(proxy_obj, AP_INTROSPECTION_IFACE)
-        if self._addr_tuple not in DBusAddress._checked_backends:
-            try:
-                self._check_version(iface)
-            except WireProtocolVersionMismatch:
-                raise
-            else:
-                DBusAddress._checked_backends.append(self._addr_tuple)
-        return iface
+        weakref.finalize(self, watch.cancel)
+        self._name_owner_watched = True
+
+    def _on_name_owner_changed(self, new_owner):
+        # Proxy objects are bound to the owner of the name when they're
+        # created, so they cannot be reused once the owner changes.
+        self._proxy_obj = None
+        self._introspection_iface = None
+        self._name_has_owner = bool(new_owner)
 
     def _check_version(self, iface):
         """Check the wire protocol version on 'iface', and raise an error if
-        the version does not match what we were expecting.
+        the version is not one we support.
+
+        :returns: The wire protocol version.
 
         """
         try:
             version = iface.GetVersion()
         except dbus.DBusException:
             version = "1.2"
-        if version != CURRENT_WIRE_PROTOCOL_VERSION:
+        if version not in SUPPORTED_WIRE_PROTOCOL_VERSIONS:
             raise WireProtocolVersionMismatch(
                 "Wire protocol mismatch at %r: is %s, expecting %s" % (
                     self,
                     version,
                     CURRENT_WIRE_PROTOCOL_VERSION)
             )
+        return version
 
     def _check_pid_running(self):
         try:
@@ -167,19 +306,14 @@ class DBusAddress(object):
 
     @property
     def dbus_introspection_iface(self):
-        dbus_object = self._addr_tuple.bus.get_object(
-            self._addr_tuple.connection,
-            self._addr_tuple.object_path
+        return dbus.Interface(
+            self._get_proxy_object(),
+            DBUS_INTROSPECTION_IFACE
         )
-        return dbus.Interface(dbus_object, DBUS_INTROSPECTION_IFACE)
 
     @property
     def qt_introspection_iface(self):
-        proxy_obj = self._addr_tuple.bus.get_object(
-            self._addr_tuple.connection,
-            self._addr_tuple.object_path
-        )
-        return dbus.Interface(proxy_obj, QT_AUTOPILOT_IFACE)
+        return dbus.Interface(self._get_proxy_object(), QT_AUTOPILOT_IFACE)
 
     def __hash__(self):
         return hash(self._addr_tuple)
@@ -213,59 +347,467 @@ class Backend(object):
 
     """A Backend object that works with an ipc address interface.
 
+    All the proxy objects created by a backend share it, and the backend keeps
+    a weak reference to each of them, so querying for an object that already
+    has a proxy updates and returns that proxy instead of making a new one.
+
     Will raise a RunTimeError if the dbus backend communication is lost."""
 
     def __init__(self, ipc_address):
         self.ipc_address = ipc_address
+        self._proxies = weakref.WeakValueDictionary()
+
+    def execute_query_get_data(self, query, properties=None):
+        """Execute 'query', return the raw dbus reply.
+
+        :param properties: If given, a list of the names of the properties
+            to return for each object. The 'id' property is always returned.
+            Applications that can't leave the other properties out of their
+            reply (wire protocol versions before 1.7) return them all, and
+            they're removed here instead.
 
-    def execute_query_get_data(self, query):
-        """Execute 'query', return the raw dbus reply."""
+        """
         with Timer("GetState %r" % query):
             try:
-                data = self.ipc_address.introspection_iface.GetState(
-                    query.server_query_bytes()
+                iface = self.ipc_address.introspection_iface
+                query_bytes = query.server_query_bytes(
+                    self._extended_filters()
+                )
+                method, args = self._get_state_call(
+                    iface,
+                    query_bytes,
+                    properties
                 )
+                started = monotonic()
+                data = method(*args)
             except dbus.DBusException as e:
-                desired_exception = 'org.freedesktop.DBus.Error.ServiceUnknown'
-                if e.get_dbus_name() != desired_exception:
-                    raise
-                else:
-                    raise RuntimeError(
-                        "Lost dbus backend communication. It appears the "
-                        "application under test exited before the test "
-                        "finished!"
-                    )
-            if len(data) > 15:
-                _logger.warning(
-                    "Your query '%r' returned a lot of data (%d items). This "
-                    "is likely to be slow. You may want to consider optimising"
-                    " your query to return fewer items.",
+                _raise_if_backend_lost(e)
+                raise
+            _record_reply(
+                query_bytes,
+                data,
+                started,
+                properties,
+                self._get_connection_name()
+            )
+            _warn_if_query_returned_lots_of_data(query, data)
+            return _project_reply(data, properties)
+
+    def execute_queries_get_data(self, queries, properties=None):
+        """Execute every query in 'queries', return a list of raw dbus replies.
+
+        All the GetState calls are sent to the application before waiting for
+        any of the replies, so executing the batch costs roughly one dbus round
+        trip instead of one round trip per query.
+
+        :param queries: A sequence of Query objects.
+        :param properties: If given, only return these properties, as for
+            execute_query_get_data.
+        :returns: A list containing the raw dbus reply for each query, in the
+            same order as 'queries'.
+
+        """
+        queries = list(queries)
+        if len(queries) < 2:
+            return [
+                _execute_query_get_data(self, q, properties) for q in queries
+            ]
+
+        iface = self.ipc_address.introspection_iface
+        replies = {}
+        errors = []
+
+        def reply_handler(index, data):
+            replies[index] = data
+
+        def error_handler(error):
+            errors.append(error)
+
+        query_bytes = [
+            q.server_query_bytes(self._extended_filters()) for q in queries
+        ]
+        with Timer("GetState batch of %d queries" % len(queries)):
+            started = monotonic()
+            for index, query in enumerate(query_bytes):
+                method, args = self._get_state_call(iface, query, properties)
+                method(
+                    *args,
+                    reply_handler=partial(reply_handler, index),
+                    error_handler=error_handler
+                )
+            _iterate_main_loop_until_or_timeout(
+                lambda: len(replies) + len(errors) == len(queries),
+                _REPLY_TIMEOUT
+            )
+        if len(replies) + len(errors) < len(queries):
+            errors.append(_make_no_reply_error())
+
+        if errors:
+            if isinstance(errors[0], dbus.DBusException):
+                _raise_if_backend_lost(errors[0])
+            raise errors[0]
+
+        results = [replies[i] for i in range(len(queries))]
+        for query, data in zip(query_bytes, results):
+            _record_reply(
+                query,
+                data,
+                started,
+                properties,
+                self._get_connection_name()
+            )
+        for query, data in zip(queries, results):
+            _warn_if_query_returned_lots_of_data(query, data)
+        return [_project_reply(data, properties) for data in results]
+
+    async def execute_query_get_data_async(self, query, properties=None):
+        """Execute 'query' without blocking, return the raw dbus reply.
+
+        This is a coroutine. While it waits for the reply, other tasks on the
+        same asyncio event loop keep running, so many queries (to one or more
+        applications) can be in flight at once.
+
+        :param properties: If given, only return these properties, as for
+            execute_query_get_data.
+
+        """
+        with Timer("GetState (async) %r" % query):
+            try:
+                iface = self.ipc_address.introspection_iface
+                query_bytes = query.server_query_bytes(
+                    self._extended_filters()
+                )
+                method, args = self._get_state_call(
+                    iface,
+                    query_bytes,
+                    properties
+                )
+                started = monotonic()
+                data = await _call_dbus_method_async(method, *args)
+            except dbus.DBusException as e:
+                _raise_if_backend_lost(e)
+                raise
+            _record_reply(
+                query_bytes,
+                data,
+                started,
+                properties,
+                self._get_connection_name()
+            )
+            _warn_if_query_returned_lots_of_data(query, data)
+            return _project_reply(data, properties)
+
+    def _get_connection_name(self):
+        """Return the DBus connection name of the application, or None if
+        it isn't known.
+
+        """
+        addr_tuple = getattr(self.ipc_address, '_addr_tuple', None)
+        connection = getattr(addr_tuple, 'connection', None)
+        return connection if isinstance(connection, str) else None
+
+    def execute_query_get_proxy_instances(self, query, id, properties=None):
+        """Execute 'query', returning proxy instances.
+
+        :param properties: If given, only fetch these properties of each
+            object. The proxies fetch the rest of their state when one of the
+            other properties is read.
+
+        """
+        properties = _get_filter_properties(
+            query,
+            properties,
+            self._extended_filters()
+        )
+        data = _execute_query_get_data(self, query, properties)
+        return self._make_proxy_instances(query, data, id, properties)
+
+    async def execute_query_get_proxy_instances_async(
+            self, query, id, properties=None):
+        """Execute 'query' without blocking, returning proxy instances.
+
+        This is a coroutine.
+
+        """
+        properties = _get_filter_properties(
+            query,
+            properties,
+            self._extended_filters()
+        )
+        data = await _execute_query_get_data_async(self, query, properties)
+        return self._make_proxy_instances(query, data, id, properties)
+
+    def execute_queries_get_proxy_instances(self, queries, id):
+        """Execute every query in 'queries' as a single batch.
+
+        :returns: A list containing a list of proxy instances for each query,
+            in the same order as 'queries'.
+
+        """
+        queries = list(queries)
+        return [
+            self._make_proxy_instances(query, data, id)
+            for query, data
+            in zip(queries, self.execute_queries_get_data(queries))
+        ]
+
+    def iter_query_get_proxy_instances(self, query, id, batch_size,
+                                       properties=None):
+        """Execute 'query', yielding proxy instances *batch_size* at a time.
+
+        If the application can return a subset of each object's properties,
+        the query only asks for the id of each object (and any properties
+        needed for client-side filters), and the state of each batch of
+        objects is fetched in a single round trip when the batch is reached.
+        Objects destroyed before their batch is fetched are skipped.
+        Otherwise, the whole reply is fetched at once, and proxies are made
+        from it one batch at a time.
+
+        :param properties: If given, only fetch these properties of each
+            object, as for execute_query_get_proxy_instances.
+
+        """
+        extended_filters = self._extended_filters()
+        properties = _get_filter_properties(
+            query,
+            properties,
+            extended_filters
+        )
+        if not self._property_projection():
+            data = _execute_query_get_data(self, query, properties)
+            for start in range(0, len(data), batch_size):
+                yield from self._make_proxy_instances(
                     query,
-                    len(data)
+                    data[start:start + batch_size],
+                    id,
+                    properties
                 )
-            return data
-
-    def execute_query_get_proxy_instances(self, query, id):
-        """Execute 'query', returning proxy instances."""
-        data = self.execute_query_get_data(query)
-        objects = [
-            make_introspection_object(
-                t,
-                type(self)(self.ipc_address),
+            return
+
+        listing = _execute_query_get_data(
+            self,
+            query,
+            _get_filter_properties(query, [], extended_filters)
+        )
+        if query.needs_client_side_filtering(extended_filters):
+            filters = query.get_client_side_filters(extended_filters)
+            listing = [
+                (path, state) for path, state in listing
+                if _state_passes_filters(state, **filters) is not False
+            ]
+        for start in range(0, len(listing), batch_size):
+            replies = _execute_queries_get_data(
+                self,
+                [
+                    xpathselect.Query.new_from_path_and_id(
+                        _get_path_bytes(path),
+                        int(state['id'][1])
+                    )
+                    for path, state in listing[start:start + batch_size]
+                ],
+                properties
+            )
+            yield from self._make_proxy_instances(
+                query,
+                [dbus_tuple for reply in replies for dbus_tuple in reply],
                 id,
+                properties
             )
-            for t in data
-        ]
-        if query.needs_client_side_filtering():
-            return list(filter(
-                lambda i: _object_passes_filters(
-                    i,
-                    **query.get_client_side_filters()
-                ),
-                objects
-            ))
+
+    def watch_state_changes(self, query, properties=()):
+        """Return a context manager that can be used to wait for the state of
+        the objects matched by 'query' to change.
+
+        The context manager's value has a 'wait(timeout)' method that blocks
+        until the application reports a change, or 'timeout' seconds pass, and
+        returns the number of seconds it waited. If the application can't
+        report changes, 'wait' just sleeps for 'timeout' seconds, and callers
+        poll as they always have.
+
+        :param query: The Query whose results should be watched. A change is
+            any change to the set of objects the query matches, or to their
+            properties.
+        :param properties: Only report changes to these properties. The
+            default is to report changes to any property.
+
+        """
+        if getattr(
+            self.ipc_address,
+            'supports_change_notifications',
+            False
+        ) is True:
+            return StateChangeSubscription(
+                self.ipc_address.introspection_iface,
+                query.server_query_bytes(self._extended_filters()),
+                properties
+            )
+        return PollingStateWatch()
+
+    def _extended_filters(self):
+        """Return True if queries can use the extended filter grammar.
+
+        Only valid once the introspection interface has been retrieved.
+
+        """
+        return getattr(
+            self.ipc_address,
+            'supports_extended_filters',
+            False
+        ) is True
+
+    def _property_projection(self):
+        """Return True if the application can return a subset of each
+        object's properties.
+
+        Only valid once the introspection interface has been retrieved.
+
+        """
+        return getattr(
+            self.ipc_address,
+            'supports_property_projection',
+            False
+        ) is True
+
+    def _get_state_call(self, iface, query_bytes, properties):
+        """Return the dbus method to call to execute a query, and the
+        arguments to call it with.
+
+        """
+        if properties is not None and self._property_projection():
+            return iface.GetStateProperties, (
+                query_bytes,
+                dbus.Array(properties, signature='s'),
+            )
+        return iface.GetState, (query_bytes,)
+
+    def _make_proxy_instances(self, query, data, id, properties=None):
+        extended_filters = self._extended_filters()
+        if not query.needs_client_side_filtering(extended_filters):
+            return [self._get_proxy_instance(t, id, properties) for t in data]
+
+        # Check the filters against the raw state first, so we only make
+        # proxies for the objects that pass. A proxy is only needed to
+        # decide when a filter names something that's not in the state,
+        # such as a property on a custom proxy class.
+        filters = query.get_client_side_filters(extended_filters)
+        objects = []
+        for dbus_tuple in data:
+            passes = _state_passes_filters(dbus_tuple[1], **filters)
+            if passes is False:
+                continue
+            instance = self._get_proxy_instance(dbus_tuple, id, properties)
+            if passes or _object_passes_filters(instance, **filters):
+                objects.append(instance)
         return objects
 
+    def _get_proxy_instance(self, dbus_tuple, id, properties=None):
+        """Return a proxy object for *dbus_tuple*, reusing the existing proxy
+        for the same object if there is one.
+
+        :param properties: The properties *dbus_tuple* was projected to, if
+            it does not contain the whole state of the object.
+
+        """
+        key = _get_proxy_identity(dbus_tuple)
+        proxy = self._proxies.get(key) if key is not None else None
+        if proxy is not None:
+            path, state = dbus_tuple
+            class_object = _get_proxy_object_class(
+                id,
+                path.encode('utf-8'),
+                state
+            )
+            if type(proxy) is class_object:
+                proxy._update_properties(state, properties)
+                return proxy
+
+        proxy = make_introspection_object(dbus_tuple, self, id)
+        if proxy is not None and properties is not None:
+            proxy._set_properties(dbus_tuple[1], properties)
+        if key is not None and proxy is not None:
+            self._proxies[key] = proxy
+        return proxy
+
+
+class PollingStateWatch(object):
+
+    """Used in place of a StateChangeSubscription when the application cannot
+    notify us of state changes.
+
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def wait(self, timeout):
+        """Sleep for 'timeout' seconds, and return 'timeout'."""
+        sleep(timeout)
+        return timeout
+
+
+class StateChangeSubscription(object):
+
+    """Receive state change notifications from the application under test.
+
+    When used as a context manager, this subscribes to the changes on enter
+    and unsubscribes on exit.
+
+    """
+
+    def __init__(self, iface, query_bytes, properties=()):
+        self._iface = iface
+        self._query_bytes = query_bytes
+        self._properties = list(properties)
+        self._subscription_id = None
+        self._changed_subscriptions = set()
+        self._signal_match = None
+
+    def __enter__(self):
+        # Listen before subscribing, so we can't miss a change that happens
+        # as soon as the subscription is made.
+        self._signal_match = self._iface.connect_to_signal(
+            'StateChanged',
+            self._on_state_changed
+        )
+        self._subscription_id = self._iface.Subscribe(
+            self._query_bytes,
+            dbus.Array(self._properties, signature='s')
+        )
+        return self
+
+    def __exit__(self, *args):
+        self._signal_match.remove()
+        try:
+            self._iface.Unsubscribe(self._subscription_id)
+        except dbus.DBusException as e:
+            # The application may have exited, which the waiting code will
+            # already have reported.
+            _logger.debug("Could not unsubscribe from state changes: %s", e)
+        return False
+
+    def _on_state_changed(self, subscription_id):
+        self._changed_subscriptions.add(subscription_id)
+
+    def _has_changed(self):
+        return self._subscription_id in self._changed_subscriptions
+
+    def wait(self, timeout):
+        """Wait until the application reports a change, or 'timeout' seconds
+        have passed.
+
+        :returns: The number of seconds waited.
+
+        """
+        waited = _iterate_main_loop_until_or_timeout(
+            self._has_changed,
+            timeout
+        )
+        self._changed_subscriptions.discard(self._subscription_id)
+        return waited
+
 
 class FakeBackend(Backend):
 
@@ -284,8 +826,721 @@ class FakeBackend(Backend):
         super(FakeBackend, self).__init__(fake_ipc_return_data)
         self.fake_ipc_return_data = fake_ipc_return_data
 
-    def execute_query_get_data(self, query):
-        return self.fake_ipc_return_data
+    def execute_query_get_data(self, query, properties=None):
+        return _project_reply(self.fake_ipc_return_data, properties)
+
+    def execute_queries_get_data(self, queries, properties=None):
+        return [
+            _execute_query_get_data(self, q, properties) for q in queries
+        ]
+
+    async def execute_query_get_data_async(self, query, properties=None):
+        return _execute_query_get_data(self, query, properties)
+
+
+class InMemoryBackend(Backend):
+
+    """A backend that answers queries from an introspection tree held in
+    memory, useful for testing.
+
+    Unlike FakeBackend, queries are evaluated against the tree the same way
+    the application under test would evaluate them, so searches, parents,
+    children and attribute filters all behave as they do against a real
+    application. The tree may be changed between queries, for example to
+    test code that waits for an object to change.
+
+    """
+
+    def __init__(self, tree, ipc_address=None):
+        """Create a new InMemoryBackend.
+
+        :param tree: The root of the tree, either as an
+            autopilot.introspection._query_engine.Node, or as a dictionary
+            with 'name', 'state' and (optionally) 'children' keys, where
+            'state' is the state dictionary in wire protocol format and
+            'children' is a list of dictionaries in the same format. The
+            state dictionary of each object must contain an 'id' key.
+        :param ipc_address: The ipc address of the application the tree
+            belongs to, if any.
+        :raises ValueError: if *tree* is not in the right format.
+
+        """
+        super(InMemoryBackend, self).__init__(ipc_address)
+        if isinstance(tree, dict):
+            tree = _query_engine.Node.from_dict(tree)
+        self.root = tree
+        self._index = None
+
+    def execute_query_get_data(self, query, properties=None):
+        with Timer("GetState (in memory) %r" % query):
+            return [
+                (path, dict(state)) for path, state
+                in _query_engine.execute_query(
+                    self.root,
+                    query.server_query_bytes(self._extended_filters()),
+                    self._index,
+                    properties
+                )
+            ]
+
+    def execute_queries_get_data(self, queries, properties=None):
+        return [
+            _execute_query_get_data(self, q, properties) for q in queries
+        ]
+
+    async def execute_query_get_data_async(self, query, properties=None):
+        return _execute_query_get_data(self, query, properties)
+
+    def watch_state_changes(self, query, properties=()):
+        return PollingStateWatch()
+
+    def _extended_filters(self):
+        # The local query engine understands the extended grammar.
+        return True
+
+
+class SnapshotBackend(InMemoryBackend):
+
+    """A backend that answers queries from a copy of part of the introspection
+    tree of an application, instead of asking the application.
+
+    The copy is taken when the backend is created. It contains an object, all
+    of its descendants, and its ancestors (but not the other descendants of
+    its ancestors), and is indexed so that queries against it take
+    microseconds. It is never updated: use is_stale to find out whether the
+    application has changed since.
+
+    """
+
+    def __init__(self, backend, path, id):
+        """Create a new SnapshotBackend.
+
+        :param backend: The backend used to fetch the copy.
+        :param path: The path (as bytes) of the object at the root of the
+            copied subtree.
+        :param id: The id of that object.
+
+        """
+        super(SnapshotBackend, self).__init__(
+            _fetch_subtree(backend, path, id),
+            backend.ipc_address
+        )
+        self._live_backend = backend
+        self._path = path
+        self._id = id
+        self.taken_at = monotonic()
+        self._index = _query_engine.TreeIndex(self.root)
+
+    @property
+    def age(self):
+        """The number of seconds since the copy was taken."""
+        return monotonic() - self.taken_at
+
+    def is_stale(self):
+        """Return True if the copied part of the application's introspection
+        tree has changed since the copy was taken.
+
+        This fetches the subtree again, so it costs as much as taking the
+        copy did.
+
+        """
+        try:
+            tree = _fetch_subtree(self._live_backend, self._path, self._id)
+        except StateNotFoundError:
+            return True
+        return _get_tree_contents(tree) != _get_tree_contents(self.root)
+
+
+class ReplayBackend(Backend):
+
+    """A backend that answers queries with the replies recorded during an
+    earlier test run, instead of asking the application.
+
+    Each query is answered with the replies recorded for it in the order
+    they were recorded, so a test that waits for an object to change sees
+    the same sequence of states it saw when it was recorded. Once the
+    recorded replies for a query run out, the last one is repeated. A query
+    for some of the properties of each object is answered with the replies
+    recorded for the same properties, or failing that, with the replies
+    recorded for all of them.
+
+    A recording may hold the traffic of several applications. Only the
+    replies recorded from one application's connection are used.
+
+    """
+
+    def __init__(self, recording, timing=False, connection=None):
+        """Create a new ReplayBackend.
+
+        :param recording: The name of a file written by
+            autopilot.introspection._traffic.start_recording, or the list of
+            entries read from one by read_recording.
+        :param timing: If True, each reply is delayed by as long as the
+            application took to reply when it was recorded.
+        :param connection: The DBus connection name of the application to
+            replay. If None, the first application in the recording is
+            replayed.
+        :raises ValueError: if *recording* is not a recording autopilot
+            understands, or holds no traffic for *connection*.
+
+        """
+        super(ReplayBackend, self).__init__(None)
+        if isinstance(recording, str):
+            recording = _traffic.read_recording(recording)
+        if connection is None and recording:
+            connection = recording[0].get('connection')
+        self._entries = [
+            entry for entry in recording
+            if entry.get('connection') == connection
+        ]
+        if recording and not self._entries:
+            raise ValueError(
+                "The recording has no traffic for connection %r." % connection
+            )
+        self._connection = connection
+        self._timing = timing
+        self._replies = defaultdict(deque)
+        for entry in self._entries:
+            properties_key = _get_properties_key(entry.get('properties'))
+            self._replies[(entry['query'], properties_key)].append(entry)
+
+    def get_root_state(self):
+        """Return the (path, state) pair of the root of the recorded
+        introspection tree.
+
+        :raises ValueError: if the root object was never recorded.
+
+        """
+        for entry in self._entries:
+            if 'properties' in entry:
+                # Only part of the root object's state was recorded.
+                continue
+            for path, state in entry['reply']:
+                if path.count('/') == 1:
+                    return path, state
+        raise ValueError("The recording does not contain the root object.")
+
+    def execute_query_get_data(self, query, properties=None):
+        with Timer("GetState (replayed) %r" % query):
+            entry = self._get_next_entry(query, properties)
+            if self._timing:
+                sleep(entry['duration'])
+            return _project_reply(
+                [(path, dict(state)) for path, state in entry['reply']],
+                properties
+            )
+
+    def execute_queries_get_data(self, queries, properties=None):
+        return [
+            _execute_query_get_data(self, q, properties) for q in queries
+        ]
+
+    async def execute_query_get_data_async(self, query, properties=None):
+        return _execute_query_get_data(self, query, properties)
+
+    def watch_state_changes(self, query, properties=()):
+        return PollingStateWatch()
+
+    def _extended_filters(self):
+        # Replies are matched to queries recorded with either grammar (see
+        # _get_next_entry), so some filters may be applied twice, which is
+        # harmless.
+        return False
+
+    def _get_next_entry(self, query, properties=None):
+        properties_keys = [_get_properties_key(properties)]
+        if properties is not None:
+            properties_keys.append(None)
+        for properties_key in properties_keys:
+            # The recorded query used the extended grammar if the application
+            # supported it, so look for both:
+            for extended_filters in (True, False):
+                key = (
+                    query.server_query_bytes(extended_filters).decode('utf-8'),
+                    properties_key
+                )
+                replies = self._replies.get(key)
+                if replies:
+                    if len(replies) > 1:
+                        return replies.popleft()
+                    return replies[0]
+        raise RuntimeError(
+            "Query %r was not recorded." % query.server_query_bytes()
+        )
+
+
+def _get_properties_key(properties):
+    if properties is None:
+        return None
+    return tuple(sorted(set(properties)))
+
+
+def _fetch_subtree(backend, path, id, maxdepth=None):
+    """Fetch the object at 'path' with 'id', its ancestors and all of its
+    descendants from the application, and return the root of a tree of
+    _query_engine.Node objects made from them.
+
+    The wire protocol does not allow a query for every descendant of an
+    object ('//*'), so the subtree is fetched one level at a time, sending
+    the queries for each level to the application as a single batch.
+
+    :param maxdepth: If given, only fetch descendants with at most
+        maxdepth-1 intermediate parents.
+    :raises StateNotFoundError: if the object no longer exists.
+
+    """
+    root_query = xpathselect.Query.new_from_path_and_id(path, id)
+    parent_queries = []
+    query = root_query
+    for i in range(path.count(b'/') - 1):
+        query = query.select_parent()
+        parent_queries.append(query)
+    child_queries = []
+    if maxdepth is None or maxdepth > 0:
+        child_queries.append(
+            root_query.select_child(xpathselect.Query.WILDCARD)
+        )
+
+    replies = backend.execute_queries_get_data(
+        [root_query] + parent_queries + child_queries
+    )
+    if not replies[0]:
+        raise StateNotFoundError(_get_node_name(path), id=id)
+
+    # Ancestors are returned closest first:
+    tree = None
+    for reply in reversed(replies[:len(parent_queries) + 1]):
+        node = _make_node(reply[0])
+        if tree is not None:
+            tree.add_child(node)
+        tree = node
+    root_node = tree
+    while tree.parent is not None:
+        tree = tree.parent
+
+    level = [(root_node, reply) for reply in replies[len(parent_queries) + 1:]]
+    depth = 1
+    while level:
+        child_queries = []
+        for parent, reply in level:
+            for dbus_tuple in reply:
+                node = _make_node(dbus_tuple)
+                parent.add_child(node)
+                if maxdepth is None or depth < maxdepth:
+                    child_queries.append((
+                        node,
+                        xpathselect.Query.new_from_path_and_id(
+                            _get_path_bytes(dbus_tuple[0]),
+                            node.id
+                        ).select_child(xpathselect.Query.WILDCARD)
+                    ))
+        if not child_queries:
+            break
+        replies = backend.execute_queries_get_data(
+            [q for _, q in child_queries]
+        )
+        level = [(node, reply) for (node, _), reply
+                 in zip(child_queries, replies)]
+        depth += 1
+    return tree
+
+
+def _iter_subtree(backend, path, id, maxdepth=None):
+    """Fetch the object at 'path' with 'id' and all of its descendants from
+    the application, and return an iterator of (path, state, depth) tuples
+    for them, depth first. Each object is fetched as the iterator reaches
+    it, except the object at 'path', which is fetched straight away.
+
+    The children of a group of sibling objects are fetched with a single
+    batch of queries, when the first of the siblings is reached. Only the
+    groups on the way down to the current object are kept, so memory use
+    depends on the depth of the tree rather than its size.
+
+    If the children of an object can't be fetched, the object is followed
+    by a (path, error, depth) tuple with the exception raised, and the rest
+    of the tree is still fetched.
+
+    :param maxdepth: If given, only fetch descendants with at most
+        maxdepth-1 intermediate parents.
+    :raises StateNotFoundError: if the object no longer exists.
+
+    """
+    def get_children(objects, depth):
+        # Pair each object with its children:
+        if maxdepth is not None and depth >= maxdepth:
+            return iter([(o, ()) for o in objects])
+        queries = [
+            xpathselect.Query.new_from_path_and_id(
+                _get_path_bytes(object_path),
+                int(state['id'][1])
+            ).select_child(xpathselect.Query.WILDCARD)
+            for object_path, state in objects
+        ]
+        try:
+            replies = backend.execute_queries_get_data(queries)
+        except (dbus.DBusException, StateNotFoundError):
+            # Fetch them one at a time, to find out which failed:
+            replies = [_get_children_or_error(backend, q) for q in queries]
+        return zip(objects, replies)
+
+    root_query = xpathselect.Query.new_from_path_and_id(path, id)
+    queries = [root_query]
+    if maxdepth is None or maxdepth > 0:
+        queries.append(root_query.select_child(xpathselect.Query.WILDCARD))
+    try:
+        replies = backend.execute_queries_get_data(queries)
+    except (dbus.DBusException, StateNotFoundError):
+        replies = [backend.execute_query_get_data(root_query)] + [
+            _get_children_or_error(backend, q) for q in queries[1:]
+        ]
+    if not replies[0]:
+        raise StateNotFoundError(_get_node_name(path), id=id)
+
+    def walk(root, children):
+        stack = [iter([(root, children)])]
+        while stack:
+            try:
+                (object_path, state), children = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+            depth = len(stack) - 1
+            yield str(object_path), _get_plain_state(state), depth
+            if isinstance(children, Exception):
+                yield str(object_path), children, depth
+            elif children:
+                stack.append(get_children(children, depth + 1))
+
+    return walk(replies[0][0], replies[1] if len(replies) > 1 else ())
+
+
+def _get_children_or_error(backend, query):
+    try:
+        return backend.execute_query_get_data(query)
+    except (dbus.DBusException, StateNotFoundError) as error:
+        return error
+
+
+def _make_node(dbus_tuple):
+    path, state = dbus_tuple
+    return _query_engine.Node(_get_node_name(path), _get_plain_state(state))
+
+
+def _get_plain_state(state):
+    return {str(k): _get_plain_value(v) for k, v in state.items()}
+
+
+def _get_plain_value(value):
+    """Return 'value' with any dbus types replaced by the plain Python types
+    they wrap, so it can be saved as JSON. Byte arrays are left as bytes,
+    which the traffic recorder encodes.
+
+    """
+    # bool and dbus.Boolean are int subclasses, so check them first:
+    if isinstance(value, (bool, dbus.Boolean)):
+        return bool(value)
+    if isinstance(value, (list, tuple)):
+        return [_get_plain_value(v) for v in value]
+    if isinstance(value, dict):
+        return {
+            _get_plain_value(k): _get_plain_value(v)
+            for k, v in value.items()
+        }
+    for plain_type in (str, bytes, int, float):
+        if isinstance(value, plain_type):
+            return plain_type(value)
+    return value
+
+
+def _get_path_bytes(path):
+    if isinstance(path, bytes):
+        return path
+    return path.encode('utf-8')
+
+
+def _get_node_name(path):
+    if isinstance(path, bytes):
+        path = path.decode('utf-8')
+    return path.rsplit('/', 1)[-1]
+
+
+def _get_tree_contents(tree):
+    return [
+        (node.path, sorted(node.state.items()))
+        for node in [tree] + list(tree.iter_descendants())
+    ]
+
+
+def _parse_version(version):
+    """Return a wire protocol version string as a tuple of ints, so versions
+    can be compared.
+
+    """
+    return tuple(int(part) for part in version.split('.'))
+
+
+def _raise_if_backend_lost(dbus_exception):
+    """Raise RuntimeError if 'dbus_exception' means the application under
+    test has gone away.
+
+    """
+    if dbus_exception.get_dbus_name() == \
+            'org.freedesktop.DBus.Error.ServiceUnknown':
+        raise RuntimeError(
+            "Lost dbus backend communication. It appears the "
+            "application under test exited before the test "
+            "finished!"
+        )
+
+
+def _record_reply(query_bytes, data, started, properties=None,
+                  connection=None):
+    """Record the reply to a query, if introspection traffic is being
+    recorded.
+
+    :param connection: The DBus connection name of the application that
+        sent the reply.
+
+    """
+    recorder = _traffic.get_recorder()
+    if recorder is not None:
+        recorder.record(
+            query_bytes,
+            [
+                [str(path), _get_plain_value(state)]
+                for path, state in _project_reply(data, properties)
+            ],
+            started,
+            monotonic() - started,
+            properties=properties,
+            connection=connection
+        )
+
+
+def _project_reply(data, properties):
+    """Return the reply *data* with only the 'id' and *properties* left in
+    each state dictionary.
+
+    If *properties* is None, *data* is returned as it is.
+
+    """
+    if properties is None:
+        return data
+    return [
+        (path, _query_engine.project_state(state, properties))
+        for path, state in data
+    ]
+
+
+def _properties_kwargs(method, properties):
+    """Return the keyword arguments that pass *properties* to the backend
+    method *method*.
+
+    *properties* is left out if it's None, or if *method* doesn't take it:
+    backends written before it was added override the backend methods
+    without it, and answer with the whole state of each object instead.
+
+    """
+    if properties is None or not _accepts_properties(method):
+        return {}
+    return dict(properties=properties)
+
+
+def _accepts_properties(method):
+    """Return True if the callable *method* takes a 'properties' argument."""
+    function = getattr(method, '__func__', method)
+    if inspect.isfunction(function):
+        return _function_accepts_properties(function)
+    return _signature_accepts_properties(method)
+
+
+@lru_cache(maxsize=None)
+def _function_accepts_properties(function):
+    return _signature_accepts_properties(function)
+
+
+def _signature_accepts_properties(method):
+    try:
+        parameters = inspect.signature(method).parameters
+    except (TypeError, ValueError):
+        return True
+    return 'properties' in parameters or any(
+        p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters.values()
+    )
+
+
+def _execute_query_get_data(backend, query, properties=None):
+    """Call backend.execute_query_get_data, passing *properties* only if the
+    backend takes it.
+
+    A backend that doesn't take it returns every property of each object,
+    and the others are removed here.
+
+    """
+    kwargs = _properties_kwargs(backend.execute_query_get_data, properties)
+    data = backend.execute_query_get_data(query, **kwargs)
+    return data if kwargs else _project_reply(data, properties)
+
+
+def _execute_queries_get_data(backend, queries, properties=None):
+    """Call backend.execute_queries_get_data, passing *properties* only if
+    the backend takes it, as for _execute_query_get_data.
+
+    """
+    kwargs = _properties_kwargs(backend.execute_queries_get_data, properties)
+    replies = backend.execute_queries_get_data(queries, **kwargs)
+    if kwargs:
+        return replies
+    return [_project_reply(data, properties) for data in replies]
+
+
+async def _execute_query_get_data_async(backend, query, properties=None):
+    """Call backend.execute_query_get_data_async, passing *properties* only
+    if the backend takes it, as for _execute_query_get_data.
+
+    This is a coroutine.
+
+    """
+    kwargs = _properties_kwargs(
+        backend.execute_query_get_data_async,
+        properties
+    )
+    data = await backend.execute_query_get_data_async(query, **kwargs)
+    return data if kwargs else _project_reply(data, properties)
+
+
+def _get_filter_properties(query, properties, extended_filters):
+    """Return *properties*, plus any properties needed to apply the
+    client-side filters of *query*.
+
+    """
+    if properties is None:
+        return None
+    properties = list(properties)
+    for name in query.get_client_side_filters(extended_filters):
+        if name not in properties:
+            properties.append(name)
+    return properties
+
+
+def _warn_if_query_returned_lots_of_data(query, data):
+    if len(data) > 15:
+        _logger.warning(
+            "Your query '%r' returned a lot of data (%d items). This "
+            "is likely to be slow. You may want to consider optimising"
+            " your query to return fewer items.",
+            query,
+            len(data)
+        )
+
+
+def _dispatch_pending_main_loop_events():
+    """Dispatch any GLib main loop events that are ready, without blocking.
+
+    This delivers dbus signals (such as NameOwnerChanged) that have arrived
+    while autopilot was making blocking dbus calls.
+
+    """
+    context = GLib.MainContext.default()
+    while context.pending():
+        context.iteration(False)
+
+
+def _iterate_main_loop_until(predicate):
+    """Dispatch GLib main loop events until 'predicate' returns True.
+
+    Asynchronous dbus replies are delivered through the GLib main loop that
+    autopilot.dbus_handler installs, so this must be pumped for the reply and
+    error handlers of asynchronous calls to run.
+
+    """
+    context = GLib.MainContext.default()
+    while not predicate():
+        context.iteration(True)
+
+
+def _iterate_main_loop_until_or_timeout(predicate, timeout):
+    """Dispatch GLib main loop events until 'predicate' returns True, or
+    'timeout' seconds have passed.
+
+    :returns: The number of seconds waited.
+
+    """
+    start_time = monotonic()
+    if not predicate():
+        timed_out = []
+
+        def on_timeout():
+            timed_out.append(True)
+            return False
+
+        source_id = GLib.timeout_add(int(timeout * 1000), on_timeout)
+        _iterate_main_loop_until(lambda: predicate() or timed_out)
+        if not timed_out:
+            GLib.source_remove(source_id)
+    return monotonic() - start_time
+
+
+# Asynchronous dbus calls fail if no reply arrives within this many seconds,
+# as blocking calls do after libdbus' default reply timeout.
+_REPLY_TIMEOUT = 25.0
+
+
+def _make_no_reply_error():
+    return dbus.DBusException(
+        "Did not receive a reply within %g seconds." % _REPLY_TIMEOUT,
+        name='org.freedesktop.DBus.Error.NoReply'
+    )
+
+
+async def _call_dbus_method_async(method, *args):
+    """Call the dbus 'method' asynchronously and wait for its reply.
+
+    This is a coroutine. The reply is delivered through the GLib main loop,
+    which is dispatched in a worker thread while the asyncio event loop keeps
+    running. The reply and error handlers resolve the result on the event
+    loop's thread.
+
+    :returns: The value returned by the dbus method.
+    :raises dbus.DBusException: if the dbus call fails, or no reply arrives
+        within _REPLY_TIMEOUT seconds.
+
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    replied = threading.Event()
+
+    def resolve(value, is_error):
+        if future.done():
+            return
+        if is_error:
+            future.set_exception(value)
+        else:
+            future.set_result(value)
+
+    def on_reply(value, is_error):
+        replied.set()
+        loop.call_soon_threadsafe(resolve, value, is_error)
+        # Another thread may be waiting in the main loop for this reply:
+        GLib.MainContext.default().wakeup()
+
+    def reply_handler(*result):
+        on_reply(result[0] if len(result) == 1 else result, False)
+
+    def error_handler(error):
+        on_reply(error, True)
+
+    method(*args, reply_handler=reply_handler, error_handler=error_handler)
+    if not replied.is_set():
+        await loop.run_in_executor(
+            None,
+            _iterate_main_loop_until_or_timeout,
+            replied.is_set,
+            _REPLY_TIMEOUT
+        )
+    if not replied.is_set():
+        raise _make_no_reply_error()
+    return await future
 
 
 def make_introspection_object(dbus_tuple, backend, object_id):
@@ -307,14 +1562,74 @@ def make_introspection_object(dbus_tuple, backend, object_id):
     return class_object(state, path, backend)
 
 
+def _get_proxy_identity(dbus_tuple):
+    """Return the (path, id) pair that identifies the object in *dbus_tuple*,
+    or None if the state does not contain a valid id.
+
+    """
+    path, state = dbus_tuple
+    try:
+        return path, int(state['id'][1])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
 def _object_passes_filters(instance, **kwargs):
     """Return true if *instance* satisifies all the filters present in
     kwargs."""
     with instance.no_automatic_refreshing():
         for attr, val in kwargs.items():
-            if not hasattr(instance, attr) or getattr(instance, attr) != val:
+            if (
+                not hasattr(instance, attr)
+                or not _value_passes_filter(getattr(instance, attr), val)
+            ):
                 # Either attribute is not present, or is present but with
                 # the wrong value - don't add this instance to the results
                 # list.
                 return False
     return True
+
+
+def _state_passes_filters(state, **kwargs):
+    """Return whether the raw dbus *state* dictionary satisfies all the
+    filters present in kwargs.
+
+    Only the attributes named in kwargs are decoded.
+
+    :returns: True or False, or None if a filter names an attribute that is
+        not in *state*, in which case only the proxy object can tell.
+
+    """
+    state = translate_state_keys(state)
+    for attr, val in kwargs.items():
+        try:
+            raw_value = state[attr]
+        except KeyError:
+            return None
+        try:
+            value = create_value_instance(raw_value, None, attr)
+        except ValueError:
+            return None
+        if not _value_passes_filter(value, val):
+            return False
+    return True
+
+
+def _value_passes_filter(value, expected):
+    """Return whether the attribute *value* satisfies the filter *expected*.
+
+    *expected* can be a testtools matcher, a compiled regular expression
+    (which must match somewhere in the value), a callable that takes the value
+    and returns True or False, or a value the attribute must be equal to.
+
+    """
+    # regular expressions have a match method too, so check them first:
+    if isinstance(expected, _REGEX_TYPE):
+        return expected.search(str(value)) is not None
+    # not every testtools matcher derives from Matcher, so look for the
+    # matcher protocol instead:
+    if hasattr(expected, 'match'):
+        return expected.match(value) is None
+    if callable(expected):
+        return bool(expected(value))
+    return value == expected
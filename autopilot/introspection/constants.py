@@ -26,3 +26,16 @@ AP_INTROSPECTION_IFACE = 'com.canonical.Autopilot.Introspection'
 DBUS_INTROSPECTION_IFACE = 'org.freedesktop.DBus.Introspectable'
 
 CURRENT_WIRE_PROTOCOL_VERSION = "1.4"
+# Version 1.5 of the wire protocol is version 1.4 plus the extended attribute
+# filter grammar.
+EXTENDED_FILTERS_WIRE_PROTOCOL_VERSION = "1.5"
+# Version 1.6 is version 1.5 plus state change notifications.
+CHANGE_NOTIFICATIONS_WIRE_PROTOCOL_VERSION = "1.6"
+# Version 1.7 is version 1.6 plus property projection.
+PROPERTY_PROJECTION_WIRE_PROTOCOL_VERSION = "1.7"
+SUPPORTED_WIRE_PROTOCOL_VERSIONS = (
+    CURRENT_WIRE_PROTOCOL_VERSION,
+    EXTENDED_FILTERS_WIRE_PROTOCOL_VERSION,
+    CHANGE_NOTIFICATIONS_WIRE_PROTOCOL_VERSION,
+    PROPERTY_PROJECTION_WIRE_PROTOCOL_VERSION,
+)
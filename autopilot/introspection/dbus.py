@@ -26,14 +26,27 @@ module is the DBusIntrospectableObject class.
 """
 
 import logging
-import sys
 from contextlib import contextmanager
+from time import monotonic
 
+from autopilot._timeout import Poller
 from autopilot.exceptions import StateNotFoundError
+from autopilot.globals import get_state_max_age
 from autopilot.introspection import _xpathselect as xpathselect
 from autopilot.introspection._object_registry import (
     DBusIntrospectionObjectBase,
 )
+from autopilot.introspection.backends import (
+    Backend,
+    PollingStateWatch,
+    SnapshotBackend,
+    _execute_query_get_data,
+    _execute_query_get_data_async,
+    _iter_subtree,
+    _object_passes_filters,
+    _properties_kwargs,
+)
+from autopilot.introspection._tree_writer import check_tree_format, write_tree
 from autopilot.introspection.types import create_value_instance
 from autopilot.introspection.utilities import (
     translate_state_keys,
@@ -74,7 +87,12 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
         uniquely identify this object.
 
         """
+        self.__raw_state = {}
         self.__state = {}
+        self.__state_timestamp = 0.0
+        self.__projection = None
+        self.__state_max_age = None
+        self.__snapshot_depth = 0
         self.__refresh_on_attribute = True
         self._set_properties(state_dict)
         self._path = path
@@ -84,20 +102,56 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
             self.id
         )
 
-    def _execute_query(self, query):
-        """Execute query object 'query' and return the result."""
-        return self._backend.execute_query_get_proxy_instances(
+    def _execute_query(self, query, properties=None):
+        """Execute query object 'query' and return the result.
+
+        :param properties: If given, only fetch these properties of the
+            objects found.
+
+        """
+        method = self._backend.execute_query_get_proxy_instances
+        return method(
+            query,
+            getattr(self, '_id', None),
+            **_properties_kwargs(method, properties)
+        )
+
+    async def _execute_query_async(self, query, properties=None):
+        """Execute query object 'query' without blocking and return the
+        result.
+
+        """
+        method = self._backend.execute_query_get_proxy_instances_async
+        return await method(
             query,
             getattr(self, '_id', None),
+            **_properties_kwargs(method, properties)
+        )
+
+    def _execute_queries(self, queries):
+        """Execute all the query objects in 'queries' as a single batch and
+        return a list of results, one for each query.
+
+        """
+        return self._backend.execute_queries_get_proxy_instances(
+            queries,
+            getattr(self, '_id', None),
         )
 
-    def _set_properties(self, state_dict):
+    def _set_properties(self, state_dict, properties=None):
         """Creates and set attributes of *self* based on contents of
         *state_dict*.
 
         .. note:: Translates '-' to '_', so a key of 'icon-type' for example
          becomes 'icon_type'.
 
+        Attribute values are not decoded until they're first read, since most
+        objects export many more properties than a test looks at.
+
+        :param properties: The names of the properties *state_dict* was
+            limited to, if it does not hold the whole state of the object.
+            Reading any other property fetches the whole state.
+
         """
         # don't store id in state dictionary - make it a proper instance
         # attribute. If id is not present, raise a ValueError.
@@ -108,19 +162,79 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
                 "State dictionary does not contain required 'id' key."
             )
 
+        self.__raw_state = translate_state_keys(state_dict)
+        self.__raw_state.pop('id', None)
         self.__state = {}
-        for key, value in translate_state_keys(state_dict).items():
-            if key == 'id':
-                continue
+        self.__state_timestamp = monotonic()
+        self.__projection = \
+            tuple(properties) if properties is not None else None
+
+    def _update_properties(self, state_dict, properties=None):
+        """Update the state of this object with *state_dict*, which was
+        fetched by a query made for another purpose, such as a search that
+        found this object again.
+
+        An object inside a :meth:`snapshot` or :meth:`no_automatic_refreshing`
+        block keeps the state it has. When *state_dict* only holds some
+        *properties* and this object has its whole state, they're merged
+        into it, so the other properties can still be read without fetching
+        them again.
+
+        """
+        if self.__snapshot_depth or not self.__refresh_on_attribute:
+            return
+        if properties is None or self.__projection is not None:
+            self._set_properties(state_dict, properties)
+            return
+        new_state = translate_state_keys(state_dict)
+        new_state.pop('id', None)
+        self.__raw_state.update(new_state)
+        for name in new_state:
+            self.__state.pop(name, None)
+
+    def _get_decoded_property(self, name):
+        """Return the value of the property *name*, decoding it from the raw
+        state if this is the first time it's been read since the last refresh.
+
+        :raises AttributeError: if there is no property called *name*, or its
+            value could not be decoded.
+
+        """
+        try:
+            return self.__state[name]
+        except KeyError:
+            pass
+        try:
+            value = create_value_instance(self.__raw_state[name], self, name)
+        except KeyError:
+            raise AttributeError(
+                "Class '%s' has no attribute '%s'." %
+                (self.__class__.__name__, name))
+        except ValueError as e:
+            _logger.warning(
+                "While constructing attribute '%s.%s': %s",
+                self.__class__.__name__,
+                name,
+                str(e)
+            )
+            del self.__raw_state[name]
+            raise AttributeError(
+                "Class '%s' has no attribute '%s'." %
+                (self.__class__.__name__, name))
+        self.__state[name] = value
+        return value
+
+    def _get_decoded_properties(self):
+        """Return a dictionary of all the properties in the current state,
+        without refreshing it.
+
+        """
+        for name in list(self.__raw_state):
             try:
-                self.__state[key] = create_value_instance(value, self, key)
-            except ValueError as e:
-                _logger.warning(
-                    "While constructing attribute '%s.%s': %s",
-                    self.__class__.__name__,
-                    key,
-                    str(e)
-                )
+                self._get_decoded_property(name)
+            except AttributeError:
+                pass
+        return self.__state.copy()
 
     def get_children_by_type(self, desired_type, **kwargs):
         """Get a list of children of the specified type.
@@ -164,9 +278,14 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
 
         """
         # Since we're grabbing __state directly there's no implied state
-        # refresh, so do it manually:
-        self.refresh_state()
-        props = self.__state.copy()
+        # refresh, so do it manually (unless the state we have is still fresh
+        # enough, or we're inside a snapshot). If we only have some of the
+        # properties, the rest must be fetched regardless:
+        if self.__projection is not None or (
+            not self.__snapshot_depth and self._state_is_stale()
+        ):
+            self.refresh_state()
+        props = self._get_decoded_properties()
         props['id'] = self.id
         return props
 
@@ -186,6 +305,15 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
         new_query = self._query.select_child(xpathselect.Query.WILDCARD)
         return self._execute_query(new_query)
 
+    async def get_children_async(self):
+        """Returns a list of all child objects, without blocking.
+
+        This is a coroutine version of :meth:`get_children`.
+
+        """
+        new_query = self._query.select_child(xpathselect.Query.WILDCARD)
+        return await self._execute_query_async(new_query)
+
     def _get_parent(self, base_object=None, level=1):
         """Returns the parent of this object.
 
@@ -194,10 +322,56 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
             if provided.
         """
         obj = base_object or self
-        new_query = obj._query
+        return obj._execute_query(obj._get_parent_query(level))[0]
+
+    def _get_parents(self, levels, filters={}):
+        """Returns the ancestors of this object at each of *levels* that match
+        *filters*.
+
+        All the ancestors are retrieved in a single batch of queries, rather
+        than with one round trip per ancestor. *filters* must all be
+        server-side filters, and ancestors that don't match them are left out
+        of the result by the application.
+        """
+        queries = [self._get_parent_query(level, filters) for level in levels]
+        return [
+            instance
+            for instances in self._execute_queries(queries)
+            for instance in instances[:1]
+        ]
+
+    def _get_parent_query(self, level, filters={}):
+        if filters:
+            new_query = self._get_filtered_ancestor_query(level, filters)
+        else:
+            new_query = self._query
         for i in range(level):
             new_query = new_query.select_parent()
-        return obj._execute_query(new_query)[0]
+        return new_query
+
+    def _get_filtered_ancestor_query(self, level, filters):
+        """Return a query for this object that passes through its ancestor
+        *level* levels up only if that ancestor matches *filters*.
+
+        The query selects this object, so *level* parent steps must be added
+        to it to select the ancestor. The wire protocol has no ancestor axis,
+        and filters can't be applied to parent steps, so this is how the
+        application is asked to check the filters for us.
+        """
+        nodes = [n for n in self._path.split(b'/') if n]
+        ancestor_index = len(nodes) - 1 - level
+        query = None
+        for i, node in enumerate(nodes):
+            node_filters = {}
+            if i == ancestor_index:
+                node_filters.update(filters)
+            if i == len(nodes) - 1:
+                node_filters['id'] = self.id
+            if query is None:
+                query = xpathselect.Query.root(node, node_filters)
+            else:
+                query = query.select_child(node, node_filters)
+        return query
 
     def _get_parent_nodes(self):
         parent_nodes = self.get_path().split('/')
@@ -232,30 +406,53 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
             # Raise if type_name is not a parent.
             if type_name_str not in parent_nodes:
                 raise StateNotFoundError(type_name_str, **kwargs)
-            for index, node in reversed(list(enumerate(parent_nodes))):
-                if node == type_name_str:
-                    parent_level = len(parent_nodes) - index
-                    parent = self._get_parent(level=parent_level)
-                    if _validate_object_properties(parent, **kwargs):
-                        return parent
+            levels = [
+                len(parent_nodes) - index
+                for index, node in reversed(list(enumerate(parent_nodes)))
+                if node == type_name_str
+            ]
+            if not kwargs:
+                # The closest parent of the right type is the only candidate.
+                levels = levels[:1]
         else:
-            # Keep a reference of the parent object to improve performance.
-            parent = self
-            for i in range(len(parent_nodes)):
-                parent = self._get_parent(base_object=parent)
-                if _validate_object_properties(parent, **kwargs):
-                    return parent
+            levels = range(1, len(parent_nodes) + 1)
+        if all(
+            xpathselect._is_valid_server_side_filter_param(k, v)
+            for k, v in kwargs.items()
+        ):
+            server_filters = kwargs
+        else:
+            server_filters = {}
+        # The ancestors were fetched just now, so check the filters against
+        # the state they came with rather than refreshing each of them:
+        for parent in self._get_parents(levels, server_filters):
+            if _object_passes_filters(parent, **kwargs):
+                return parent
         raise StateNotFoundError(type_name_str, **kwargs)
 
-    def _select(self, type_name_str, **kwargs):
+    def _select(self, type_name_str, ap_properties=None, **kwargs):
         """Base method to execute search query on the DBus."""
-        new_query = self._query.select_descendant(type_name_str, kwargs)
+        return self._execute_query(
+            self._get_select_query(type_name_str, kwargs),
+            ap_properties
+        )
+
+    async def _select_async(self, type_name_str, ap_properties=None,
+                            **kwargs):
+        """Base method to execute search query on the DBus, without blocking.
+        """
+        return await self._execute_query_async(
+            self._get_select_query(type_name_str, kwargs),
+            ap_properties
+        )
+
+    def _get_select_query(self, type_name_str, kwargs):
         _logger.debug(
             "Selecting object(s) of %s with attributes: %r",
             'any type' if type_name_str == '*' else 'type ' + type_name_str,
             kwargs
         )
-        return self._execute_query(new_query)
+        return self._query.select_descendant(type_name_str, kwargs)
 
     def _select_single(self, type_name, **kwargs):
         """
@@ -264,11 +461,7 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
         """
         type_name_str = get_type_name(type_name)
         instances = self._select(type_name_str, **kwargs)
-        if not instances:
-            raise StateNotFoundError(type_name_str, **kwargs)
-        if len(instances) > 1:
-            raise ValueError("More than one item was returned for query")
-        return instances[0]
+        return _get_single_instance(instances, type_name_str, kwargs)
 
     def select_single(self, type_name='*', **kwargs):
         """Get a single node from the introspection tree, with type equal to
@@ -309,6 +502,26 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
         """
         return self._select_single(type_name, **kwargs)
 
+    async def select_single_async(self, type_name='*', **kwargs):
+        """Get a single node from the introspection tree, without blocking.
+
+        This is a coroutine version of :meth:`select_single`, and takes the
+        same arguments. Use it to run many queries concurrently, for example::
+
+            button, label = await asyncio.gather(
+                app.select_single_async('QPushButton', objectName='clickme'),
+                app.select_single_async('QLabel', objectName='status'),
+            )
+
+        :raises ValueError: if the query returns more than one item.
+
+        :raises StateNotFoundError: if the requested object was not found.
+
+        """
+        type_name_str = get_type_name(type_name)
+        instances = await self._select_async(type_name_str, **kwargs)
+        return _get_single_instance(instances, type_name_str, kwargs)
+
     def wait_select_single(self, type_name='*', ap_query_timeout=10, **kwargs):
         """Get a proxy object matching some search criteria, retrying if no
         object is found until a timeout is reached.
@@ -361,19 +574,29 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
         if ap_query_timeout <= 0:
             return self._select_single(type_name, **kwargs)
 
-        for i in range(ap_query_timeout):
-            try:
-                return self._select_single(type_name, **kwargs)
-            except StateNotFoundError:
-                sleep(1)
-        raise StateNotFoundError(type_name, **kwargs)
-
-    def _select_many(self, type_name, **kwargs):
+        poller = Poller(ap_query_timeout)
+        # Only subscribe to changes if the object isn't there yet:
+        try:
+            return self._select_single(type_name, **kwargs)
+        except StateNotFoundError:
+            pass
+        query = self._get_select_query(get_type_name(type_name), kwargs)
+        with self._watch_state_changes(query) as changes:
+            while True:
+                try:
+                    return self._select_single(type_name, **kwargs)
+                except StateNotFoundError:
+                    if poller.expired:
+                        raise StateNotFoundError(type_name, **kwargs)
+                    poller.wait(changes.wait)
+
+    def _select_many(self, type_name, ap_properties=None, **kwargs):
         """Executes a query, with no restraints on the number of results."""
         type_name_str = get_type_name(type_name)
-        return self._select(type_name_str, **kwargs)
+        return self._select(type_name_str, ap_properties, **kwargs)
 
-    def select_many(self, type_name='*', ap_result_sort_keys=None, **kwargs):
+    def select_many(self, type_name='*', ap_result_sort_keys=None,
+                    ap_properties=None, **kwargs):
         """Get a list of nodes from the introspection tree, with type equal to
         *type_name* and (optionally) matching the keyword filters present in
         *kwargs*.
@@ -397,6 +620,26 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
             # returns a list of QAction objects who appear below file_menu in
             # the object tree.
 
+        Keyword filters don't have to be plain values. A filter may also be a
+        testtools matcher, a compiled regular expression or a callable that
+        takes the attribute value and returns True or False::
+
+            app.select_many('QLabel', text=re.compile(r'^Item [0-9]+$'))
+            app.select_many('QSlider', value=GreaterThan(50))
+            app.select_many('QLabel', width=lambda w: 10 <= w < 100)
+
+        These filters are always evaluated by autopilot rather than the
+        application, see :ref:`client_side_filters` for details.
+
+        If only a few properties of each object will be read, name them in
+        *ap_properties* so the application doesn't send the others::
+
+            labels = app.select_many('QLabel', ap_properties=['text'])
+            texts = [label.text for label in labels]
+
+        Reading any other property of the objects returned fetches the rest
+        of its state (see :ref:`property_projection`).
+
         .. warning::
             The order in which objects are returned is not guaranteed. It is
             bad practise to write tests that depend on the order in which
@@ -413,7 +656,13 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
 
         :param ap_result_sort_keys: list of object properties to sort the
             query result with (sort key priority starts with element 0 as
-            highest priority and then descends down the list).
+            highest priority and then descends down the list). The results
+            are sorted by the state returned with the query, without
+            refreshing each object.
+
+        :param ap_properties: list of the only object properties to fetch
+            from the application. Properties needed for sorting or filtering
+            are fetched as well.
 
         :raises ValueError: if neither *type_name* or keyword filters are
             provided.
@@ -422,9 +671,66 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
             Tutorial Section :ref:`custom_proxy_classes`
 
         """
-        instances = self._select_many(type_name, **kwargs)
+        instances = self._select_many(
+            type_name,
+            _get_sort_properties(ap_properties, ap_result_sort_keys),
+            **kwargs
+        )
         return sort_by_keys(instances, ap_result_sort_keys)
 
+    async def select_many_async(
+            self, type_name='*', ap_result_sort_keys=None, ap_properties=None,
+            **kwargs):
+        """Get a list of nodes from the introspection tree, without blocking.
+
+        This is a coroutine version of :meth:`select_many`, and takes the same
+        arguments.
+
+        """
+        instances = await self._select_async(
+            get_type_name(type_name),
+            _get_sort_properties(ap_properties, ap_result_sort_keys),
+            **kwargs
+        )
+        return sort_by_keys(instances, ap_result_sort_keys)
+
+    def iter_select(self, type_name='*', batch_size=100, ap_properties=None,
+                    **kwargs):
+        """Iterate over nodes from the introspection tree, with type equal to
+        *type_name* and (optionally) matching the keyword filters present in
+        *kwargs*.
+
+        This takes the same filters as :meth:`select_many`, but returns an
+        iterator rather than a list, and fetches the objects *batch_size* at
+        a time as it is advanced::
+
+            for item in app.iter_select('QQuickItem', batch_size=100):
+                if item.objectName == 'target':
+                    break
+
+        Use it for queries that match very many objects. See
+        :ref:`iterating_over_results` for details.
+
+        :param batch_size: The number of objects to fetch at a time.
+        :param ap_properties: list of the only object properties to fetch
+            from the application, as for :meth:`select_many`.
+
+        :raises ValueError: if neither *type_name* or keyword filters are
+            provided, or if *batch_size* is less than 1.
+
+        """
+        if batch_size < 1:
+            raise ValueError(
+                "batch_size must be at least 1, not %r." % batch_size
+            )
+        method = self._backend.iter_query_get_proxy_instances
+        return method(
+            self._get_select_query(get_type_name(type_name), kwargs),
+            getattr(self, '_id', None),
+            batch_size,
+            **_properties_kwargs(method, ap_properties)
+        )
+
     def wait_select_many(
             self,
             type_name='*',
@@ -478,7 +784,9 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
 
         :param ap_result_sort_keys: list of object properties to sort the
             query result with (sort key priority starts with element 0 as
-            highest priority and then descends down the list).
+            highest priority and then descends down the list). The results
+            are sorted by the state returned with the query, without
+            refreshing each object.
 
         :raises ValueError: if neither *type_name* or keyword filters are
             provided. Also raises, if search result count does not match the
@@ -497,26 +805,57 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
                 raise ValueError(exception_message)
             return sort_by_keys(instances, ap_result_sort_keys)
 
-        for i in range(ap_query_timeout):
-            instances = self._select_many(type_name, **kwargs)
-            if len(instances) >= ap_result_count:
-                return sort_by_keys(instances, ap_result_sort_keys)
-            sleep(1)
-        raise ValueError(exception_message)
-
-    def refresh_state(self):
+        poller = Poller(ap_query_timeout)
+        # Only subscribe to changes if there aren't enough objects yet:
+        instances = self._select_many(type_name, **kwargs)
+        if len(instances) >= ap_result_count:
+            return sort_by_keys(instances, ap_result_sort_keys)
+        query = self._get_select_query(get_type_name(type_name), kwargs)
+        with self._watch_state_changes(query) as changes:
+            while True:
+                instances = self._select_many(type_name, **kwargs)
+                if len(instances) >= ap_result_count:
+                    return sort_by_keys(instances, ap_result_sort_keys)
+                if poller.expired:
+                    raise ValueError(exception_message)
+                poller.wait(changes.wait)
+
+    def refresh_state(self, only=None):
         """Refreshes the object's state.
 
         You should probably never have to call this directly. Autopilot
         automatically retrieves new state every time this object's attributes
         are read.
 
+        :param only: If given, a list of the properties to fetch. The other
+            properties are fetched again when one of them is next read. Until
+            then, reading one of the properties in *only* just refreshes the
+            properties in *only*.
+
         :raises StateNotFound: if the object in the application under test
             has been destroyed.
 
         """
-        _, new_state = self._get_new_state()
-        self._set_properties(new_state)
+        _, new_state = self._get_new_state(only)
+        self._set_properties(new_state, only)
+
+    async def refresh_state_async(self, only=None):
+        """Refreshes the object's state, without blocking.
+
+        This is a coroutine version of :meth:`refresh_state`. Use it together
+        with :meth:`no_automatic_refreshing` to read several attributes from
+        the state retrieved::
+
+            await obj.refresh_state_async()
+            with obj.no_automatic_refreshing():
+                x, width = obj.x, obj.width
+
+        :raises StateNotFound: if the object in the application under test
+            has been destroyed.
+
+        """
+        _, new_state = await self._get_new_state_async(only)
+        self._set_properties(new_state, only)
 
     def get_all_instances(self):
         """Get all instances of this class that exist within the Application
@@ -554,28 +893,80 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
     def __getattr__(self, name):
         # avoid recursion if for some reason we have no state set (should never
         # happen).
-        if name == '__state':
+        if name in ('_DBusIntrospectionObject__raw_state', '__state'):
             raise AttributeError()
 
-        if name in self.__state:
-            if self.__refresh_on_attribute:
-                self.refresh_state()
-            return self.__state[name]
+        if name in self.__raw_state:
+            if (
+                self.__refresh_on_attribute
+                and not self.__snapshot_depth
+                and self._state_is_stale()
+            ):
+                self.refresh_state(self.__projection)
+            return self._get_decoded_property(name)
+        if self.__projection is not None:
+            # Only some of the properties were fetched, and this isn't one of
+            # them:
+            self.refresh_state()
+            if name in self.__raw_state:
+                return self._get_decoded_property(name)
         # attribute not found.
         raise AttributeError(
             "Class '%s' has no attribute '%s'." %
             (self.__class__.__name__, name))
 
-    def _get_new_state(self):
+    def _watch_state_changes(self, query=None, properties=()):
+        """Return a context manager for waiting until the application reports
+        a change to the objects matched by *query* (by default, this object).
+
+        The value of the context manager has a ``wait(timeout)`` method, to
+        pass to :meth:`autopilot._timeout.Poller.wait`. When the application
+        cannot report changes, it sleeps for the whole timeout instead.
+
+        Subscribing to changes costs round trips to the application, so
+        check whatever is being waited for once before entering it.
+
+        :param properties: Only wake up for changes to these properties.
+
+        """
+        if not isinstance(self._backend, Backend):
+            return PollingStateWatch()
+        return self._backend.watch_state_changes(
+            query or self._query,
+            properties
+        )
+
+    def _get_new_state(self, properties=None):
         """Retrieve a new state dictionary for this class instance.
 
         You should probably never need to call this directly.
 
         .. note:: The state keys in the returned dictionary are not translated.
 
+        :param properties: If given, only retrieve these properties.
+
+        """
+        try:
+            return _execute_query_get_data(
+                self._backend,
+                self._query,
+                properties
+            )[0]
+        except IndexError:
+            raise StateNotFoundError(self.__class__.__name__, id=self.id)
+
+    async def _get_new_state_async(self, properties=None):
+        """Retrieve a new state dictionary for this class instance, without
+        blocking.
+
         """
+        data = await _execute_query_get_data_async(
+            self._backend,
+            self._query,
+            properties
+        )
         try:
-            return self._backend.execute_query_get_data(self._query)[0]
+            return data[0]
         except IndexError:
             raise StateNotFoundError(self.__class__.__name__, id=self.id)
 
@@ -591,16 +982,23 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
         :raises RuntimeError: if the method timed out.
 
         """
-        for i in range(timeout):
-            try:
-                self._get_new_state()
-                sleep(1)
-            except StateNotFoundError:
-                return
-        else:
-            raise RuntimeError(
-                "Object was not destroyed after %d seconds" % timeout
-            )
+        poller = Poller(timeout)
+        # Only subscribe to changes if the object is still there:
+        try:
+            self._get_new_state()
+        except StateNotFoundError:
+            return
+        with self._watch_state_changes() as changes:
+            while True:
+                try:
+                    self._get_new_state()
+                except StateNotFoundError:
+                    return
+                if poller.expired:
+                    raise RuntimeError(
+                        "Object was not destroyed after %d seconds" % timeout
+                    )
+                poller.wait(changes.wait)
 
     def is_moving(self, gap_interval=0.1):
         """Check if the element is moving.
@@ -647,57 +1045,46 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
             )
         )
 
-    def print_tree(self, output=None, maxdepth=None, _curdepth=0):
+    def print_tree(self, output=None, maxdepth=None, format='text'):
         """Print properties of the object and its children to a stream.
 
         When writing new tests, this can be called when it is too difficult to
         find the widget or property that you are interested in in "vis".
 
+        The children of each group of sibling objects are fetched with one
+        batch of DBus queries, and each object is written out as soon as it
+        has been fetched, so even very large trees are printed quickly
+        without being held in memory.
+
         .. warning:: Do not use this in production tests, this is expensive and
             not at all appropriate for actual testing. Only call this
             temporarily and replace with proper select_single/select_many
             calls.
 
         :param output: A file object or path name where the output will be
-            written to. If not given, write to stdout.
+            written to. If not given, write to stdout. A file opened from a
+            path name is closed again once the tree has been written.
 
         :param maxdepth: If given, limit the maximum recursion level to that
             number, i. e. only print children which have at most maxdepth-1
             intermediate parents.
 
-        """
-        if maxdepth is not None and _curdepth > maxdepth:
-            return
+        :param format: 'text' (the default) for a human readable listing,
+            'json' for one JSON document per object, with 'path', 'depth' and
+            'state' keys, or 'binary' for the 'json' format compressed with
+            gzip. For 'binary', a file object given as *output* must be
+            opened in binary mode.
 
-        indent = "  " * _curdepth
-        if output is None:
-            output = sys.stdout
-        elif isinstance(output, str):
-            output = open(output, 'w')
-
-        # print path
-        if _curdepth > 0:
-            output.write("\n")
-        output.write("%s== %s ==\n" % (indent, self._path.decode('utf-8')))
-        # Thomi 2014-03-20: For all levels other than the top level, we can
-        # avoid an entire dbus round trip if we grab the underlying property
-        # dictionary directly. We can do this since the print_tree function
-        # that called us will have retrieved us via a call to get_children(),
-        # which gets the latest state anyway.
-        if _curdepth > 0:
-            properties = self.__state.copy()
-        else:
-            properties = self.get_properties()
-        # print properties
-        try:
-            for key in sorted(properties.keys()):
-                output.write("%s%s: %r\n" % (indent, key, properties[key]))
-            # print children
-            if maxdepth is None or _curdepth < maxdepth:
-                for c in self.get_children():
-                    c.print_tree(output, maxdepth, _curdepth + 1)
-        except StateNotFoundError as error:
-            output.write("%sError: %s\n" % (indent, error))
+        :raises StateNotFoundError: if this object no longer exists.
+        :raises ValueError: if *format* is not supported.
+
+        """
+        check_tree_format(format)
+        write_tree(
+            _iter_subtree(self._backend, self._path, self.id, maxdepth),
+            output,
+            format
+        )
 
     def get_path(self):
         """Return the absolute path of the dbus node"""
@@ -720,11 +1107,89 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
         loop, or if you want to atomicaly check several attributes at once.
 
         """
+        old_refresh_on_attribute = self.__refresh_on_attribute
         try:
             self.__refresh_on_attribute = False
             yield
         finally:
-            self.__refresh_on_attribute = True
+            self.__refresh_on_attribute = old_refresh_on_attribute
+
+    @contextmanager
+    def snapshot(self):
+        """Context manager function to read attributes from a single,
+        consistent copy of the object's state.
+
+        The state is refreshed once when the block is entered, and every
+        attribute read (and :meth:`get_properties` call) within the block is
+        served from that state without any further DBus traffic.
+
+        Example usage::
+
+            with instance.snapshot():
+                bottom = instance.y + instance.height
+
+        """
+        self.refresh_state()
+        self.__snapshot_depth += 1
+        try:
+            yield self
+        finally:
+            self.__snapshot_depth -= 1
+
+    def snapshot_subtree(self):
+        """Copy this object and everything below it in the introspection
+        tree, so it can be searched without asking the application.
+
+        The copy is made with one batch of DBus queries for each level of
+        the tree below this object. After that, the :meth:`select_single`,
+        :meth:`select_many`, :meth:`get_children` and :meth:`get_parent`
+        methods of the returned snapshot (and of the proxy objects it
+        returns) are answered from the copy, without any DBus traffic.
+        This is much faster when a test searches an unchanging part of the
+        application many times::
+
+            screen = main_window.snapshot_subtree()
+            labels = screen.select_many('QLabel')
+            ok_button = screen.select_single('QPushButton', text='OK')
+
+        The copy is never updated. Once the application changes, use
+        :meth:`~autopilot.introspection.SubtreeSnapshot.is_stale` to check,
+        and take a new snapshot.
+
+        :returns: A :class:`~autopilot.introspection.SubtreeSnapshot`.
+        :raises StateNotFoundError: if this object no longer exists.
+
+        """
+        backend = SnapshotBackend(self._backend, self._path, self.id)
+        root = backend.execute_query_get_proxy_instances(
+            self._query,
+            getattr(self, '_id', None),
+        )[0]
+        return SubtreeSnapshot(root, backend)
+
+    def set_state_max_age(self, max_age):
+        """Set how old this object's state may get before reading an attribute
+        refreshes it.
+
+        By default every attribute read refreshes the object's state. Setting
+        a maximum age lets attribute reads that happen within *max_age*
+        seconds of the last refresh reuse the state already retrieved.
+
+        :param max_age: The maximum state age in seconds. 0 refreshes the
+            state on every read, and None uses the global setting from
+            :func:`autopilot.globals.set_state_max_age`.
+
+        """
+        self.__state_max_age = max_age
+
+    def _state_is_stale(self):
+        """Return True if the state must be refreshed before it's read."""
+        max_age = self.__state_max_age
+        if max_age is None:
+            max_age = get_state_max_age()
+        if max_age <= 0:
+            return True
+        return monotonic() - self.__state_timestamp > max_age
 
     @classmethod
     def validate_dbus_object(cls, path, _state):
@@ -782,6 +1247,87 @@ class DBusIntrospectionObject(DBusIntrospectionObjectBase):
 CustomEmulatorBase = DBusIntrospectionObject
 
 
+class SubtreeSnapshot(object):
+
+    """A copy of part of an application's introspection tree.
+
+    Returned by :meth:`ProxyBase.snapshot_subtree`. Searches on the snapshot,
+    and on the proxy objects it returns, only see the copy: the object the
+    snapshot was taken from, its descendants and its ancestors. Waiting for a
+    proxy object from a snapshot to change will time out, since the copy
+    never changes.
+
+    """
+
+    def __init__(self, root, backend):
+        self._root = root
+        self._backend = backend
+
+    @property
+    def root(self):
+        """The proxy object for the object the snapshot was taken from."""
+        return self._root
+
+    @property
+    def age(self):
+        """The number of seconds since the snapshot was taken."""
+        return self._backend.age
+
+    def is_stale(self):
+        """Return True if the application has changed the copied part of its
+        introspection tree since the snapshot was taken.
+
+        This fetches the subtree from the application again, so it's as slow
+        as taking a new snapshot.
+
+        """
+        return self._backend.is_stale()
+
+    def to_dict(self):
+        """Return the copied tree as a dictionary.
+
+        The dictionary holds plain data, so it can be saved with the json
+        module. Pass it to
+        :func:`~autopilot.introspection.get_proxy_object_for_tree` to search
+        it again later, for example in a unit test.
+
+        """
+        return self._backend.root.to_dict()
+
+    def select_single(self, type_name='*', **kwargs):
+        """Like :meth:`ProxyBase.select_single`, but searches the snapshot."""
+        return self._root.select_single(type_name, **kwargs)
+
+    def select_many(self, type_name='*', ap_result_sort_keys=None, **kwargs):
+        """Like :meth:`ProxyBase.select_many`, but searches the snapshot."""
+        return self._root.select_many(
+            type_name,
+            ap_result_sort_keys,
+            **kwargs
+        )
+
+    def get_children(self):
+        """Like :meth:`ProxyBase.get_children`, but searches the snapshot."""
+        return self._root.get_children()
+
+    def get_children_by_type(self, desired_type, **kwargs):
+        """Like :meth:`ProxyBase.get_children_by_type`, but
+        searches the snapshot.
+
+        """
+        return self._root.get_children_by_type(desired_type, **kwargs)
+
+    def get_parent(self, type_name='', **kwargs):
+        """Like :meth:`ProxyBase.get_parent`, but searches the snapshot."""
+        return self._root.get_parent(type_name, **kwargs)
+
+    def __repr__(self):
+        return "<SubtreeSnapshot of %r, taken %.1f seconds ago>" % (
+            self._root,
+            self.age
+        )
+
+
 def get_type_name(maybe_string_or_class):
     """Get a type name from something that might be a class or a string.
 
@@ -801,6 +1347,48 @@ def _get_class_type_name(maybe_cpo_class):
         return maybe_cpo_class.__name__
 
 
+def _get_single_instance(instances, type_name_str, kwargs):
+    """Return the only item in *instances*.
+
+    :raises StateNotFoundError: if *instances* is empty.
+    :raises ValueError: if *instances* contains more than one item.
+    """
+    if not instances:
+        raise StateNotFoundError(type_name_str, **kwargs)
+    if len(instances) > 1:
+        raise ValueError("More than one item was returned for query")
+    return instances[0]
+
+
+def _get_sort_properties(properties, sort_keys):
+    """Return the list of *properties*, plus the properties needed to sort
+    by *sort_keys*, or None if *properties* is None.
+
+    """
+    if properties is None:
+        return None
+    properties = list(properties)
+    if isinstance(sort_keys, list):
+        for sort_key in sort_keys:
+            if isinstance(sort_key, str):
+                name = sort_key.split('.')[0]
+                if name not in properties:
+                    properties.append(name)
+    return properties
+
+
+def _get_global_rect(dbus_object):
+    """Return the current globalRect of *dbus_object*, without fetching the
+    rest of its state.
+
+    """
+    if isinstance(dbus_object, DBusIntrospectionObject):
+        dbus_object.refresh_state(only=['globalRect'])
+        with dbus_object.no_automatic_refreshing():
+            return dbus_object.globalRect
+    return dbus_object.globalRect
+
+
 def _validate_object_properties(item, **kwargs):
     """Returns bool representing if the properties specified in *kwargs*
     match the provided object *item*."""
@@ -894,8 +1482,8 @@ class _MockableDbusObject:
 
         :return: True, if the element is moving, otherwise False.
         """
-        x1, y1, h1, w1 = self._get_default_dbus_object().globalRect
+        x1, y1, h1, w1 = _get_global_rect(self._get_default_dbus_object())
         sleep(gap_interval)
-        x2, y2, h2, w2 = self._get_secondary_dbus_object().globalRect
+        x2, y2, h2, w2 = _get_global_rect(self._get_secondary_dbus_object())
 
         return x1 != x2 or y1 != y2
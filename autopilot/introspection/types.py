@@ -45,8 +45,9 @@ import dbus
 import logging
 from testtools.matchers import Equals
 
+from autopilot._timeout import Poller
 from autopilot.introspection.utilities import translate_state_keys
-from autopilot.utilities import sleep, compatible_repr
+from autopilot.utilities import compatible_repr
 
 
 _logger = logging.getLogger(__name__)
@@ -151,34 +152,42 @@ class TypeBase(object):
         if not is_matcher:
             expected_value = Equals(expected_value)
 
-        time_left = timeout
-        while True:
-            # TODO: These next three lines are duplicated from the parent...
-            # can we just have this code once somewhere?
-            _, new_state = self.parent._get_new_state()
+        def get_mismatch():
+            # TODO: These next three lines are duplicated from the
+            # parent... can we just have this code once somewhere?
+            # Only this attribute is needed, so don't fetch the others:
+            _, new_state = self.parent._get_new_state([self.name])
             new_state = translate_state_keys(new_state)
             new_value = new_state[self.name][1:]
             if len(new_value) == 1:
                 new_value = make_unicode(new_value[0])
             # Support for testtools.matcher classes:
             mismatch = expected_value.match(new_value)
-            if mismatch:
-                failure_msg = mismatch.describe()
-            else:
-                self.parent._set_properties(new_state)
-                return
-
-            if time_left >= 1:
-                sleep(1)
-                time_left -= 1
-            else:
-                sleep(time_left)
-                break
+            if not mismatch:
+                self.parent._update_properties(new_state, [self.name])
+            return mismatch
+
+        poller = Poller(timeout)
+        # Only subscribe to changes if the value isn't what we expect yet:
+        mismatch = get_mismatch()
+        if not mismatch:
+            return
+        # If the application can tell us when the value changes we wake up as
+        # soon as it does, otherwise this polls with a growing interval:
+        with self.parent._watch_state_changes(properties=[self.name]) as \
+                changes:
+            while True:
+                mismatch = get_mismatch()
+                if not mismatch:
+                    return
+                if poller.expired:
+                    break
+                poller.wait(changes.wait)
 
         raise AssertionError(
             "After %.1f seconds test on %s.%s failed: %s" % (
                 timeout, self.parent.__class__.__name__, self.name,
-                failure_msg))
+                mismatch.describe()))
 
 
 class PlainType(TypeBase):
@@ -274,30 +283,59 @@ _integer_str = _integer_repr
 
 
 def _make_plain_type(value, parent=None, name=None):
-    new_type = _get_plain_type_class(type(value), parent, name)
-    return new_type(value)
-
-
-# Thomi 2014-03-27: dbus types are immutable, which means that we cannot set
-# parent and name on the instances we create. This means we have to set them
-# as type attributes, which means that this cache doesn't speed things up that
-# much. Ideally we'd not rely on the dbus types at all, and simply transform
-# them into our own types, but that's work for a separate branch.
+    # bool can't be subclassed, so values that didn't come over dbus (from an
+    # in-memory tree, for example) are wrapped in the dbus type first:
+    if type(value) is bool:
+        value = dbus.Boolean(value)
+    new_type = _get_plain_type_class(type(value))
+    new_value = new_type(value)
+    # dbus types are immutable: their __setattr__ refuses every attribute, so
+    # parent and name are written straight into the instance dictionary that
+    # our python-level subclass provides.
+    new_value.__dict__.update(parent=parent, name=name)
+    return new_value
+
+
+# Thomi 2014-03-27: Ideally we'd not rely on the dbus types at all, and simply
+# transform them into our own types, but that's work for a separate branch.
 #
-# Further to the above, we cannot cache these results, since the hash for
-# the parent parameter is almost always the same, leading to incorrect cache
-# hits. We really need to implement our own types here I think.
-def _get_plain_type_class(value_class, parent, name):
+# The generated class only depends on the dbus value class (parent and name
+# live on the instance), so we build each class once and reuse it for every
+# attribute of every proxy object.
+_plain_type_classes = {}
+
+
+def _get_plain_type_class(value_class):
+    try:
+        return _plain_type_classes[value_class]
+    except KeyError:
+        pass
+    if issubclass(value_class, PlainType):
+        return value_class
     new_type_name = value_class.__name__
     new_type_bases = (value_class, PlainType)
-    new_type_dict = dict(parent=parent, name=name)
+    new_type_dict = dict(parent=None, name=None)
+    if value_class.__init__ is not object.__init__:
+        new_type_dict['__init__'] = _make_plain_type_init(value_class)
     repr_callable = _get_repr_callable_for_value_class(value_class)
     if repr_callable:
         new_type_dict['__repr__'] = repr_callable
     str_callable = _get_str_callable_for_value_class(value_class)
     if str_callable:
         new_type_dict['__str__'] = str_callable
-    return type(new_type_name, new_type_bases, new_type_dict)
+    new_type = type(new_type_name, new_type_bases, new_type_dict)
+    _plain_type_classes[value_class] = new_type
+    return new_type
+
+
+def _make_plain_type_init(value_class):
+    # PlainType(value, parent=..., name=...) goes on to call __init__ with the
+    # same arguments. dbus types with their own __init__ (Array, Dictionary)
+    # reject parent and name, so they're dropped here; _make_plain_type has
+    # already stored them on the instance.
+    def __init__(self, *args, parent=None, name=None, **kwargs):
+        value_class.__init__(self, *args, **kwargs)
+    return __init__
 
 
 def _array_packed_type(num_args):
@@ -18,7 +18,7 @@
 #
 
 import os
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 
 from dbus import Interface
 
@@ -51,18 +51,26 @@ def translate_state_keys(state_dict):
 
 
 def sort_by_keys(instances, sort_keys):
-    """Sorts DBus object instances by requested keys."""
+    """Sorts DBus object instances by requested keys.
+
+    The keys are read from the state each proxy object already has, so
+    sorting the results of a query does not refresh every object once for
+    each key. Dotted keys, like 'globalRect.y', are looked up on the decoded
+    attribute values.
+
+    """
     def get_sort_key(item):
         sort_key = []
-        for sk in sort_keys:
-            if not isinstance(sk, str):
-                raise ValueError(
-                    'Parameter `sort_keys` must be a list of strings'
-                )
-            value = item
-            for key in sk.split('.'):
-                value = getattr(value, key)
-            sort_key.append(value)
+        with _without_automatic_refreshing(item):
+            for sk in sort_keys:
+                if not isinstance(sk, str):
+                    raise ValueError(
+                        'Parameter `sort_keys` must be a list of strings'
+                    )
+                value = item
+                for key in sk.split('.'):
+                    value = getattr(value, key)
+                sort_key.append(value)
         return sort_key
 
     if sort_keys and not isinstance(sort_keys, list):
@@ -72,6 +80,16 @@ def sort_by_keys(instances, sort_keys):
     return instances
 
 
+def _without_automatic_refreshing(item):
+    """Return a context manager in which reading the attributes of *item*
+    does not refresh its state, if *item* is a proxy object.
+
+    """
+    if getattr(type(item), 'no_automatic_refreshing', None) is None:
+        return nullcontext()
+    return item.no_automatic_refreshing()
+
+
 class ProcessUtil:
     """Helper class to manipulate running processes."""
 
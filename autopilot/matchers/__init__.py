@@ -23,6 +23,7 @@
 from functools import partial
 from testtools.matchers import Matcher, Mismatch
 
+from autopilot._timeout import Poller
 from autopilot.utilities import sleep
 
 
@@ -60,7 +61,9 @@ class Eventually(Matcher):
 
     In this example we're using the :func:`autopilot.platform.model` function
     as a callable. In this form, Eventually matches against the return value
-    of the callable.
+    of the callable. When the callable is a method of a proxy object,
+    Eventually checks again as soon as the application reports a change to
+    that object. Other callables are polled.
 
     This can also be used to use a regular python property inside an Eventually
     matcher::
@@ -122,23 +125,56 @@ def _callable_wait_for(refresh_fn, matcher, timeout):
     instead of patched variables.
 
     """
-    time_left = timeout
-    while True:
-        new_value = refresh_fn()
-        mismatch = matcher.match(new_value)
-        if mismatch:
-            failure_msg = mismatch.describe()
-        else:
-            return
-
-        if time_left >= 1:
-            sleep(1)
-            time_left -= 1
-        else:
-            sleep(time_left)
-            break
+    poller = Poller(timeout)
+    # Only subscribe to changes if the value isn't what we expect yet:
+    mismatch = matcher.match(refresh_fn())
+    if not mismatch:
+        return
+    watch_state_changes = _get_state_watcher(refresh_fn)
+    if watch_state_changes is None:
+        mismatch = _poll_for_match(refresh_fn, matcher, poller)
+    else:
+        with watch_state_changes() as changes:
+            mismatch = _poll_for_match(
+                refresh_fn,
+                matcher,
+                poller,
+                changes.wait
+            )
+    if not mismatch:
+        return
 
     # can't give a very descriptive message here, especially as refresh_fn
     # is likely to be a lambda.
     raise AssertionError(
-        "After %.1f seconds test failed: %s" % (timeout, failure_msg))
+        "After %.1f seconds test failed: %s" % (timeout, mismatch.describe()))
+
+
+def _get_state_watcher(refresh_fn):
+    """Return the ``_watch_state_changes`` method of the proxy object
+    *refresh_fn* is a method of, or None if it isn't a method of a proxy
+    object.
+
+    A method of a proxy object wakes up as soon as the application reports a
+    change to that object. Any other callable, such as a lambda, is polled.
+
+    """
+    proxy = getattr(refresh_fn, '__self__', None)
+    watch_state_changes = getattr(proxy, '_watch_state_changes', None)
+    if callable(watch_state_changes):
+        return watch_state_changes
+    return None
+
+
+def _poll_for_match(refresh_fn, matcher, poller, wait_fn=sleep):
+    """Poll *refresh_fn* until its value matches *matcher*, or *poller*
+    expires.
+
+    :returns: None if the value matched, or the last mismatch.
+
+    """
+    while True:
+        mismatch = matcher.match(refresh_fn())
+        if not mismatch or poller.expired:
+            return mismatch
+        poller.wait(wait_fn)
@@ -18,7 +18,7 @@
 #
 
 
-from argparse import ArgumentParser, Action, REMAINDER
+from argparse import ArgumentParser, ArgumentTypeError, Action, REMAINDER
 from codecs import open
 from collections import OrderedDict
 import cProfile
@@ -42,7 +42,9 @@ from autopilot._debug import (
     get_all_debug_profiles,
     get_default_debug_profile,
 )
+from autopilot import _parallel
 from autopilot import _video
+from autopilot.introspection import _traffic
 from autopilot.testresult import get_default_format, get_output_formats
 from autopilot.utilities import DebugLogFilter, LogFormatter
 from autopilot.application._launcher import (
@@ -139,6 +141,26 @@ def _get_parser():
         "which make it impossible to abort a test case. Tests aborted will "
         "raise a 'TimeoutException' error."
     )
+    parser_run.add_argument(
+        "--record-introspection", default=None, metavar="FILE",
+        help="If set, autopilot will record every introspection query it "
+        "sends to the applications under test, and their replies, to FILE "
+        "(compressed if FILE ends in '.gz'). The recording can be replayed "
+        "without the applications, see "
+        "autopilot.introspection.get_proxy_object_for_recording."
+    )
+    parser_run.add_argument(
+        "--parallel", default=1, type=_positive_integer, metavar="N",
+        help="If set, autopilot will split the tests between N worker "
+        "processes and run them at the same time. Each worker runs its tests "
+        "on its own Xvfb display, with its own DBus session bus. Requires "
+        "Xvfb, dbus-run-session and python3-subunit to be installed."
+    )
+    parser_run.add_argument(
+        "--load-list", default=None, metavar="FILE",
+        help="If set, autopilot will only run the tests whose ids are listed "
+        "in FILE, one per line."
+    )
     parser_run.add_argument("suite", nargs="+",
                             help="Specify test suite(s) to run.")
 
@@ -212,6 +234,13 @@ def _parse_arguments(argv=None):
     return args
 
 
+def _positive_integer(value):
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError("must be at least 1, not %d" % number)
+    return number
+
+
 class _OneOrMoreArgumentStoreAction(Action):
 
     def __call__(self, parser, namespace, values, option_string=None):
@@ -478,6 +507,18 @@ def load_test_suite_from_name(test_names):
     return (TestSuite(filtered_tests.values()), error_occured)
 
 
+def _filter_tests_by_id_list(test_suite, path):
+    """Return a TestSuite of the tests in *test_suite* whose ids are listed
+    in the file at *path*, one per line.
+
+    """
+    with open(path, encoding='utf-8') as f:
+        test_ids = set(line.strip() for line in f if line.strip())
+    return TestSuite(
+        t for t in iterate_tests(test_suite) if t.id() in test_ids
+    )
+
+
 def _show_test_locations(test_directories):
     """Print the test directories tests have been loaded from."""
     print("Loading tests from: %s\n" % ",".join(sorted(test_directories)))
@@ -500,6 +541,11 @@ def _configure_test_timeout(args):
     autopilot.globals.set_test_timeout(args.test_timeout)
 
 
+def _configure_introspection_recording(args):
+    if getattr(args, 'record_introspection', None):
+        _traffic.start_recording(args.record_introspection)
+
+
 def _prepare_application_for_launch(application, interface):
     app_path, app_arguments = _get_application_path_and_arguments(application)
     return _prepare_launcher_environment(
@@ -685,20 +731,38 @@ class TestProgram(object):
         test_suite, error_encountered = load_test_suite_from_name(
             self.args.suite
         )
+        if getattr(self.args, 'load_list', None):
+            test_suite = _filter_tests_by_id_list(
+                test_suite,
+                self.args.load_list
+            )
 
         if not test_suite.countTestCases():
             raise RuntimeError('Did not find any tests')
 
-        if self.args.random_order:
+        parallel = getattr(self.args, 'parallel', 1) > 1
+        # Workers shuffle their own tests:
+        if self.args.random_order and not parallel:
             shuffle(test_suite._tests)
             print("Running tests in random order")
 
         result = construct_test_result(self.args)
+        # Workers record their own introspection traffic:
+        if not parallel:
+            _configure_introspection_recording(self.args)
         result.startTestRun()
         try:
-            test_result = test_suite.run(result)
+            if parallel:
+                test_result = _parallel.run_test_suite(
+                    test_suite,
+                    result,
+                    self.args
+                )
+            else:
+                test_result = test_suite.run(result)
         finally:
             result.stopTestRun()
+            _traffic.stop_recording()
 
         if not test_result.wasSuccessful() or error_encountered:
             exit(1)
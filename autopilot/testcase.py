@@ -285,6 +285,45 @@ class AutopilotTestCase(TestWithScenarios, TestCase, KeybindingsHelper):
         )
         return launcher.launch(application, arguments, **launch_args)
 
+    def use_shared_application(self, shared_application):
+        """Return a proxy object for an application shared with other tests.
+
+        The application is launched by the first test that uses it, and
+        reused by later tests, which saves launching it for every test::
+
+            calculator = SharedApplication(
+                'gnome-calculator',
+                reset=lambda app: app.select_single(
+                    'GtkButton', label='C').click(),
+            )
+
+            class CalculatorTests(AutopilotTestCase):
+
+                def setUp(self):
+                    super().setUp()
+                    self.app = self.use_shared_application(calculator)
+
+        The application is not killed when the test ends. See
+        :class:`~autopilot.application.SharedApplication` for how it is
+        reset between tests, and relaunched if it exits.
+
+        :param shared_application: A
+            :class:`~autopilot.application.SharedApplication`.
+
+        :return: A proxy object that represents the application.
+
+        """
+        launch_count = shared_application.launch_count
+        proxy = shared_application.get_proxy()
+        if (
+            shared_application.launch_count != launch_count
+            and getattr(self, '_app_snapshot', None) is not None
+        ):
+            # The application outlives this test, so it must not count as
+            # one the test left open:
+            self._app_snapshot = _get_process_snapshot()
+        return proxy
+
     def launch_click_package(self, package_id, app_name=None, app_uris=[],
                              **kwargs):
         """Launch a click package application with introspection enabled.
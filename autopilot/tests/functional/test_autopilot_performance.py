@@ -20,11 +20,14 @@
 from contextlib import contextmanager
 from timeit import default_timer
 from textwrap import dedent
-from testtools import skipIf
-from testtools.matchers import Equals
+from unittest.mock import patch
+from testtools import skipIf, TestCase
+from testtools.matchers import Equals, LessThan
 
+import dbus
 import logging
 from autopilot import platform
+from autopilot.introspection import types
 from autopilot.tests.functional import AutopilotRunTestBase
 
 
@@ -79,3 +82,53 @@ class AutopilotPerformanceTests(AutopilotRunTestBase):
         with maximum_runtime(5.0):
             rc, out, err = self.run_autopilot(['run', 'tests'])
             self.assertThat(rc, Equals(0))
+
+
+class _UncachedClasses(dict):
+
+    """A class cache that never keeps anything, so a new plain type class is
+    made for every value, as autopilot used to do.
+
+    """
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class PlainTypeDecodeBenchmarkTests(TestCase):
+
+    """Measure how long decoding the properties of many proxy objects takes,
+    with and without the plain type class cache.
+
+    """
+
+    property_count = 20000
+
+    def decode_properties(self):
+        values = [
+            dbus.Int32(1),
+            dbus.String('text'),
+            dbus.Boolean(True),
+            dbus.Double(1.5),
+        ]
+        start_time = default_timer()
+        for i in range(self.property_count):
+            types.create_value_instance(
+                dbus.Array([dbus.Int32(types.ValueType.PLAIN), values[i % 4]]),
+                None,
+                'property%d' % i
+            )
+        return default_timer() - start_time
+
+    def test_plain_type_class_cache_speeds_up_decoding(self):
+        with patch.object(types, '_plain_type_classes', _UncachedClasses()):
+            uncached_time = self.decode_properties()
+        cached_time = self.decode_properties()
+        logger.info(
+            "Decoded %d properties in %f seconds with the class cache, and "
+            "%f seconds without it.",
+            self.property_count,
+            cached_time,
+            uncached_time
+        )
+        self.assertThat(cached_time, LessThan(uncached_time))
@@ -0,0 +1,122 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import subprocess
+import sys
+from time import monotonic
+
+import dbus
+from testtools import TestCase
+from testtools.matchers import Equals, LessThan
+
+from autopilot.introspection import get_proxy_object_for_existing_process
+from autopilot.introspection._reference_server import REFERENCE_SERVER_IFACE
+
+
+class ReferenceServerTestMixin(object):
+
+    """Start the reference introspection server, and attach to it."""
+
+    protocol_version = None
+
+    def start_reference_server(self):
+        args = [
+            sys.executable,
+            '-m',
+            'autopilot.introspection._reference_server',
+        ]
+        if self.protocol_version is not None:
+            args += ['--version', self.protocol_version]
+        process = subprocess.Popen(args)
+        self.addCleanup(process.wait)
+        self.addCleanup(process.terminate)
+
+        app = get_proxy_object_for_existing_process(process=process)
+        self.control = dbus.Interface(
+            app._backend.ipc_address._get_proxy_object(),
+            REFERENCE_SERVER_IFACE
+        )
+        return app
+
+    def set_property_later(self, obj, name, value, delay_ms):
+        self.control.SetProperty(obj.id, name, [0, value], delay_ms)
+
+
+class StateChangeNotificationTests(ReferenceServerTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = self.start_reference_server()
+
+    def test_server_supports_change_notifications(self):
+        self.assertTrue(
+            self.app._backend.ipc_address.supports_change_notifications
+        )
+
+    def test_wait_for_wakes_on_change(self):
+        label = self.app.select_single('Label')
+        self.set_property_later(label, 'text', 'Goodbye', 200)
+
+        start_time = monotonic()
+        label.text.wait_for('Goodbye')
+
+        self.assertThat(monotonic() - start_time, LessThan(0.9))
+
+    def test_wait_select_single_wakes_when_object_added(self):
+        window = self.app.select_single('Window')
+        self.control.AddObject(
+            window.id,
+            'Dialog',
+            dict(title=dbus.Array([0, 'New'], signature='v')),
+            200
+        )
+
+        start_time = monotonic()
+        dialog = self.app.wait_select_single('Dialog')
+
+        self.assertThat(monotonic() - start_time, LessThan(0.9))
+        self.assertThat(dialog.title, Equals('New'))
+
+    def test_wait_until_destroyed_wakes_when_object_removed(self):
+        button = self.app.select_single('Button')
+        self.control.RemoveObject(button.id, 200)
+
+        start_time = monotonic()
+        button.wait_until_destroyed()
+
+        self.assertThat(monotonic() - start_time, LessThan(0.9))
+
+
+class PollingFallbackTests(ReferenceServerTestMixin, TestCase):
+
+    protocol_version = '1.4'
+
+    def test_wait_for_polls_without_change_notifications(self):
+        app = self.start_reference_server()
+        self.assertFalse(
+            app._backend.ipc_address.supports_change_notifications
+        )
+
+        label = app.select_single('Label')
+        self.set_property_later(label, 'text', 'Goodbye', 200)
+
+        label.text.wait_for('Goodbye')
+
+        self.assertThat(label.text, Equals('Goodbye'))
+        self.assertThat(self.control.GetSubscribeCount(), Equals(0))
@@ -18,6 +18,8 @@
 #
 
 from contextlib import ExitStack
+from fixtures import EnvironmentVariable
+import os
 from gi.repository import GLib
 import signal
 import subprocess
@@ -38,6 +40,7 @@ from unittest.mock import MagicMock, Mock, patch
 from autopilot.application import (
     ClickApplicationLauncher,
     NormalApplicationLauncher,
+    SharedApplication,
     UpstartApplicationLauncher,
 )
 from autopilot.application._environment import (
@@ -1114,3 +1117,181 @@ class ApplicationLauncherInternalTests(TestCase):
         pid_exists.return_value = True
         self.assertThat(_is_process_running(123), Equals(True))
         pid_exists.assert_called_with(123)
+
+
+class SharedApplicationTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        launcher_patcher = patch(
+            'autopilot.application._shared.NormalApplicationLauncher'
+        )
+        self.addCleanup(launcher_patcher.stop)
+        self.launcher_class = launcher_patcher.start()
+        atexit_patcher = patch('autopilot.application._shared.atexit')
+        self.addCleanup(atexit_patcher.stop)
+        atexit_patcher.start()
+
+    def make_shared_application(self, **kwargs):
+        shared = SharedApplication('gedit', '--new-window', **kwargs)
+        self.addCleanup(shared.stop)
+        return shared
+
+    def set_process_exited(self, shared):
+        shared.get_proxy().process.poll.return_value = 1
+
+    def test_first_use_launches_application(self):
+        shared = self.make_shared_application(emulator_base='base')
+        proxy = shared.get_proxy()
+
+        launcher = self.launcher_class.return_value
+        self.launcher_class.assert_called_once_with(emulator_base='base')
+        launcher.setUp.assert_called_once_with()
+        launcher.launch.assert_called_once_with(
+            'gedit',
+            ['--new-window'],
+            app_type=None,
+            launch_dir=None,
+            capture_output=False,
+        )
+        self.assertThat(proxy, Equals(launcher.launch.return_value))
+        self.assertThat(shared.launch_count, Equals(1))
+
+    def test_custom_bus_address_does_not_outlive_launch(self):
+        self.useFixture(
+            EnvironmentVariable('DBUS_SESSION_BUS_ADDRESS', 'unix:session')
+        )
+        launcher = self.launcher_class.return_value
+
+        def set_bus_address():
+            os.environ['DBUS_SESSION_BUS_ADDRESS'] = 'unix:custom'
+
+        def restore_bus_address():
+            os.environ['DBUS_SESSION_BUS_ADDRESS'] = 'unix:session'
+
+        launched_on = []
+
+        def launch(*args, **kwargs):
+            launched_on.append(os.environ['DBUS_SESSION_BUS_ADDRESS'])
+
+        launcher.setUp.side_effect = set_bus_address
+        launcher.launch.side_effect = launch
+        launcher.cleanUp.side_effect = restore_bus_address
+        shared = self.make_shared_application(dbus_bus='unix:custom')
+
+        shared.get_proxy()
+        self.assertThat(launched_on, Equals(['unix:custom']))
+        self.assertThat(
+            os.environ['DBUS_SESSION_BUS_ADDRESS'],
+            Equals('unix:session')
+        )
+
+        # A later test changes the variable before the application stops:
+        os.environ['DBUS_SESSION_BUS_ADDRESS'] = 'unix:other'
+        shared.stop()
+        self.assertThat(
+            os.environ['DBUS_SESSION_BUS_ADDRESS'],
+            Equals('unix:other')
+        )
+
+    def test_later_uses_reuse_application(self):
+        shared = self.make_shared_application()
+        shared.get_proxy().process.poll.return_value = None
+        proxy = shared.get_proxy()
+
+        self.assertThat(shared.launch_count, Equals(1))
+        self.assertThat(
+            proxy, Equals(self.launcher_class.return_value.launch.return_value)
+        )
+
+    def test_reset_not_called_on_first_use(self):
+        reset = Mock()
+        shared = self.make_shared_application(reset=reset)
+        shared.get_proxy()
+
+        self.assertFalse(reset.called)
+
+    def test_reset_called_on_later_uses(self):
+        reset = Mock()
+        shared = self.make_shared_application(reset=reset)
+        proxy = shared.get_proxy()
+        proxy.process.poll.return_value = None
+        shared.get_proxy()
+
+        reset.assert_called_once_with(proxy)
+
+    def test_relaunches_exited_application(self):
+        reset = Mock()
+        shared = self.make_shared_application(reset=reset)
+        self.set_process_exited(shared)
+        shared.get_proxy()
+
+        self.assertThat(shared.launch_count, Equals(2))
+        self.launcher_class.return_value.cleanUp.assert_called_once_with()
+        self.assertFalse(reset.called)
+
+    def test_relaunches_application_failing_health_check(self):
+        shared = self.make_shared_application(
+            health_check=Mock(return_value=False)
+        )
+        shared.get_proxy().process.poll.return_value = None
+        shared.get_proxy()
+
+        self.assertThat(shared.launch_count, Equals(2))
+
+    def test_relaunches_application_when_health_check_raises(self):
+        shared = self.make_shared_application(
+            health_check=Mock(side_effect=RuntimeError)
+        )
+        shared.get_proxy().process.poll.return_value = None
+        shared.get_proxy()
+
+        self.assertThat(shared.launch_count, Equals(2))
+
+    def test_relaunches_application_when_reset_raises(self):
+        shared = self.make_shared_application(
+            reset=Mock(side_effect=RuntimeError)
+        )
+        shared.get_proxy().process.poll.return_value = None
+        shared.get_proxy()
+
+        self.assertThat(shared.launch_count, Equals(2))
+
+    def test_passing_health_check_reuses_application(self):
+        shared = self.make_shared_application(
+            health_check=Mock(return_value=True)
+        )
+        shared.get_proxy().process.poll.return_value = None
+        shared.get_proxy()
+
+        self.assertThat(shared.launch_count, Equals(1))
+
+    def test_stop_cleans_up_launcher(self):
+        shared = self.make_shared_application()
+        shared.get_proxy()
+        shared.stop()
+
+        self.launcher_class.return_value.cleanUp.assert_called_once_with()
+
+    def test_stop_does_nothing_when_not_launched(self):
+        shared = self.make_shared_application()
+        shared.stop()
+
+        self.assertFalse(self.launcher_class.return_value.cleanUp.called)
+
+    def test_get_proxy_after_stop_launches_again(self):
+        shared = self.make_shared_application()
+        shared.get_proxy()
+        shared.stop()
+        shared.get_proxy()
+
+        self.assertThat(shared.launch_count, Equals(2))
+
+    def test_failed_launch_cleans_up_launcher(self):
+        launcher = self.launcher_class.return_value
+        launcher.launch.side_effect = RuntimeError
+        shared = self.make_shared_application()
+
+        self.assertRaises(RuntimeError, shared.get_proxy)
+        launcher.cleanUp.assert_called_once_with()
+        self.assertThat(shared.launch_count, Equals(0))
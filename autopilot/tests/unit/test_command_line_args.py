@@ -383,6 +383,14 @@ class CommandLineArgsTests(TestCase):
         args = parse_args('run --test-timeout 42 foo')
         self.assertThat(args.test_timeout, Equals(42))
 
+    def test_introspection_recording_off_by_default(self):
+        args = parse_args('run foo')
+        self.assertThat(args.record_introspection, Equals(None))
+
+    def test_can_record_introspection(self):
+        args = parse_args('run --record-introspection traffic.json foo')
+        self.assertThat(args.record_introspection, Equals('traffic.json'))
+
 
 class GlobalProfileOptionTests(WithScenarios, TestCase):
 
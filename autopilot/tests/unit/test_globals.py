@@ -76,3 +76,37 @@ class TimeoutFunctionTests(TestCase):
         new_value = self.getUniqueInteger()
         _g.set_test_timeout(new_value)
         self.assertEqual(new_value, _g.get_test_timeout())
+
+
+class StateMaxAgeFunctionTests(TestCase):
+
+    def setUp(self):
+        super(StateMaxAgeFunctionTests, self).setUp()
+        restore_value(self, _g, '_state_max_age')
+
+    def test_default_state_max_age_always_refreshes(self):
+        self.assertEqual(0, _g.get_state_max_age())
+
+    def test_can_set_state_max_age(self):
+        _g.set_state_max_age(0.25)
+        self.assertEqual(0.25, _g.get_state_max_age())
+
+
+class PollIntervalFunctionTests(TestCase):
+
+    def setUp(self):
+        super(PollIntervalFunctionTests, self).setUp()
+        restore_value(self, _g, '_poll_interval')
+
+    def test_default_poll_interval(self):
+        self.assertEqual((0.01, 0.5), _g.get_poll_interval())
+
+    def test_can_set_poll_interval(self):
+        _g.set_poll_interval(0.1, 2.0)
+        self.assertEqual((0.1, 2.0), _g.get_poll_interval())
+
+    def test_rejects_initial_interval_longer_than_maximum(self):
+        self.assertRaises(ValueError, _g.set_poll_interval, 1.0, 0.5)
+
+    def test_rejects_zero_interval(self):
+        self.assertRaises(ValueError, _g.set_poll_interval, 0, 0.5)
@@ -17,16 +17,33 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from dbus import String, DBusException
+import asyncio
+import threading
+import gc
+import re
+from dbus import Array, Boolean, ByteArray, DBusException, Int32, String
 from unittest.mock import patch, MagicMock, Mock
 from testtools import TestCase
-from testtools.matchers import Equals, Not, NotEquals, IsInstance
+from testtools.matchers import (
+    Contains,
+    Equals,
+    GreaterThan,
+    IsInstance,
+    LessThan,
+    MatchesAll,
+    Not,
+    NotEquals,
+    raises,
+)
 
+from autopilot.exceptions import StateNotFoundError
 from autopilot.introspection import (
+    _query_engine as query_engine,
     _xpathselect as xpathselect,
     backends,
     dbus,
 )
+from autopilot.utilities import sleep
 
 
 class DBusAddressTests(TestCase):
@@ -137,6 +154,198 @@ class DBusAddressTests(TestCase):
             patch_cb.assert_called_once_with(bus_path)
 
 
+class DBusAddressLivenessTests(TestCase):
+
+    def setUp(self):
+        super(DBusAddressLivenessTests, self).setUp()
+        self.fake_bus = Mock()
+        self.address = backends.DBusAddress(self.fake_bus, "conn", "path")
+        # Skip the wire protocol version check:
+        backends.DBusAddress._checked_backends.append(
+            self.address._addr_tuple
+        )
+        self.addCleanup(
+            backends.DBusAddress._checked_backends.remove,
+            self.address._addr_tuple
+        )
+        dispatch_patcher = patch.object(
+            backends, '_dispatch_pending_main_loop_events'
+        )
+        dispatch_patcher.start()
+        self.addCleanup(dispatch_patcher.stop)
+
+    def get_owner_changed_callback(self):
+        return self.fake_bus.watch_name_owner.call_args[0][1]
+
+    def test_pid_is_checked_only_once(self):
+        with patch.object(
+            backends.DBusAddress, '_check_pid_running', return_value=True
+        ) as check_pid:
+            self.address.introspection_iface
+            self.address.introspection_iface
+
+            check_pid.assert_called_once_with()
+
+    def test_watches_name_owner_once(self):
+        with patch.object(
+            backends.DBusAddress, '_check_pid_running', return_value=True
+        ):
+            self.address.introspection_iface
+            self.address.introspection_iface
+
+        self.fake_bus.watch_name_owner.assert_called_once_with(
+            "conn",
+            self.get_owner_changed_callback()
+        )
+
+    def test_interface_is_cached(self):
+        with patch.object(
+            backends.DBusAddress, '_check_pid_running', return_value=True
+        ):
+            iface = self.address.introspection_iface
+
+            self.assertThat(
+                self.address.introspection_iface,
+                Equals(iface)
+            )
+        self.fake_bus.get_object.assert_called_once_with("conn", "path")
+
+    def test_raises_when_pid_not_running(self):
+        with patch.object(
+            backends.DBusAddress, '_check_pid_running', return_value=False
+        ):
+            self.assertRaises(
+                RuntimeError,
+                lambda: self.address.introspection_iface
+            )
+
+    def test_raises_once_name_owner_is_lost(self):
+        with patch.object(
+            backends.DBusAddress, '_check_pid_running', return_value=True
+        ):
+            self.address.introspection_iface
+            self.get_owner_changed_callback()('')
+
+            self.assertRaises(
+                RuntimeError,
+                lambda: self.address.introspection_iface
+            )
+
+    def test_new_name_owner_discards_cached_proxy(self):
+        with patch.object(
+            backends.DBusAddress, '_check_pid_running', return_value=True
+        ):
+            self.address.introspection_iface
+            self.get_owner_changed_callback()(':1.42')
+            self.address.introspection_iface
+
+        self.assertThat(self.fake_bus.get_object.call_count, Equals(2))
+
+    def test_raises_when_watched_process_has_exited(self):
+        process = Mock()
+        process.poll.return_value = 0
+        self.address.watch_process(process)
+        with patch.object(
+            backends.DBusAddress, '_check_pid_running', return_value=True
+        ) as check_pid:
+            self.assertRaises(
+                RuntimeError,
+                lambda: self.address.introspection_iface
+            )
+            self.assertFalse(check_pid.called)
+
+
+class DBusAddressVersionTests(TestCase):
+
+    def get_iface_with_version(self, version):
+        iface = Mock()
+        iface.GetVersion.return_value = version
+        return iface
+
+    def test_check_version_accepts_current_version(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        self.assertThat(
+            address._check_version(self.get_iface_with_version("1.4")),
+            Equals("1.4")
+        )
+
+    def test_check_version_accepts_extended_filters_version(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        self.assertThat(
+            address._check_version(self.get_iface_with_version("1.5")),
+            Equals("1.5")
+        )
+
+    def test_check_version_accepts_change_notifications_version(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        self.assertThat(
+            address._check_version(self.get_iface_with_version("1.6")),
+            Equals("1.6")
+        )
+
+    def test_check_version_accepts_property_projection_version(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        self.assertThat(
+            address._check_version(self.get_iface_with_version("1.7")),
+            Equals("1.7")
+        )
+
+    def test_check_version_raises_on_unknown_version(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        self.assertRaises(
+            backends.WireProtocolVersionMismatch,
+            address._check_version,
+            self.get_iface_with_version("1.3")
+        )
+
+    def test_supports_extended_filters(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        versions = (("1.4", False), ("1.5", True), ("1.6", True))
+        for version, expected in versions:
+            with patch.dict(
+                backends.DBusAddress._backend_versions,
+                {address._addr_tuple: version}
+            ):
+                self.assertThat(
+                    address.supports_extended_filters,
+                    Equals(expected)
+                )
+
+    def test_extended_filters_unsupported_before_version_check(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        self.assertFalse(address.supports_extended_filters)
+
+    def test_supports_change_notifications(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        versions = (("1.4", False), ("1.5", False), ("1.6", True))
+        for version, expected in versions:
+            with patch.dict(
+                backends.DBusAddress._backend_versions,
+                {address._addr_tuple: version}
+            ):
+                self.assertThat(
+                    address.supports_change_notifications,
+                    Equals(expected)
+                )
+
+    def test_change_notifications_unsupported_before_version_check(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        self.assertFalse(address.supports_change_notifications)
+
+    def test_supports_property_projection(self):
+        address = backends.DBusAddress(Mock(), "conn", "path")
+        versions = (("1.4", False), ("1.6", False), ("1.7", True))
+        for version, expected in versions:
+            with patch.dict(
+                backends.DBusAddress._backend_versions,
+                {address._addr_tuple: version}
+            ):
+                self.assertThat(
+                    address.supports_property_projection,
+                    Equals(expected)
+                )
+
+
 class ClientSideFilteringTests(TestCase):
 
     def get_empty_fake_object(self):
@@ -173,6 +382,89 @@ class ClientSideFilteringTests(TestCase):
         obj.foo = 123
         self.assertTrue(backends._object_passes_filters(obj, foo=123))
 
+    def test_object_passes_filters_accepts_callables(self):
+        obj = self.get_empty_fake_object()
+        obj.foo = 123
+        self.assertTrue(
+            backends._object_passes_filters(obj, foo=lambda v: v > 100)
+        )
+        self.assertFalse(
+            backends._object_passes_filters(obj, foo=lambda v: v < 100)
+        )
+
+
+class ValuePassesFilterTests(TestCase):
+
+    def test_plain_values_must_be_equal(self):
+        self.assertTrue(backends._value_passes_filter(123, 123))
+        self.assertFalse(backends._value_passes_filter(123, 456))
+
+    def test_matchers_must_match(self):
+        self.assertTrue(
+            backends._value_passes_filter('some text', Contains('text'))
+        )
+        self.assertFalse(
+            backends._value_passes_filter('some text', Contains('other'))
+        )
+
+    def test_numeric_ranges_with_matchers(self):
+        in_range = MatchesAll(GreaterThan(10), LessThan(20))
+        self.assertTrue(backends._value_passes_filter(15, in_range))
+        self.assertFalse(backends._value_passes_filter(25, in_range))
+
+    def test_regular_expressions_must_match_anywhere(self):
+        pattern = re.compile('[0-9]+')
+        self.assertTrue(backends._value_passes_filter('Item 12', pattern))
+        self.assertFalse(backends._value_passes_filter('Item', pattern))
+
+    def test_callables_must_return_true(self):
+        self.assertTrue(
+            backends._value_passes_filter(4, lambda v: v % 2 == 0)
+        )
+        self.assertFalse(
+            backends._value_passes_filter(5, lambda v: v % 2 == 0)
+        )
+
+
+class StatePassesFiltersTests(TestCase):
+
+    def test_passes_with_no_filters(self):
+        self.assertTrue(backends._state_passes_filters({}))
+
+    def test_passes_when_values_match(self):
+        state = {'text': [0, 'hello'], 'visible': [0, True]}
+        self.assertTrue(
+            backends._state_passes_filters(state, text='hello', visible=True)
+        )
+
+    def test_fails_when_value_does_not_match(self):
+        state = {'text': [0, 'hello'], 'visible': [0, True]}
+        self.assertFalse(
+            backends._state_passes_filters(state, text='hello', visible=False)
+        )
+
+    def test_translates_state_keys(self):
+        state = {'icon-name': [0, 'close']}
+        self.assertTrue(
+            backends._state_passes_filters(state, icon_name='close')
+        )
+
+    def test_returns_none_when_attribute_not_in_state(self):
+        state = {'text': [0, 'hello']}
+        self.assertThat(
+            backends._state_passes_filters(state, custom_property=1),
+            Equals(None)
+        )
+
+    def test_decodes_typed_values(self):
+        state = {'globalRect': [1, 0, 0, 10, 20]}
+        self.assertTrue(
+            backends._state_passes_filters(
+                state,
+                globalRect=lambda r: r.width == 10
+            )
+        )
+
 
 class BackendTests(TestCase):
 
@@ -294,6 +586,879 @@ class BackendTests(TestCase):
         self.assertRaises(Exception, backend.execute_query_get_data, query)
 
 
+class BackendIdentityMapTests(TestCase):
+
+    class Widget(dbus.CustomEmulatorBase):
+        pass
+
+    def get_backend(self, replies):
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState.side_effect = replies
+        return backends.Backend(fake_dbus_address)
+
+    def test_repeated_queries_return_same_proxy(self):
+        query = xpathselect.Query.root('Widget')
+        backend = self.get_backend([
+            [(String('/Widget'), {'id': [0, 1], 'label': [0, 'old']})],
+            [(String('/Widget'), {'id': [0, 1], 'label': [0, 'new']})],
+        ])
+        first = backend.execute_query_get_proxy_instances(
+            query,
+            self.Widget._id
+        )[0]
+        second = backend.execute_query_get_proxy_instances(
+            query,
+            self.Widget._id
+        )[0]
+
+        self.assertIs(first, second)
+        with first.no_automatic_refreshing():
+            self.assertThat(first.label, Equals('new'))
+
+    def test_different_ids_return_different_proxies(self):
+        query = xpathselect.Query.root('Widget')
+        backend = self.get_backend([[
+            (String('/Widget'), {'id': [0, 1]}),
+            (String('/Widget'), {'id': [0, 2]}),
+        ]])
+        first, second = backend.execute_query_get_proxy_instances(
+            query,
+            self.Widget._id
+        )
+
+        self.assertIsNot(first, second)
+
+    def test_proxies_share_the_backend(self):
+        query = xpathselect.Query.root('Widget')
+        backend = self.get_backend([[
+            (String('/Widget'), {'id': [0, 1]}),
+            (String('/Widget'), {'id': [0, 2]}),
+        ]])
+        proxies = backend.execute_query_get_proxy_instances(
+            query,
+            self.Widget._id
+        )
+
+        for proxy in proxies:
+            self.assertIs(proxy._backend, backend)
+
+    def test_only_makes_proxies_for_objects_that_pass_filters(self):
+        query = xpathselect.Query.root('Widget').select_child(
+            'Widget',
+            dict(label=lambda label: label.startswith('keep'))
+        )
+        backend = self.get_backend([[
+            (String('/Widget/Widget'), {'id': [0, i], 'label': [0, label]})
+            for i, label in enumerate(['keep 1', 'drop', 'keep 2', 'drop'])
+        ]])
+        with patch.object(
+            backends,
+            'make_introspection_object',
+            wraps=backends.make_introspection_object
+        ) as mio:
+            proxies = backend.execute_query_get_proxy_instances(
+                query,
+                self.Widget._id
+            )
+
+        self.assertThat([p.id for p in proxies], Equals([0, 2]))
+        self.assertThat(mio.call_count, Equals(2))
+
+    def test_unreferenced_proxies_are_not_kept_alive(self):
+        query = xpathselect.Query.root('Widget')
+        backend = self.get_backend([
+            [(String('/Widget'), {'id': [0, 1]})],
+        ])
+        backend.execute_query_get_proxy_instances(query, self.Widget._id)
+        # Proxies are referenced by their attribute values, so we need to
+        # break the cycle:
+        gc.collect()
+
+        self.assertThat(len(backend._proxies), Equals(0))
+
+
+class BackendExtendedFilterTests(TestCase):
+
+    class Widget(dbus.CustomEmulatorBase):
+        pass
+
+    def get_query(self):
+        return xpathselect.Query.root('Root').select_child(
+            'Widget',
+            dict(opacity=0.5)
+        )
+
+    def get_backend(self, extended_filters):
+        fake_dbus_address = Mock()
+        fake_dbus_address.supports_extended_filters = extended_filters
+        fake_dbus_address.introspection_iface.GetState.return_value = []
+        return backends.Backend(fake_dbus_address)
+
+    def test_sends_extended_filters_when_supported(self):
+        backend = self.get_backend(True)
+        backend.execute_query_get_data(self.get_query())
+
+        backend.ipc_address.introspection_iface.GetState.\
+            assert_called_once_with(b'/Root/Widget[opacity=0.5]')
+
+    def test_filters_client_side_when_unsupported(self):
+        backend = self.get_backend(False)
+        backend.execute_query_get_data(self.get_query())
+
+        backend.ipc_address.introspection_iface.GetState.\
+            assert_called_once_with(b'/Root/Widget')
+
+    def test_no_client_side_filtering_when_supported(self):
+        backend = self.get_backend(True)
+        backend.ipc_address.introspection_iface.GetState.return_value = [
+            (String('/Root/Widget'), {'id': [0, 1], 'opacity': [0, 1.0]})
+        ]
+        with patch.object(backends, '_state_passes_filters') as passes:
+            proxies = backend.execute_query_get_proxy_instances(
+                self.get_query(),
+                self.Widget._id
+            )
+
+        self.assertThat(len(proxies), Equals(1))
+        self.assertFalse(passes.called)
+
+
+class BackendPropertyProjectionTests(TestCase):
+
+    class Widget(dbus.CustomEmulatorBase):
+        pass
+
+    def get_backend(self, property_projection):
+        fake_dbus_address = Mock()
+        fake_dbus_address.supports_extended_filters = False
+        fake_dbus_address.supports_property_projection = property_projection
+        iface = fake_dbus_address.introspection_iface
+        iface.GetState.return_value = [
+            (String('/Root'), {'id': [0, 1], 'text': [0, 'a'], 'x': [0, 2]})
+        ]
+        iface.GetStateProperties.return_value = [
+            (String('/Root/Widget'), {'id': [0, 1], 'text': [0, 'a']})
+        ]
+        return backends.Backend(fake_dbus_address)
+
+    def test_asks_for_properties_when_supported(self):
+        backend = self.get_backend(True)
+        data = backend.execute_query_get_data(
+            xpathselect.Query.root('Root'),
+            ['text']
+        )
+
+        iface = backend.ipc_address.introspection_iface
+        iface.GetStateProperties.assert_called_once_with(b'/Root', ['text'])
+        self.assertFalse(iface.GetState.called)
+        self.assertThat(
+            data,
+            Equals([('/Root/Widget', {'id': [0, 1], 'text': [0, 'a']})])
+        )
+
+    def test_removes_properties_when_unsupported(self):
+        backend = self.get_backend(False)
+        data = backend.execute_query_get_data(
+            xpathselect.Query.root('Root'),
+            ['text']
+        )
+
+        iface = backend.ipc_address.introspection_iface
+        iface.GetState.assert_called_once_with(b'/Root')
+        self.assertFalse(iface.GetStateProperties.called)
+        self.assertThat(
+            data,
+            Equals([('/Root', {'id': [0, 1], 'text': [0, 'a']})])
+        )
+
+    def test_returns_everything_without_properties(self):
+        backend = self.get_backend(True)
+        data = backend.execute_query_get_data(xpathselect.Query.root('Root'))
+
+        self.assertThat(sorted(data[0][1]), Equals(['id', 'text', 'x']))
+        self.assertFalse(
+            backend.ipc_address.introspection_iface.GetStateProperties.called
+        )
+
+    def test_asks_for_client_side_filter_properties(self):
+        backend = self.get_backend(True)
+        query = xpathselect.Query.root('Root').select_child(
+            'Widget',
+            dict(x=GreaterThan(1))
+        )
+        backend.execute_query_get_proxy_instances(
+            query,
+            self.Widget._id,
+            ['text']
+        )
+
+        backend.ipc_address.introspection_iface.GetStateProperties.\
+            assert_called_once_with(b'/Root/Widget', ['text', 'x'])
+
+    def test_project_reply_treats_dashes_as_underscores(self):
+        data = [('/Root', {'id': [0, 1], 'icon-name': [0, 'ok'], 'x': [0, 2]})]
+        self.assertThat(
+            backends._project_reply(data, ['icon_name']),
+            Equals([('/Root', {'id': [0, 1], 'icon-name': [0, 'ok']})])
+        )
+
+
+class LegacyBackendTests(TestCase):
+
+    """Backends written before the properties argument was added still
+    work."""
+
+    class Widget(dbus.CustomEmulatorBase):
+        pass
+
+    class LegacyBackend(backends.FakeBackend):
+
+        def execute_query_get_data(self, query):
+            return self.fake_ipc_return_data
+
+    def get_backend(self):
+        return self.LegacyBackend([
+            (
+                String('/Root/Widget'),
+                {'id': [0, 1], 'text': [0, 'a'], 'x': [0, 2]}
+            )
+        ])
+
+    def test_query_without_properties(self):
+        backend = self.get_backend()
+        [widget] = backend.execute_query_get_proxy_instances(
+            xpathselect.Query.root('Root').select_child('Widget'),
+            self.Widget._id
+        )
+
+        self.assertThat(widget.x, Equals(2))
+
+    def test_query_with_properties_removes_others(self):
+        backend = self.get_backend()
+        [data] = backends._execute_queries_get_data(
+            backend,
+            [xpathselect.Query.root('Root')],
+            ['text']
+        )
+
+        self.assertThat(
+            data,
+            Equals([('/Root/Widget', {'id': [0, 1], 'text': [0, 'a']})])
+        )
+
+    def test_async_query_with_properties(self):
+        backend = self.get_backend()
+        [widget] = asyncio.run(
+            backend.execute_query_get_proxy_instances_async(
+                xpathselect.Query.root('Root').select_child('Widget'),
+                self.Widget._id,
+                ['text']
+            )
+        )
+
+        self.assertThat(widget.text, Equals('a'))
+
+    def test_accepts_properties(self):
+        self.assertFalse(
+            backends._accepts_properties(
+                self.get_backend().execute_query_get_data
+            )
+        )
+        self.assertTrue(
+            backends._accepts_properties(
+                backends.FakeBackend([]).execute_query_get_data
+            )
+        )
+        self.assertTrue(backends._accepts_properties(Mock()))
+
+
+class BackendIterQueryTests(TestCase):
+
+    class Item(dbus.CustomEmulatorBase):
+        pass
+
+    def get_backend(self, property_projection):
+        Node = query_engine.Node
+        tree = Node('App', dict(id=[0, 1]), [
+            Node('Item', dict(id=[0, i], x=[0, i])) for i in range(2, 9)
+        ])
+        ipc_address = Mock()
+        ipc_address.supports_extended_filters = False
+        ipc_address.supports_property_projection = property_projection
+        return backends.InMemoryBackend(tree, ipc_address)
+
+    def iter_items(self, backend, filters={}, properties=None):
+        query = xpathselect.Query.root('App').select_child('Item', filters)
+        return backend.iter_query_get_proxy_instances(
+            query,
+            self.Item._id,
+            3,
+            properties
+        )
+
+    def test_yields_every_object(self):
+        for property_projection in (True, False):
+            backend = self.get_backend(property_projection)
+            self.assertThat(
+                [item.id for item in self.iter_items(backend)],
+                Equals(list(range(2, 9)))
+            )
+
+    def test_listing_only_fetches_ids(self):
+        backend = self.get_backend(True)
+        with patch.object(
+            backend,
+            'execute_query_get_data',
+            wraps=backend.execute_query_get_data
+        ) as get_data:
+            [item] = self.iter_items(backend, dict(id=5))
+
+        self.assertThat(
+            get_data.call_args_list[0][1]['properties'],
+            Equals([])
+        )
+        self.assertThat(item.x, Equals(5))
+
+    def test_fetches_each_batch_when_reached(self):
+        backend = self.get_backend(True)
+        with patch.object(
+            backend,
+            'execute_queries_get_data',
+            wraps=backend.execute_queries_get_data
+        ) as get_data:
+            items = self.iter_items(backend)
+            next(items)
+            self.assertThat(get_data.call_count, Equals(1))
+            self.assertThat(len(get_data.call_args[0][0]), Equals(3))
+            for i in range(3):
+                next(items)
+            self.assertThat(get_data.call_count, Equals(2))
+
+    def test_applies_client_side_filters_to_listing(self):
+        backend = self.get_backend(True)
+        with patch.object(
+            backend,
+            'execute_queries_get_data',
+            wraps=backend.execute_queries_get_data
+        ) as get_data:
+            items = list(self.iter_items(backend, dict(x=GreaterThan(5))))
+
+        self.assertThat([item.id for item in items], Equals([6, 7, 8]))
+        self.assertThat(len(get_data.call_args[0][0]), Equals(3))
+
+    def test_makes_proxies_one_batch_at_a_time_without_projection(self):
+        backend = self.get_backend(False)
+        with patch.object(
+            backends,
+            'make_introspection_object',
+            wraps=backends.make_introspection_object
+        ) as make_object:
+            next(self.iter_items(backend))
+
+        self.assertThat(make_object.call_count, Equals(3))
+
+
+class BackendStateChangeTests(TestCase):
+
+    def get_backend(self, change_notifications):
+        fake_dbus_address = Mock()
+        fake_dbus_address.supports_change_notifications = change_notifications
+        fake_dbus_address.supports_extended_filters = change_notifications
+        return backends.Backend(fake_dbus_address)
+
+    def test_polls_when_notifications_unsupported(self):
+        backend = self.get_backend(False)
+        self.assertThat(
+            backend.watch_state_changes(xpathselect.Query.root('foo')),
+            IsInstance(backends.PollingStateWatch)
+        )
+
+    def test_subscribes_when_notifications_supported(self):
+        backend = self.get_backend(True)
+        watch = backend.watch_state_changes(
+            xpathselect.Query.root('foo'),
+            ['text']
+        )
+        self.assertThat(watch, IsInstance(backends.StateChangeSubscription))
+
+        iface = backend.ipc_address.introspection_iface
+        with watch:
+            iface.Subscribe.assert_called_once_with(b'/foo', ['text'])
+        iface.Unsubscribe.assert_called_once_with(
+            iface.Subscribe.return_value
+        )
+
+
+class PollingStateWatchTests(TestCase):
+
+    def test_wait_sleeps_for_timeout(self):
+        with patch.object(backends, 'sleep') as fake_sleep:
+            with backends.PollingStateWatch() as changes:
+                waited = changes.wait(0.5)
+
+        fake_sleep.assert_called_once_with(0.5)
+        self.assertThat(waited, Equals(0.5))
+
+
+class StateChangeSubscriptionTests(TestCase):
+
+    def get_subscription(self, subscription_id=7):
+        iface = Mock()
+        iface.Subscribe.return_value = subscription_id
+        return backends.StateChangeSubscription(iface, b'/foo', ['text'])
+
+    def get_signal_handler(self, subscription):
+        args, _ = subscription._iface.connect_to_signal.call_args
+        self.assertThat(args[0], Equals('StateChanged'))
+        return args[1]
+
+    def test_listens_before_subscribing(self):
+        subscription = self.get_subscription()
+        iface = subscription._iface
+        iface.Subscribe.side_effect = lambda *args: self.assertTrue(
+            iface.connect_to_signal.called
+        )
+        with subscription:
+            pass
+
+    def test_exit_removes_signal_match(self):
+        subscription = self.get_subscription()
+        with subscription:
+            pass
+        subscription._iface.connect_to_signal.return_value.remove.\
+            assert_called_once_with()
+
+    def test_exit_ignores_unsubscribe_errors(self):
+        subscription = self.get_subscription()
+        subscription._iface.Unsubscribe.side_effect = DBusException()
+        with subscription:
+            pass
+
+    def test_wait_returns_immediately_after_notification(self):
+        subscription = self.get_subscription()
+        with subscription:
+            self.get_signal_handler(subscription)(7)
+            with patch.object(backends, 'GLib') as fake_glib:
+                subscription.wait(10)
+
+        self.assertFalse(fake_glib.timeout_add.called)
+
+    def test_wait_ignores_other_subscriptions(self):
+        subscription = self.get_subscription()
+        with subscription:
+            self.get_signal_handler(subscription)(8)
+            self.assertFalse(subscription._has_changed())
+
+    def test_wait_consumes_notification(self):
+        subscription = self.get_subscription()
+        with subscription:
+            self.get_signal_handler(subscription)(7)
+            subscription.wait(10)
+            self.assertFalse(subscription._has_changed())
+
+    def test_wait_stops_at_timeout(self):
+        subscription = self.get_subscription()
+
+        def fake_timeout_add(interval, callback):
+            self.assertThat(interval, Equals(250))
+            callback()
+
+        with subscription:
+            with patch.object(backends, 'GLib') as fake_glib:
+                fake_glib.timeout_add.side_effect = fake_timeout_add
+                with patch.object(backends, '_iterate_main_loop_until') as it:
+                    it.side_effect = lambda predicate: self.assertTrue(
+                        predicate()
+                    )
+                    subscription.wait(0.25)
+
+        self.assertFalse(fake_glib.source_remove.called)
+
+
+def _get_async_get_state(replies, error=None):
+    """Return a fake GetState that answers asynchronous calls immediately."""
+    def fake_get_state(query_bytes, reply_handler, error_handler):
+        if error is not None:
+            error_handler(error)
+        else:
+            reply_handler(replies[query_bytes])
+    return Mock(side_effect=fake_get_state)
+
+
+class BackendBatchTests(TestCase):
+
+    def test_batch_returns_replies_in_query_order(self):
+        queries = [
+            xpathselect.Query.root('foo'),
+            xpathselect.Query.root('foo').select_child('bar'),
+        ]
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = \
+            _get_async_get_state({
+                b'/foo': [(b'/foo', {})],
+                b'/foo/bar': [(b'/foo/bar', {}), (b'/foo/bar', {})],
+            })
+        backend = backends.Backend(fake_dbus_address)
+
+        self.assertThat(
+            backend.execute_queries_get_data(queries),
+            Equals([
+                [(b'/foo', {})],
+                [(b'/foo/bar', {}), (b'/foo/bar', {})],
+            ])
+        )
+
+    def test_batch_sends_every_query_before_waiting(self):
+        queries = [
+            xpathselect.Query.root('foo'),
+            xpathselect.Query.root('foo').select_child('bar'),
+        ]
+        fake_dbus_address = Mock()
+        backend = backends.Backend(fake_dbus_address)
+
+        def fake_wait(predicate):
+            get_state = fake_dbus_address.introspection_iface.GetState
+            self.assertThat(get_state.call_count, Equals(2))
+            for call in get_state.call_args_list:
+                call[1]['reply_handler']([])
+
+        with patch.object(backends, '_iterate_main_loop_until', fake_wait):
+            self.assertThat(
+                backend.execute_queries_get_data(queries),
+                Equals([[], []])
+            )
+
+    def test_batch_of_one_query_is_synchronous(self):
+        query = xpathselect.Query.root('foo')
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState.return_value = []
+        backend = backends.Backend(fake_dbus_address)
+
+        self.assertThat(
+            backend.execute_queries_get_data([query]),
+            Equals([[]])
+        )
+        get_state = fake_dbus_address.introspection_iface.GetState
+        get_state.assert_called_once_with(b'/foo')
+
+    def test_batch_raises_runtime_error_on_lost_backend(self):
+        queries = [
+            xpathselect.Query.root('foo'),
+            xpathselect.Query.root('foo').select_child('bar'),
+        ]
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = \
+            _get_async_get_state(
+                {},
+                DBusException(
+                    name='org.freedesktop.DBus.Error.ServiceUnknown'
+                )
+            )
+        backend = backends.Backend(fake_dbus_address)
+
+        self.assertRaises(
+            RuntimeError,
+            backend.execute_queries_get_data,
+            queries
+        )
+
+    def test_batch_raises_uncaught_dbus_exceptions(self):
+        queries = [
+            xpathselect.Query.root('foo'),
+            xpathselect.Query.root('foo').select_child('bar'),
+        ]
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = \
+            _get_async_get_state({}, DBusException())
+        backend = backends.Backend(fake_dbus_address)
+
+        self.assertRaises(
+            DBusException,
+            backend.execute_queries_get_data,
+            queries
+        )
+
+    def test_batch_raises_if_replies_do_not_arrive_in_time(self):
+        queries = [
+            xpathselect.Query.root('foo'),
+            xpathselect.Query.root('foo').select_child('bar'),
+        ]
+        fake_dbus_address = Mock()
+        backend = backends.Backend(fake_dbus_address)
+
+        with patch.object(
+                backends, '_iterate_main_loop_until_or_timeout') as wait:
+            error = self.assertRaises(
+                DBusException,
+                backend.execute_queries_get_data,
+                queries
+            )
+
+        self.assertThat(wait.call_args[0][1], Equals(backends._REPLY_TIMEOUT))
+        self.assertThat(
+            error.get_dbus_name(),
+            Equals('org.freedesktop.DBus.Error.NoReply')
+        )
+
+    @patch.object(backends, 'make_introspection_object', return_value=None)
+    def test_batch_proxy_instances_returns_list_per_query(self, mio):
+        queries = [
+            xpathselect.Query.root('foo'),
+            xpathselect.Query.root('foo').select_child('bar'),
+        ]
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = \
+            _get_async_get_state({
+                b'/foo': [(b'/foo', {})],
+                b'/foo/bar': [],
+            })
+        backend = backends.Backend(fake_dbus_address)
+
+        self.assertThat(
+            backend.execute_queries_get_proxy_instances(queries, 0),
+            Equals([[None], []])
+        )
+
+
+class BackendAsyncTests(TestCase):
+
+    def test_async_query_returns_reply(self):
+        query = xpathselect.Query.root('foo')
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = \
+            _get_async_get_state({b'/foo': [(b'/foo', {})]})
+        backend = backends.Backend(fake_dbus_address)
+
+        self.assertThat(
+            asyncio.run(backend.execute_query_get_data_async(query)),
+            Equals([(b'/foo', {})])
+        )
+
+    def test_async_query_raises_runtime_error_on_lost_backend(self):
+        query = xpathselect.Query.root('foo')
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = \
+            _get_async_get_state(
+                {},
+                DBusException(
+                    name='org.freedesktop.DBus.Error.ServiceUnknown'
+                )
+            )
+        backend = backends.Backend(fake_dbus_address)
+
+        self.assertRaises(
+            RuntimeError,
+            asyncio.run,
+            backend.execute_query_get_data_async(query)
+        )
+
+    def test_async_query_raises_if_reply_does_not_arrive_in_time(self):
+        query = xpathselect.Query.root('foo')
+        fake_dbus_address = Mock()
+        backend = backends.Backend(fake_dbus_address)
+
+        with patch.object(
+                backends, '_iterate_main_loop_until_or_timeout') as wait:
+            error = self.assertRaises(
+                DBusException,
+                asyncio.run,
+                backend.execute_query_get_data_async(query)
+            )
+
+        self.assertThat(wait.call_args[0][1], Equals(backends._REPLY_TIMEOUT))
+        self.assertThat(
+            error.get_dbus_name(),
+            Equals('org.freedesktop.DBus.Error.NoReply')
+        )
+
+    def test_async_query_waits_for_reply_outside_event_loop(self):
+        query = xpathselect.Query.root('foo')
+        handlers = []
+        wait_threads = []
+
+        def fake_get_state(query_bytes, reply_handler, error_handler):
+            handlers.append(reply_handler)
+
+        def fake_wait(predicate, timeout):
+            # Reply from the waiting thread, as the GLib main loop would:
+            wait_threads.append(threading.current_thread())
+            handlers[0]([(b'/foo', {})])
+            return 0.0
+
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = Mock(
+            side_effect=fake_get_state
+        )
+        backend = backends.Backend(fake_dbus_address)
+
+        with patch.object(
+                backends, '_iterate_main_loop_until_or_timeout', fake_wait):
+            result = asyncio.run(backend.execute_query_get_data_async(query))
+
+        self.assertThat(result, Equals([(b'/foo', {})]))
+        self.assertThat(
+            wait_threads,
+            Not(Contains(threading.main_thread()))
+        )
+
+    def test_concurrent_async_queries_are_all_in_flight(self):
+        queries = [
+            xpathselect.Query.root('foo'),
+            xpathselect.Query.root('foo').select_child('bar'),
+        ]
+        pending = []
+        lock = threading.Lock()
+
+        def fake_get_state(query_bytes, reply_handler, error_handler):
+            pending.append((query_bytes, reply_handler))
+
+        def fake_iteration(may_block):
+            # Only answer once both calls have been made.
+            with lock:
+                if len(pending) < 2:
+                    return False
+                while pending:
+                    query_bytes, reply_handler = pending.pop()
+                    reply_handler([(query_bytes, {})])
+                return True
+
+        fake_dbus_address = Mock()
+        fake_dbus_address.introspection_iface.GetState = Mock(
+            side_effect=fake_get_state
+        )
+        backend = backends.Backend(fake_dbus_address)
+
+        async def run_queries():
+            return await asyncio.gather(
+                *[backend.execute_query_get_data_async(q) for q in queries]
+            )
+
+        with patch.object(backends, 'GLib') as fake_glib:
+            fake_glib.MainContext.default.return_value.iteration = \
+                fake_iteration
+            results = asyncio.run(run_queries())
+
+        self.assertThat(
+            results,
+            Equals([[(b'/foo', {})], [(b'/foo/bar', {})]])
+        )
+
+
+def get_live_tree():
+    Node = query_engine.Node
+    return Node('App', dict(id=[0, 1]), [
+        Node('Window', dict(id=[0, 2]), [
+            Node('Label', dict(id=[0, 3], text=[0, 'Hello'])),
+            Node('Button', dict(id=[0, 4], text=[0, 'OK'])),
+        ]),
+        Node('Dialog', dict(id=[0, 5])),
+    ])
+
+
+def get_live_backend(tree):
+    """Return a fake backend that answers queries from 'tree'."""
+    backend = Mock()
+    backend.execute_queries_get_data.side_effect = lambda queries: [
+        query_engine.execute_query(tree, q.server_query_bytes())
+        for q in queries
+    ]
+    return backend
+
+
+class SnapshotBackendTests(TestCase):
+
+    def get_snapshot(self, tree, path=b'/App/Window', id=2):
+        live_backend = get_live_backend(tree)
+        return backends.SnapshotBackend(live_backend, path, id), live_backend
+
+    def get_paths(self, backend, query):
+        return [p for p, _ in backend.execute_query_get_data(query)]
+
+    def test_fetches_one_batch_per_level(self):
+        _, live_backend = self.get_snapshot(get_live_tree())
+        # The window and its ancestors, its children, and their (empty)
+        # children:
+        self.assertThat(
+            live_backend.execute_queries_get_data.call_count,
+            Equals(2)
+        )
+
+    def test_answers_queries_without_the_application(self):
+        snapshot, live_backend = self.get_snapshot(get_live_tree())
+        live_backend.reset_mock()
+
+        query = xpathselect.Query.new_from_path_and_id(b'/App/Window', 2)
+        self.assertThat(
+            self.get_paths(snapshot, query.select_child('*')),
+            Equals(['/App/Window/Label', '/App/Window/Button'])
+        )
+        self.assertFalse(live_backend.execute_queries_get_data.called)
+        self.assertFalse(live_backend.execute_query_get_data.called)
+
+    def test_contains_ancestors_but_not_their_other_children(self):
+        snapshot, _ = self.get_snapshot(get_live_tree())
+
+        query = xpathselect.Query.root('App')
+        self.assertThat(self.get_paths(snapshot, query), Equals(['/App']))
+        self.assertThat(
+            self.get_paths(snapshot, query.select_child('Dialog')),
+            Equals([])
+        )
+
+    def test_applies_filters(self):
+        snapshot, _ = self.get_snapshot(get_live_tree())
+
+        query = xpathselect.Query.root('App').select_descendant(
+            'Button',
+            dict(text=Not(Equals('OK')))
+        )
+        self.assertThat(self.get_paths(snapshot, query), Equals([]))
+
+    def test_returns_copies_of_state(self):
+        snapshot, _ = self.get_snapshot(get_live_tree())
+
+        query = xpathselect.Query.new_from_path_and_id(b'/App/Window', 2)
+        snapshot.execute_query_get_data(query)[0][1].clear()
+        self.assertThat(
+            snapshot.execute_query_get_data(query)[0][1],
+            Equals({'id': [0, 2]})
+        )
+
+    def test_raises_when_root_object_is_gone(self):
+        self.assertRaises(
+            StateNotFoundError,
+            self.get_snapshot,
+            get_live_tree(),
+            b'/App/Window',
+            42
+        )
+
+    def test_is_not_stale_when_unchanged(self):
+        snapshot, _ = self.get_snapshot(get_live_tree())
+        self.assertFalse(snapshot.is_stale())
+
+    def test_is_stale_after_property_change(self):
+        tree = get_live_tree()
+        snapshot, _ = self.get_snapshot(tree)
+
+        tree.children[0].children[0].state['text'] = [0, 'Goodbye']
+        self.assertTrue(snapshot.is_stale())
+
+    def test_is_stale_after_object_removed(self):
+        tree = get_live_tree()
+        snapshot, _ = self.get_snapshot(tree)
+
+        tree.remove_child(tree.children[0])
+        self.assertTrue(snapshot.is_stale())
+
+    def test_does_not_watch_for_changes(self):
+        snapshot, _ = self.get_snapshot(get_live_tree())
+        self.assertThat(
+            snapshot.watch_state_changes(xpathselect.Query.root('App')),
+            IsInstance(backends.PollingStateWatch)
+        )
+
+
 class MakeIntrospectionObjectTests(TestCase):
 
     """Test selection of custom proxy object class."""
@@ -347,3 +1512,248 @@ class MakeIntrospectionObjectTests(TestCase):
         selected = self.DefaultSelector.validate_dbus_object(
             '/DefaultSelector', {})
         self.assertTrue(selected)
+
+
+class InMemoryBackendTests(TestCase):
+
+    def get_paths(self, backend, query):
+        return [p for p, _ in backend.execute_query_get_data(query)]
+
+    def test_accepts_tree_as_dictionary(self):
+        backend = backends.InMemoryBackend(get_live_tree().to_dict())
+        self.assertThat(
+            self.get_paths(backend, xpathselect.Query.root('App')),
+            Equals(['/App'])
+        )
+
+    def test_evaluates_queries_against_tree(self):
+        backend = backends.InMemoryBackend(get_live_tree())
+        query = xpathselect.Query.root('App').select_descendant(
+            'Button',
+            dict(text='OK')
+        )
+        self.assertThat(
+            self.get_paths(backend, query),
+            Equals(['/App/Window/Button'])
+        )
+        self.assertThat(
+            self.get_paths(backend, query.select_parent()),
+            Equals(['/App/Window'])
+        )
+        self.assertThat(
+            self.get_paths(backend, xpathselect.Query.pseudo_tree_root()),
+            Equals(['/App'])
+        )
+
+    def test_sees_changes_to_tree(self):
+        tree = get_live_tree()
+        backend = backends.InMemoryBackend(tree)
+        tree.children[1].state['title'] = [0, 'Changed']
+
+        query = xpathselect.Query.root('App').select_child(
+            'Dialog',
+            dict(title='Changed')
+        )
+        self.assertThat(
+            self.get_paths(backend, query),
+            Equals(['/App/Dialog'])
+        )
+
+    def test_raises_on_bad_tree(self):
+        self.assertThat(
+            lambda: backends.InMemoryBackend(dict(name='App')),
+            raises(ValueError)
+        )
+
+    def test_returns_only_properties_asked_for(self):
+        backend = backends.InMemoryBackend(get_live_tree())
+        query = xpathselect.Query.root('App').select_descendant('Button')
+        self.assertThat(
+            backend.execute_query_get_data(query, ['text']),
+            Equals([('/App/Window/Button', dict(id=[0, 4], text=[0, 'OK']))])
+        )
+
+    def test_proxies_fetch_other_properties_when_read(self):
+        class Button(dbus.CustomEmulatorBase):
+            pass
+
+        tree = get_live_tree()
+        tree.children[0].children[1].state['enabled'] = [0, True]
+        backend = backends.InMemoryBackend(tree)
+        [button] = backend.execute_query_get_proxy_instances(
+            xpathselect.Query.root('App').select_descendant('Button'),
+            Button._id,
+            ['text']
+        )
+
+        self.assertThat(button.text, Equals('OK'))
+        self.assertThat(button.enabled, Equals(True))
+
+
+class GetPlainValueTests(TestCase):
+
+    def test_converts_dbus_types(self):
+        value = Array([Int32(0), Boolean(True), String('x')])
+        plain = backends._get_plain_value(value)
+
+        self.assertThat(plain, Equals([0, True, 'x']))
+        self.assertThat([type(v) for v in plain], Equals([int, bool, str]))
+
+    def test_keeps_plain_bools(self):
+        self.assertThat(backends._get_plain_value(False), IsInstance(bool))
+
+
+class BackendRecordingTests(TestCase):
+
+    def test_records_replies_while_recording(self):
+        backend = backends.Backend(Mock())
+        backend.ipc_address.supports_extended_filters = False
+        backend.ipc_address.introspection_iface.GetState.return_value = [
+            (String('/App'), dict(id=Array([Int32(0), Int32(1)])))
+        ]
+        with patch.object(backends, '_traffic') as traffic:
+            backend.execute_query_get_data(xpathselect.Query.root('App'))
+
+        recorder = traffic.get_recorder.return_value
+        query, reply, _, _ = recorder.record.call_args[0]
+        self.assertThat(query, Equals(b'/App'))
+        self.assertThat(reply, Equals([['/App', dict(id=[0, 1])]]))
+        self.assertThat(type(reply[0][1]['id'][1]), Equals(int))
+
+    def test_records_connection_name(self):
+        backend = backends.Backend(
+            backends.DBusAddress(Mock(), ':1.42', '/com/canonical/Autopilot')
+        )
+        with patch.object(
+                backends.DBusAddress, 'introspection_iface') as iface:
+            iface.GetState.return_value = []
+            with patch.object(backends, '_traffic') as traffic:
+                backend.execute_query_get_data(xpathselect.Query.root('App'))
+
+        recorder = traffic.get_recorder.return_value
+        self.assertThat(
+            recorder.record.call_args[1]['connection'],
+            Equals(':1.42')
+        )
+
+    def test_keeps_byte_arrays(self):
+        self.assertThat(
+            backends._get_plain_value(ByteArray(b'\x00\xff')),
+            Equals(b'\x00\xff')
+        )
+
+
+def get_recording():
+    return [
+        dict(time=0.0, duration=0.5, query='/App',
+             reply=[['/App', dict(id=[0, 1])]]),
+        dict(time=0.5, duration=0.25, query='/App/Label[id=2]',
+             reply=[['/App/Label', dict(id=[0, 2], text=[0, 'one'])]]),
+        dict(time=1.0, duration=0.25, query='/App/Label[id=2]',
+             reply=[['/App/Label', dict(id=[0, 2], text=[0, 'two'])]]),
+    ]
+
+
+class ReplayBackendTests(TestCase):
+
+    def get_label_text(self, backend):
+        query = xpathselect.Query.new_from_path_and_id(b'/App/Label', 2)
+        return backend.execute_query_get_data(query)[0][1]['text'][1]
+
+    def test_replays_replies_in_recorded_order(self):
+        backend = backends.ReplayBackend(get_recording())
+        self.assertThat(
+            [self.get_label_text(backend) for i in range(3)],
+            Equals(['one', 'two', 'two'])
+        )
+
+    def test_raises_for_queries_not_recorded(self):
+        backend = backends.ReplayBackend(get_recording())
+        self.assertThat(
+            lambda: backend.execute_query_get_data(
+                xpathselect.Query.root('Other')
+            ),
+            raises(RuntimeError)
+        )
+
+    def test_get_root_state(self):
+        backend = backends.ReplayBackend(get_recording())
+        self.assertThat(
+            backend.get_root_state(),
+            Equals(('/App', dict(id=[0, 1])))
+        )
+
+    def test_timing_delays_replies(self):
+        backend = backends.ReplayBackend(get_recording(), timing=True)
+        with sleep.mocked() as mocked_sleep:
+            self.get_label_text(backend)
+            self.assertThat(mocked_sleep.total_time_slept(), Equals(0.25))
+
+    def test_projected_query_uses_full_replies(self):
+        backend = backends.ReplayBackend(get_recording())
+        query = xpathselect.Query.root('App')
+        self.assertThat(
+            backend.execute_query_get_data(query, ['text']),
+            Equals([('/App', dict(id=[0, 1]))])
+        )
+
+    def test_projected_replies_are_kept_apart(self):
+        recording = get_recording() + [
+            dict(time=1.5, duration=0.25, query='/App/Label[id=2]',
+                 properties=['text'],
+                 reply=[['/App/Label', dict(id=[0, 2], text=[0, 'three'])]]),
+        ]
+        backend = backends.ReplayBackend(recording)
+        query = xpathselect.Query.new_from_path_and_id(b'/App/Label', 2)
+
+        self.assertThat(
+            backend.execute_query_get_data(query, ['text'])[0][1]['text'][1],
+            Equals('three')
+        )
+        self.assertThat(self.get_label_text(backend), Equals('one'))
+
+    def test_replays_first_connection_by_default(self):
+        recording = [
+            dict(entry, connection=':1.1') for entry in get_recording()
+        ] + [
+            dict(time=1.5, duration=0.25, query='/App/Label[id=2]',
+                 connection=':1.2',
+                 reply=[['/App/Label', dict(id=[0, 2], text=[0, 'other'])]]),
+        ]
+        backend = backends.ReplayBackend(recording)
+
+        self.assertThat(
+            [self.get_label_text(backend) for i in range(3)],
+            Equals(['one', 'two', 'two'])
+        )
+
+    def test_replays_given_connection(self):
+        recording = [
+            dict(entry, connection=':1.1') for entry in get_recording()
+        ] + [
+            dict(time=1.5, duration=0.25, query='/Other',
+                 connection=':1.2',
+                 reply=[['/Other', dict(id=[0, 1])]]),
+            dict(time=2.0, duration=0.25, query='/App/Label[id=2]',
+                 connection=':1.2',
+                 reply=[['/App/Label', dict(id=[0, 2], text=[0, 'other'])]]),
+        ]
+        backend = backends.ReplayBackend(recording, connection=':1.2')
+
+        self.assertThat(
+            backend.get_root_state(),
+            Equals(('/Other', dict(id=[0, 1])))
+        )
+        self.assertThat(self.get_label_text(backend), Equals('other'))
+
+    def test_raises_for_connection_not_recorded(self):
+        self.assertThat(
+            lambda: backends.ReplayBackend(get_recording(), connection=':1.9'),
+            raises(ValueError)
+        )
+
+    def test_no_delay_by_default(self):
+        backend = backends.ReplayBackend(get_recording())
+        with sleep.mocked() as mocked_sleep:
+            self.get_label_text(backend)
+            self.assertThat(mocked_sleep.total_time_slept(), Equals(0.0))
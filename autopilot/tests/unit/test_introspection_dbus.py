@@ -17,26 +17,44 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import asyncio
+import gzip
+import json
 import sys
 import tempfile
 import shutil
 import os.path
 
-from unittest.mock import patch, Mock
-from io import StringIO
+from unittest.mock import patch, MagicMock, Mock
+from io import BytesIO, StringIO
 from textwrap import dedent
+from dbus import DBusException
+from fixtures import FakeLogger
 from testtools import TestCase
 from testtools.matchers import (
+    Contains,
     Equals,
+    Is,
+    IsInstance,
     Not,
     NotEquals,
     Raises,
     raises,
 )
 
+from autopilot import _timeout
 from autopilot.exceptions import StateNotFoundError
+from autopilot.globals import (
+    get_poll_interval,
+    get_state_max_age,
+    set_poll_interval,
+    set_state_max_age,
+)
 from autopilot.introspection import (
     CustomEmulatorBase,
+    _object_registry,
+    _query_engine as query_engine,
+    backends,
     dbus,
     is_element,
 )
@@ -133,6 +151,151 @@ class DBusIntrospectionObjectTests(TestCase):
                 ),
             )
 
+    @patch.object(_timeout, '_POLL_INTERVAL_JITTER', 0.0)
+    def test_wait_until_destroyed_wakes_on_state_change(self):
+        self.addCleanup(set_poll_interval, *get_poll_interval())
+        set_poll_interval(0.01, 0.5)
+        fake_state = dict(id=[0, 123])
+        backend = MagicMock(spec=backends.Backend)
+        fake_object = dbus.DBusIntrospectionObject(
+            fake_state,
+            b'/root',
+            backend
+        )
+        backend.execute_query_get_data.side_effect = [
+            [fake_state],
+            [fake_state],
+            [],
+        ]
+        changes = backend.watch_state_changes.return_value.__enter__.\
+            return_value
+
+        fake_object.wait_until_destroyed(timeout=1)
+
+        backend.watch_state_changes.assert_called_once_with(
+            fake_object._query,
+            ()
+        )
+        changes.wait.assert_called_once_with(0.01)
+
+    def test_wait_until_destroyed_does_not_watch_destroyed_object(self):
+        backend = MagicMock(spec=backends.Backend)
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123]),
+            b'/root',
+            backend
+        )
+        backend.execute_query_get_data.return_value = []
+
+        fake_object.wait_until_destroyed(timeout=1)
+
+        self.assertFalse(backend.watch_state_changes.called)
+
+    def test_wait_select_single_does_not_watch_when_object_exists(self):
+        backend = MagicMock(spec=backends.Backend)
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123]),
+            b'/root',
+            backend
+        )
+        with patch.object(fake_object, '_select_single') as select_single:
+            result = fake_object.wait_select_single('Foo')
+
+        self.assertThat(result, Equals(select_single.return_value))
+        self.assertFalse(backend.watch_state_changes.called)
+
+    def test_wait_select_many_does_not_watch_when_objects_exist(self):
+        backend = MagicMock(spec=backends.Backend)
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123]),
+            b'/root',
+            backend
+        )
+        with patch.object(fake_object, '_select_many') as select_many:
+            select_many.return_value = [Mock()]
+            fake_object.wait_select_many('Foo')
+
+        self.assertFalse(backend.watch_state_changes.called)
+
+    def test_waits_poll_with_non_dbus_backends(self):
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123]),
+            b'/root',
+            Mock()
+        )
+        self.assertThat(
+            fake_object._watch_state_changes(),
+            IsInstance(backends.PollingStateWatch)
+        )
+
+    def test_refresh_state_async_updates_properties(self):
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123], text=[0, 'old']),
+            b'/root',
+            Mock()
+        )
+
+        async def fake_get_data(query, properties=None):
+            return [(b'/root', dict(id=[0, 123], text=[0, 'new']))]
+        fake_object._backend.execute_query_get_data_async = fake_get_data
+
+        asyncio.run(fake_object.refresh_state_async())
+        with fake_object.no_automatic_refreshing():
+            self.assertThat(fake_object.text, Equals('new'))
+
+    def test_refresh_state_async_raises_when_object_destroyed(self):
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123]),
+            b'/root',
+            Mock()
+        )
+
+        async def fake_get_data(query, properties=None):
+            return []
+        fake_object._backend.execute_query_get_data_async = fake_get_data
+
+        self.assertRaises(
+            StateNotFoundError,
+            asyncio.run,
+            fake_object.refresh_state_async()
+        )
+
+    def test_select_single_async_returns_single_instance(self):
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123]),
+            b'/root',
+            Mock()
+        )
+        child = object()
+
+        async def fake_get_instances(query, id, properties=None):
+            return [child]
+        fake_object._backend.execute_query_get_proxy_instances_async = \
+            fake_get_instances
+
+        self.assertThat(
+            asyncio.run(fake_object.select_single_async('Child')),
+            Equals(child)
+        )
+
+    def test_select_single_async_raises_when_nothing_found(self):
+        fake_object = dbus.DBusIntrospectionObject(
+            dict(id=[0, 123]),
+            b'/root',
+            Mock()
+        )
+
+        async def fake_get_instances(query, id, properties=None):
+            return []
+        fake_object._backend.execute_query_get_proxy_instances_async = \
+            fake_get_instances
+
+        self.assertRaises(
+            StateNotFoundError,
+            asyncio.run,
+            fake_object.select_single_async('Child')
+        )
+
     def test_base_class_provides_correct_query_name(self):
         self.assertThat(
             dbus.DBusIntrospectionObject.get_type_query_name(),
@@ -156,26 +319,448 @@ class DBusIntrospectionObjectTests(TestCase):
         self.assertThat(TestCPO.get_type_query_name(), Equals("TestCPO"))
 
 
+class StateFreshnessTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(set_state_max_age, get_state_max_age())
+        set_state_max_age(0)
+
+    def get_fake_object(self):
+        state = dict(id=[0, 123], x=[0, 10], width=[0, 20])
+        fake_object = dbus.DBusIntrospectionObject(state, b'/root', Mock())
+        fake_object._backend.execute_query_get_data.return_value = [
+            (b'/root', state)
+        ]
+        return fake_object
+
+    def get_refresh_count(self, fake_object):
+        return fake_object._backend.execute_query_get_data.call_count
+
+    def test_attribute_reads_refresh_by_default(self):
+        fake_object = self.get_fake_object()
+        fake_object.x + fake_object.width
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(2))
+
+    def test_reads_within_proxy_max_age_reuse_state(self):
+        fake_object = self.get_fake_object()
+        fake_object.set_state_max_age(0.5)
+        with patch.object(dbus, 'monotonic', return_value=1000.0):
+            fake_object.refresh_state()
+            fake_object.x + fake_object.width
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(1))
+
+    def test_reads_after_proxy_max_age_refresh_state(self):
+        fake_object = self.get_fake_object()
+        fake_object.set_state_max_age(0.5)
+        with patch.object(dbus, 'monotonic', return_value=1000.0):
+            fake_object.refresh_state()
+        with patch.object(dbus, 'monotonic', return_value=1000.6):
+            fake_object.x
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(2))
+
+    def test_global_max_age_is_used_when_proxy_has_none(self):
+        set_state_max_age(0.5)
+        fake_object = self.get_fake_object()
+        with patch.object(dbus, 'monotonic', return_value=1000.0):
+            fake_object.refresh_state()
+            fake_object.x + fake_object.width
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(1))
+
+    def test_proxy_max_age_overrides_global_max_age(self):
+        set_state_max_age(0.5)
+        fake_object = self.get_fake_object()
+        fake_object.set_state_max_age(0)
+        with patch.object(dbus, 'monotonic', return_value=1000.0):
+            fake_object.x + fake_object.width
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(2))
+
+    def test_snapshot_refreshes_once(self):
+        fake_object = self.get_fake_object()
+        with fake_object.snapshot():
+            fake_object.x + fake_object.width
+            fake_object.get_properties()
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(1))
+
+    def test_reads_refresh_again_after_snapshot(self):
+        fake_object = self.get_fake_object()
+        with fake_object.snapshot():
+            fake_object.x
+        fake_object.x
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(2))
+
+    def test_nested_no_automatic_refreshing_restores_outer_setting(self):
+        fake_object = self.get_fake_object()
+        with fake_object.no_automatic_refreshing():
+            with fake_object.no_automatic_refreshing():
+                pass
+            fake_object.x
+
+        self.assertThat(self.get_refresh_count(fake_object), Equals(0))
+
+
+class LazyDecodingTests(TestCase):
+
+    def get_fake_object(self):
+        state = dict(id=[0, 123], x=[0, 10], width=[0, 20], height=[0, 30])
+        return dbus.DBusIntrospectionObject(state, b'/root', Mock())
+
+    def test_values_are_not_decoded_on_construction(self):
+        with patch.object(dbus, 'create_value_instance') as cvi:
+            self.get_fake_object()
+
+        self.assertFalse(cvi.called)
+
+    def test_only_read_values_are_decoded(self):
+        fake_object = self.get_fake_object()
+        with patch.object(
+            dbus,
+            'create_value_instance',
+            wraps=dbus.create_value_instance
+        ) as cvi:
+            with fake_object.no_automatic_refreshing():
+                fake_object.x
+                fake_object.x
+
+        cvi.assert_called_once_with([0, 10], fake_object, 'x')
+
+    def test_decoded_values_are_discarded_on_refresh(self):
+        fake_object = self.get_fake_object()
+        with fake_object.no_automatic_refreshing():
+            fake_object.x
+        fake_object._set_properties(dict(id=[0, 123], x=[0, 11]))
+
+        with fake_object.no_automatic_refreshing():
+            self.assertThat(fake_object.x, Equals(11))
+
+    def test_get_properties_decodes_all_values(self):
+        fake_object = self.get_fake_object()
+        # get_properties() always refreshes state, so can't use
+        # no_automatic_refreshing()
+        fake_object.refresh_state = lambda: None
+        properties = fake_object.get_properties()
+
+        self.assertThat(
+            properties,
+            Equals(dict(id=123, x=10, width=20, height=30))
+        )
+
+    def test_missing_attribute_raises_attribute_error(self):
+        fake_object = self.get_fake_object()
+        with fake_object.no_automatic_refreshing():
+            self.assertFalse(hasattr(fake_object, 'depth'))
+
+
+class SubtreeSnapshotTests(TestCase):
+
+    def get_live_backend(self):
+        Node = query_engine.Node
+        tree = Node('App', dict(id=[0, 1]), [
+            Node('Window', dict(id=[0, 2]), [
+                Node('Label', dict(id=[0, 3], text=[0, 'Hello'])),
+                Node('Button', dict(id=[0, 4], text=[0, 'OK'])),
+            ]),
+        ])
+        backend = Mock()
+        backend.execute_queries_get_data.side_effect = lambda queries: [
+            query_engine.execute_query(tree, q.server_query_bytes())
+            for q in queries
+        ]
+        return backend
+
+    def get_snapshot(self):
+        class Window(CustomEmulatorBase):
+            pass
+
+        # Objects found in the snapshot get generated proxy classes based on
+        # Window, as they would when searching an application:
+        patcher = patch.dict(
+            _object_registry._proxy_extensions,
+            {Window._id: (Window,)}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        window = Window(
+            dict(id=[0, 2]),
+            b'/App/Window',
+            self.get_live_backend()
+        )
+        return window.snapshot_subtree(), window._backend
+
+    def test_returns_subtree_snapshot(self):
+        snapshot, _ = self.get_snapshot()
+        self.assertThat(snapshot, IsInstance(dbus.SubtreeSnapshot))
+        self.assertThat(snapshot.root.id, Equals(2))
+
+    def test_select_single_does_not_query_application(self):
+        snapshot, live_backend = self.get_snapshot()
+        live_backend.reset_mock()
+
+        button = snapshot.select_single('Button', text='OK')
+
+        self.assertThat(button.id, Equals(4))
+        self.assertThat(button.get_parent().id, Equals(2))
+        self.assertFalse(live_backend.execute_queries_get_data.called)
+        self.assertFalse(live_backend.execute_query_get_data.called)
+
+
+class GetParentTests(TestCase):
+
+    def get_button(self):
+        Node = query_engine.Node
+        tree = Node('App', dict(id=[0, 1], visible=[0, True]), [
+            Node('Window', dict(id=[0, 2], title=[0, 'Main']), [
+                Node('Window', dict(id=[0, 3], title=[0, 'Dialog']), [
+                    Node('Button', dict(id=[0, 4], text=[0, 'OK'])),
+                ]),
+            ]),
+        ])
+
+        class Button(CustomEmulatorBase):
+            pass
+
+        patcher = patch.dict(
+            _object_registry._proxy_extensions,
+            {Button._id: (Button,)}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backend = Mock(wraps=backends.InMemoryBackend(tree))
+        return Button(dict(id=[0, 4]), b'/App/Window/Window/Button', backend)
+
+    def test_finds_closest_parent_with_type_and_filters(self):
+        button = self.get_button()
+        self.assertThat(
+            button.get_parent('Window', title='Main').id,
+            Equals(2)
+        )
+
+    def test_finds_parent_with_filters_only(self):
+        button = self.get_button()
+        self.assertThat(button.get_parent(visible=True).id, Equals(1))
+
+    def test_finds_parent_with_client_side_filters(self):
+        button = self.get_button()
+        self.assertThat(
+            button.get_parent('Window', title=Not(Equals('Dialog'))).id,
+            Equals(2)
+        )
+
+    def test_raises_if_no_parent_matches(self):
+        button = self.get_button()
+        self.assertThat(
+            lambda: button.get_parent('Window', title='Other'),
+            raises(StateNotFoundError)
+        )
+
+    def test_filters_are_checked_by_the_application(self):
+        button = self.get_button()
+        button.get_parent('Window', title='Main')
+
+        [queries, _], _ = \
+            button._backend.execute_queries_get_proxy_instances.call_args
+        self.assertThat(
+            [q.server_query_bytes() for q in queries],
+            Equals([
+                b'/App/Window/Window[title="Main"]/Button[id=4]/..',
+                b'/App/Window[title="Main"]/Window/Button[id=4]/../..',
+            ])
+        )
+
+    def test_uses_a_single_round_trip(self):
+        button = self.get_button()
+        button.get_parent(title=Not(Equals('Dialog')))
+
+        self.assertThat(
+            button._backend.execute_queries_get_proxy_instances.call_count,
+            Equals(1)
+        )
+        self.assertFalse(button._backend.execute_query_get_data.called)
+        self.assertFalse(
+            button._backend.execute_query_get_proxy_instances.called
+        )
+
+
+class PropertyProjectionTests(TestCase):
+
+    def get_window(self):
+        Node = query_engine.Node
+        tree = Node('App', dict(id=[0, 1]), [
+            Node('Window', dict(id=[0, 2], globalRect=[1, 0, 0, 10, 10]), [
+                Node('Label', dict(id=[0, 3], text=[0, 'b'], x=[0, 1])),
+                Node('Label', dict(id=[0, 4], text=[0, 'a'], x=[0, 2])),
+            ]),
+        ])
+        self.tree = tree
+        self.labels = tree.children[0].children
+
+        class Window(CustomEmulatorBase):
+            pass
+
+        patcher = patch.dict(
+            _object_registry._proxy_extensions,
+            {Window._id: (Window,)}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backend = Mock(wraps=backends.InMemoryBackend(tree))
+        return Window(dict(id=[0, 2]), b'/App/Window', backend)
+
+    def test_select_many_fetches_only_properties_asked_for(self):
+        window = self.get_window()
+        labels = window.select_many('Label', ap_properties=['text'])
+
+        with labels[0].no_automatic_refreshing():
+            self.assertThat(
+                labels[0]._get_decoded_properties(),
+                Equals(dict(text='b'))
+            )
+
+    def test_select_many_fetches_sort_keys(self):
+        window = self.get_window()
+        labels = window.select_many(
+            'Label',
+            ap_result_sort_keys=['text'],
+            ap_properties=['x']
+        )
+
+        self.assertThat([label.id for label in labels], Equals([4, 3]))
+        self.assertThat(
+            window._backend.execute_query_get_proxy_instances.call_args[1][
+                'properties'
+            ],
+            Equals(['x', 'text'])
+        )
+
+    def test_reading_other_properties_fetches_whole_state(self):
+        window = self.get_window()
+        [label, _] = window.select_many('Label', ap_properties=['text'])
+
+        self.assertThat(label.x, Equals(1))
+        self.assertThat(label.get_properties()['text'], Equals('b'))
+
+    def test_stale_partial_state_refreshes_same_properties(self):
+        window = self.get_window()
+        [label, _] = window.select_many('Label', ap_properties=['text'])
+
+        with patch.object(
+            label._backend,
+            'execute_query_get_data',
+            wraps=label._backend.execute_query_get_data
+        ) as get_data:
+            label.text
+
+        get_data.assert_called_once_with(label._query, properties=('text',))
+
+    def test_projected_search_merges_into_whole_state(self):
+        window = self.get_window()
+        [label, _] = window.select_many('Label')
+        self.labels[0].state['text'] = [0, 'c']
+        [projected, _] = window.select_many('Label', ap_properties=['text'])
+
+        self.assertThat(projected, Is(label))
+        with patch.object(label._backend, 'execute_query_get_data') as get:
+            with label.no_automatic_refreshing():
+                self.assertThat(label.text, Equals('c'))
+                self.assertThat(label.x, Equals(1))
+        self.assertFalse(get.called)
+
+    def test_projected_search_does_not_change_snapshot(self):
+        window = self.get_window()
+        [label, _] = window.select_many('Label')
+        with label.snapshot():
+            self.labels[0].state['text'] = [0, 'c']
+            window.select_many('Label', ap_properties=['text'])
+
+            with patch.object(
+                label._backend,
+                'execute_query_get_data'
+            ) as get_data:
+                self.assertThat(label.text, Equals('b'))
+                self.assertThat(label.x, Equals(1))
+        self.assertFalse(get_data.called)
+
+    def test_refresh_state_only(self):
+        window = self.get_window()
+        window.refresh_state(only=['globalRect'])
+
+        window._backend.execute_query_get_data.assert_called_once_with(
+            window._query,
+            properties=['globalRect']
+        )
+        with window.no_automatic_refreshing():
+            self.assertThat(window.globalRect, Equals([0, 0, 10, 10]))
+
+    def test_is_moving_fetches_only_global_rect(self):
+        window = self.get_window()
+        with sleep.mocked():
+            self.assertFalse(window.is_moving())
+
+        for _, kwargs in (
+                window._backend.execute_query_get_data.call_args_list):
+            self.assertThat(kwargs['properties'], Equals(['globalRect']))
+
+    def test_legacy_backend_without_properties_argument(self):
+        window = self.get_window()
+        in_memory = backends.InMemoryBackend(self.tree)
+
+        class LegacyBackend(backends.Backend):
+
+            def execute_query_get_data(self, query):
+                return in_memory.execute_query_get_data(query)
+
+            def execute_query_get_proxy_instances(self, query, id):
+                data = self.execute_query_get_data(query)
+                return self._make_proxy_instances(query, data, id)
+
+        window._backend = LegacyBackend(None)
+        window.refresh_state(only=['globalRect'])
+        [label] = window.select_many('Label', ap_properties=['x'], text='a')
+
+        self.assertThat(label.x, Equals(2))
+
+    def test_iter_select_yields_matching_objects(self):
+        window = self.get_window()
+        labels = window.iter_select('Label', batch_size=1, text='a')
+
+        self.assertThat([label.id for label in labels], Equals([4]))
+
+    def test_iter_select_rejects_empty_batches(self):
+        window = self.get_window()
+        self.assertRaises(ValueError, window.iter_select, 'Label', 0)
+
+
 class ProxyObjectPrintTreeTests(TestCase):
 
     def _print_test_fake_object(self):
         """common fake object for print_tree tests"""
 
+        Node = query_engine.Node
+        tree = Node('some', dict(id=[0, 1]), [
+            Node(
+                'path',
+                dict(id=[0, 123], path=[0, '/some/path'], text=[0, 'Hello'])
+            ),
+        ])
+        backend = Mock(wraps=backends.InMemoryBackend(tree))
         fake_object = dbus.DBusIntrospectionObject(
-            dict(id=[0, 123], path=[0, '/some/path'], text=[0, 'Hello']),
+            dict(id=[0, 123]),
             b'/some/path',
-            Mock()
+            backend
         )
-        # get_properties() always refreshes state, so can't use
-        # no_automatic_refreshing()
-        fake_object.refresh_state = lambda: None
-        fake_object._execute_query = lambda q: []
-        return fake_object
+        return fake_object, tree.children[0]
 
     def test_print_tree_stdout(self):
         """print_tree with default output (stdout)"""
 
-        fake_object = self._print_test_fake_object()
+        fake_object, _ = self._print_test_fake_object()
         orig_sys_stdout = sys.stdout
         sys.stdout = StringIO()
         try:
@@ -191,31 +776,21 @@ class ProxyObjectPrintTreeTests(TestCase):
             text: 'Hello'
             """))
 
-    def test_print_tree_exception(self):
+    def test_print_tree_raises_if_object_destroyed(self):
         """print_tree with StateNotFound exception"""
 
-        fake_object = self._print_test_fake_object()
-        child = Mock()
-        child.print_tree.side_effect = StateNotFoundError('child')
+        fake_object, node = self._print_test_fake_object()
+        node.parent.remove_child(node)
 
-        with patch.object(fake_object, 'get_children', return_value=[child]):
-            out = StringIO()
-            print_func = lambda: fake_object.print_tree(out)
-            self.assertThat(print_func, Not(Raises(StateNotFoundError)))
-            self.assertEqual(out.getvalue(), dedent("""\
-            == /some/path ==
-            id: 123
-            path: '/some/path'
-            text: 'Hello'
-            Error: Object not found with name 'child'.
-
-            {}
-            """.format(StateNotFoundError._troubleshoot_url_message)))
+        self.assertThat(
+            lambda: fake_object.print_tree(StringIO()),
+            raises(StateNotFoundError)
+        )
 
     def test_print_tree_fileobj(self):
         """print_tree with file object output"""
 
-        fake_object = self._print_test_fake_object()
+        fake_object, _ = self._print_test_fake_object()
         out = StringIO()
 
         fake_object.print_tree(out)
@@ -230,12 +805,13 @@ class ProxyObjectPrintTreeTests(TestCase):
     def test_print_tree_path(self):
         """print_tree with file path output"""
 
-        fake_object = self._print_test_fake_object()
+        fake_object, _ = self._print_test_fake_object()
         workdir = tempfile.mkdtemp()
         self.addCleanup(shutil.rmtree, workdir)
         outfile = os.path.join(workdir, 'widgets.txt')
 
-        fake_object.print_tree(outfile)
+        with patch('builtins.open', wraps=open) as patched_open:
+            fake_object.print_tree(outfile)
 
         with open(outfile) as f:
             result = f.read()
@@ -245,6 +821,235 @@ class ProxyObjectPrintTreeTests(TestCase):
             path: '/some/path'
             text: 'Hello'
             """))
+        self.assertTrue(patched_open.return_value.closed)
+
+    def add_children(self, node, depth):
+        """Give *node* two children, each with two children, and so on, to
+        *depth* levels.
+
+        """
+        if depth == 0:
+            return
+        for i in range(2):
+            child = query_engine.Node(
+                'Child',
+                dict(id=[0, node.id * 10 + i], index=[0, i])
+            )
+            node.add_child(child)
+            self.add_children(child, depth - 1)
+
+    def test_print_tree_children(self):
+        fake_object, node = self._print_test_fake_object()
+        self.add_children(node, 2)
+        out = StringIO()
+
+        fake_object.print_tree(out)
+
+        self.assertEqual(out.getvalue(), dedent("""\
+            == /some/path ==
+            id: 123
+            path: '/some/path'
+            text: 'Hello'
+
+              == /some/path/Child ==
+              id: 1230
+              index: 0
+
+                == /some/path/Child/Child ==
+                id: 12300
+                index: 0
+
+                == /some/path/Child/Child ==
+                id: 12301
+                index: 1
+
+              == /some/path/Child ==
+              id: 1231
+              index: 1
+
+                == /some/path/Child/Child ==
+                id: 12310
+                index: 0
+
+                == /some/path/Child/Child ==
+                id: 12311
+                index: 1
+            """))
+
+    def test_print_tree_fetches_one_batch_per_group_of_siblings(self):
+        fake_object, node = self._print_test_fake_object()
+        self.add_children(node, 4)
+
+        fake_object.print_tree(StringIO())
+
+        # One for the object and its children, then one for the children of
+        # each of the 15 objects that have any:
+        self.assertThat(
+            fake_object._backend.execute_queries_get_data.call_count,
+            Equals(16)
+        )
+
+    def test_print_tree_does_not_fetch_ancestors(self):
+        fake_object, node = self._print_test_fake_object()
+
+        fake_object.print_tree(StringIO())
+
+        [queries], _ = \
+            fake_object._backend.execute_queries_get_data.call_args
+        self.assertThat(
+            [q.server_query_bytes() for q in queries],
+            Equals([b'/some/path[id=123]', b'/some/path[id=123]/*'])
+        )
+
+    def test_print_tree_writes_objects_as_they_are_fetched(self):
+        fake_object, node = self._print_test_fake_object()
+        self.add_children(node, 2)
+        out = StringIO()
+        written = []
+        get_data = fake_object._backend.execute_queries_get_data
+        get_data.side_effect = lambda queries: (
+            written.append(out.getvalue().count('== /')),
+            get_data._mock_wraps(queries),
+        )[1]
+
+        fake_object.print_tree(out)
+
+        self.assertThat(written, Equals([0, 1, 2, 5]))
+
+    def test_print_tree_maxdepth(self):
+        fake_object, node = self._print_test_fake_object()
+        self.add_children(node, 3)
+        out = StringIO()
+
+        fake_object.print_tree(out, maxdepth=1)
+
+        self.assertThat(out.getvalue().count('== /some/path/Child =='),
+                        Equals(2))
+        self.assertThat(out.getvalue(), Not(Contains('Child/Child')))
+        self.assertThat(
+            fake_object._backend.execute_queries_get_data.call_count,
+            Equals(1)
+        )
+
+    def test_print_tree_json(self):
+        fake_object, node = self._print_test_fake_object()
+        self.add_children(node, 1)
+        out = StringIO()
+
+        fake_object.print_tree(out, format='json')
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertThat(
+            [(d['path'], d['depth'], d['state']['id']) for d in lines],
+            Equals([
+                ('/some/path', 0, [0, 123]),
+                ('/some/path/Child', 1, [0, 1230]),
+                ('/some/path/Child', 1, [0, 1231]),
+            ])
+        )
+
+    def test_print_tree_binary(self):
+        fake_object, _ = self._print_test_fake_object()
+        out = BytesIO()
+
+        fake_object.print_tree(out, format='binary')
+
+        self.assertFalse(out.closed)
+        line = gzip.decompress(out.getvalue()).decode('utf-8')
+        self.assertThat(json.loads(line)['path'], Equals('/some/path'))
+
+    def test_print_tree_json_encodes_byte_arrays(self):
+        fake_object, node = self._print_test_fake_object()
+        node.state['data'] = [0, b'\x00\xff']
+        out = StringIO()
+
+        fake_object.print_tree(out, format='json')
+
+        state = json.loads(out.getvalue())['state']
+        self.assertThat(state['data'], Equals([0, {'__bytes__': 'AP8='}]))
+
+    def test_print_tree_binary_encodes_byte_arrays(self):
+        fake_object, node = self._print_test_fake_object()
+        node.state['data'] = [0, b'\x00\xff']
+        out = BytesIO()
+
+        fake_object.print_tree(out, format='binary')
+
+        line = gzip.decompress(out.getvalue()).decode('utf-8')
+        self.assertThat(
+            json.loads(line)['state']['data'],
+            Equals([0, {'__bytes__': 'AP8='}])
+        )
+
+    def test_print_tree_skips_properties_that_cannot_be_decoded(self):
+        fake_object, node = self._print_test_fake_object()
+        node.state['broken'] = [0]
+        out = StringIO()
+
+        with FakeLogger() as log:
+            fake_object.print_tree(out)
+
+        self.assertEqual(out.getvalue(), dedent("""\
+            == /some/path ==
+            id: 123
+            path: '/some/path'
+            text: 'Hello'
+            """))
+        self.assertThat(log.output, Contains("'path.broken'"))
+
+    def test_print_tree_writes_error_for_children_not_fetched(self):
+        fake_object, node = self._print_test_fake_object()
+        self.add_children(node, 2)
+        backend = fake_object._backend
+        failing_query = b'/some/path/Child[id=1230]/*'
+
+        def raise_for_failing_query(queries):
+            if failing_query in [q.server_query_bytes() for q in queries]:
+                raise DBusException("No such object")
+            return backend._mock_wraps.execute_queries_get_data(queries)
+
+        def raise_if_failing_query(query):
+            if query.server_query_bytes() == failing_query:
+                raise DBusException("No such object")
+            return backend._mock_wraps.execute_query_get_data(query)
+
+        backend.execute_queries_get_data.side_effect = raise_for_failing_query
+        backend.execute_query_get_data.side_effect = raise_if_failing_query
+        out = StringIO()
+
+        fake_object.print_tree(out)
+
+        self.assertEqual(out.getvalue(), dedent("""\
+            == /some/path ==
+            id: 123
+            path: '/some/path'
+            text: 'Hello'
+
+              == /some/path/Child ==
+              id: 1230
+              index: 0
+              Error: No such object
+
+              == /some/path/Child ==
+              id: 1231
+              index: 1
+
+                == /some/path/Child/Child ==
+                id: 12310
+                index: 0
+
+                == /some/path/Child/Child ==
+                id: 12311
+                index: 1
+            """))
+
+    def test_print_tree_unknown_format(self):
+        fake_object, _ = self._print_test_fake_object()
+        self.assertThat(
+            lambda: fake_object.print_tree(StringIO(), format='xml'),
+            raises(ValueError)
+        )
+        self.assertFalse(fake_object._backend.execute_queries_get_data.called)
 
 
 class GetTypeNameTests(TestCase):
@@ -226,6 +226,116 @@ class MakeIntrospectionObjectTests(TestCase):
         self.assertThat(result.__name__, Equals(token))
 
 
+class ProxyClassResolutionCacheTests(TestCase):
+
+    class DefaultSelector(CustomEmulatorBase):
+        pass
+
+    class AlwaysSelected(CustomEmulatorBase):
+        @classmethod
+        def validate_dbus_object(cls, path, state):
+            return True
+
+    def test_default_validation_classes_are_not_asked_to_validate(self):
+        proxy_class_dict = {'DefaultSelector': self.DefaultSelector}
+        fake_id = self.getUniqueInteger()
+        with object_registry.patch_registry({fake_id: proxy_class_dict}):
+            # patching the method means the class no longer uses the default
+            # validation, so build the index beforehand:
+            object_registry._get_proxy_class_index(fake_id)
+            with patch.object(
+                self.DefaultSelector,
+                'validate_dbus_object',
+                side_effect=AssertionError("Must not be called.")
+            ):
+                class_type = object_registry._try_custom_proxy_classes(
+                    fake_id,
+                    '/path/to/DefaultSelector',
+                    {}
+                )
+        self.assertThat(class_type, Equals(self.DefaultSelector))
+
+    def test_overridden_validation_classes_are_asked_to_validate(self):
+        proxy_class_dict = {'AlwaysSelected': self.AlwaysSelected}
+        fake_id = self.getUniqueInteger()
+        with object_registry.patch_registry({fake_id: proxy_class_dict}):
+            class_type = object_registry._try_custom_proxy_classes(
+                fake_id,
+                '/path/to/SomethingElse',
+                {}
+            )
+        self.assertThat(class_type, Equals(self.AlwaysSelected))
+
+    def test_index_is_rebuilt_when_registry_is_patched(self):
+        fake_id = self.getUniqueInteger()
+        with object_registry.patch_registry({fake_id: {}}):
+            object_registry._get_proxy_class_index(fake_id)
+        proxy_class_dict = {'DefaultSelector': self.DefaultSelector}
+        with object_registry.patch_registry({fake_id: proxy_class_dict}):
+            class_type = object_registry._try_custom_proxy_classes(
+                fake_id,
+                '/path/to/DefaultSelector',
+                {}
+            )
+        self.assertThat(class_type, Equals(self.DefaultSelector))
+
+    def test_index_is_rebuilt_when_new_class_is_registered(self):
+        class EmulatorBase(CustomEmulatorBase):
+            pass
+
+        object_registry._get_proxy_class_index(EmulatorBase._id)
+
+        class NewlyRegistered(EmulatorBase):
+            pass
+
+        class_type = object_registry._try_custom_proxy_classes(
+            EmulatorBase._id,
+            '/path/to/NewlyRegistered',
+            {}
+        )
+        self.assertThat(class_type, Equals(NewlyRegistered))
+
+    @patch.dict(object_registry._mixed_bases, clear=True)
+    def test_mixed_bases_are_computed_once(self):
+        proxy_class_dict = {'DefaultSelector': self.DefaultSelector}
+        fake_id = self.getUniqueInteger()
+        with object_registry.patch_registry({fake_id: proxy_class_dict}):
+            with patch.object(
+                object_registry,
+                '_combine_base_and_extensions',
+                wraps=object_registry._combine_base_and_extensions
+            ) as combine:
+                for i in range(3):
+                    object_registry._try_custom_proxy_classes(
+                        fake_id,
+                        '/path/to/DefaultSelector',
+                        {}
+                    )
+        self.assertThat(combine.call_count, Equals(1))
+
+    def test_default_proxy_class_is_reused(self):
+        token = self.getUniqueString()
+        first = object_registry._get_default_proxy_class(
+            self.DefaultSelector,
+            token
+        )
+        second = object_registry._get_default_proxy_class(
+            self.DefaultSelector,
+            token.encode('utf-8')
+        )
+        self.assertIs(first, second)
+
+    @patch('autopilot.introspection._object_registry.get_debug_logger')
+    def test_default_proxy_class_logs_only_when_generated(self, gdl):
+        token = self.getUniqueString()
+        for i in range(3):
+            object_registry._get_default_proxy_class(
+                self.DefaultSelector,
+                token
+            )
+        gdl.assert_called_once_with()
+
+
 class ObjectRegistryPatchTests(TestCase):
 
     def test_patch_registry_sets_new_registry(self):
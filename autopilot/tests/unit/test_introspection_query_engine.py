@@ -0,0 +1,200 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from testscenarios import TestWithScenarios, multiply_scenarios
+from testtools import TestCase
+from testtools.matchers import Equals, GreaterThan, Not, raises
+
+from autopilot.exceptions import InvalidXPathQuery
+from autopilot.introspection import (
+    _query_engine as query_engine,
+    _xpathselect as xpathselect,
+)
+
+
+def get_tree():
+    Node = query_engine.Node
+    return Node('App', dict(id=[0, 1]), [
+        Node('Window', dict(id=[0, 2], title=[0, 'Main']), [
+            Node('Label', dict(
+                id=[0, 3],
+                text=[0, 'Say "hi", please'],
+                globalRect=[1, 0, 0, 10, 20],
+                opacity=[0, 0.5],
+            )),
+            Node('Button', dict(
+                id=[0, 4],
+                text=[0, 'OK'],
+                enabled=[0, True],
+                objectName=[0, 'ok'],
+                **{'icon-name': [0, 'ok']}
+            )),
+        ]),
+        Node('Window', dict(id=[0, 5], title=[0, 'Other'])),
+    ])
+
+
+def get_ids(query, indexed=False):
+    tree = get_tree()
+    index = query_engine.TreeIndex(tree) if indexed else None
+    return [state['id'][1] for _, state in query_engine.execute_query(
+        tree,
+        query,
+        index
+    )]
+
+
+class QueryEngineTests(TestWithScenarios, TestCase):
+
+    query_scenarios = [
+        ('pseudo root', dict(query=b'/', ids=[1])),
+        ('root', dict(query=b'/App', ids=[1])),
+        ('wrong root', dict(query=b'/Foo', ids=[])),
+        ('child', dict(query=b'/App/Window', ids=[2, 5])),
+        ('descendant', dict(query=b'//Label', ids=[3])),
+        ('wildcard', dict(query=b'/App/Window/*', ids=[3, 4])),
+        ('parent', dict(query=b'/App/Window/Label/..', ids=[2])),
+        ('root parent', dict(query=b'/App/..', ids=[1])),
+        ('id', dict(query=b'/App/Window[id=5]', ids=[5])),
+        ('string', dict(query=b'//Window[title="Main"]', ids=[2])),
+        ('bool', dict(query=b'//*[enabled=True]', ids=[4])),
+        ('float', dict(query=b'//*[opacity=0.5]', ids=[3])),
+        ('compound', dict(query=b'//*[globalRect=[0,0,10,20]]', ids=[3])),
+        ('not equal', dict(query=b'/App/*[id!=2]', ids=[5])),
+        ('range', dict(query=b'//*[id>2,id<5]', ids=[3, 4])),
+        ('translated key', dict(query=b'//*[icon_name="ok"]', ids=[4])),
+        ('escaped quote', dict(query=br'//*[text="Say \"hi\", please"]',
+                               ids=[3])),
+        ('hex escape', dict(query=br'//*[title="\x4dain"]', ids=[2])),
+        ('missing attribute', dict(query=b'//*[visible=True]', ids=[])),
+        ('type mismatch', dict(query=b'//*[title>1]', ids=[])),
+        ('str query', dict(query='//Button', ids=[4])),
+        ('object name', dict(query=b'//*[objectName="ok"]', ids=[4])),
+        ('id under wrong parent', dict(query=b'/App/Window[id=5]/*[id=3]',
+                                       ids=[])),
+        ('descendant id', dict(query=b'/App//*[id=4]', ids=[4])),
+    ]
+
+    scenarios = multiply_scenarios(query_scenarios, [
+        ('walk', dict(indexed=False)),
+        ('indexed', dict(indexed=True)),
+    ])
+
+    def test_execute_query(self):
+        self.assertThat(get_ids(self.query, self.indexed), Equals(self.ids))
+
+
+class QueryEngineErrorTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ('no leading slash', dict(query=b'App')),
+        ('unterminated filter', dict(query=b'/App[id=1')),
+        ('unterminated string', dict(query=b'/App[title="foo]')),
+        ('bad value', dict(query=b'/App[id=one]')),
+        ('missing name', dict(query=b'/App//')),
+    ]
+
+    def test_raises_invalid_query(self):
+        self.assertThat(
+            lambda: get_ids(self.query),
+            raises(InvalidXPathQuery)
+        )
+
+
+class QueryEngineClientQueryTests(TestCase):
+
+    """Queries built by the autopilot client must be understood."""
+
+    def get_window(self):
+        return xpathselect.Query.root('App').select_child('Window', dict(id=2))
+
+    def test_select_descendant(self):
+        query = self.get_window().select_descendant('Button', dict(text='OK'))
+        self.assertThat(get_ids(query.server_query_bytes()), Equals([4]))
+
+    def test_select_parent(self):
+        query = xpathselect.Query.root('App').select_descendant(
+            'Label',
+            dict(id=3)
+        ).select_parent()
+        self.assertThat(get_ids(query.server_query_bytes()), Equals([2]))
+
+    def test_extended_filters(self):
+        query = self.get_window().select_child(
+            '*',
+            dict(id=GreaterThan(2), text=Not(Equals('OK')))
+        )
+        self.assertThat(get_ids(query.server_query_bytes(True)), Equals([3]))
+
+
+class NodeTests(TestCase):
+
+    def test_requires_id(self):
+        self.assertThat(
+            lambda: query_engine.Node('App', {}),
+            raises(ValueError)
+        )
+
+    def test_path(self):
+        tree = get_tree()
+        label = tree.children[0].children[0]
+        self.assertThat(label.path, Equals('/App/Window/Label'))
+
+    def test_remove_child(self):
+        tree = get_tree()
+        window = tree.children[0]
+        tree.remove_child(window)
+
+        self.assertThat(window.parent, Equals(None))
+        self.assertThat(window.path, Equals('/Window'))
+        self.assertThat(
+            [n.id for n in tree.iter_descendants()],
+            Equals([5])
+        )
+
+
+class NodeDictTests(TestCase):
+
+    def test_round_trip(self):
+        tree = query_engine.Node.from_dict(get_tree().to_dict())
+        self.assertThat(
+            [n.path for n in tree.iter_descendants()],
+            Equals([
+                '/App/Window',
+                '/App/Window/Label',
+                '/App/Window/Button',
+                '/App/Window',
+            ])
+        )
+        self.assertThat(
+            tree.children[0].children[1].state['text'],
+            Equals([0, 'OK'])
+        )
+
+    def test_children_are_optional(self):
+        tree = query_engine.Node.from_dict(dict(name='App', state=dict(
+            id=[0, 1]
+        )))
+        self.assertThat(tree.children, Equals([]))
+
+    def test_missing_state_raises(self):
+        self.assertThat(
+            lambda: query_engine.Node.from_dict(dict(name='App')),
+            raises(ValueError)
+        )
@@ -0,0 +1,53 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from unittest.mock import Mock, patch
+
+from testtools import TestCase
+
+from autopilot.introspection import _query_engine
+from autopilot.introspection._reference_server import ReferenceServer
+
+
+class ReferenceServerSubscriptionTests(TestCase):
+
+    def make_server(self):
+        Node = _query_engine.Node
+        root = Node('App', dict(id=[0, 1]), [
+            Node('Icon', {'id': [0, 2], 'icon-type': [0, 'small']}),
+        ])
+        return ReferenceServer(Mock(), root, '1.7')
+
+    def test_hyphenated_property_changes_are_notified(self):
+        server = self.make_server()
+        subscription_id = server.Subscribe('//Icon', ['icon_type'])
+
+        with patch.object(server, 'StateChanged') as state_changed:
+            server.SetProperty(2, 'icon-type', [0, 'large'], 0)
+
+        state_changed.assert_called_once_with(subscription_id)
+
+    def test_other_property_changes_are_not_notified(self):
+        server = self.make_server()
+        server.Subscribe('//Icon', ['icon_type'])
+
+        with patch.object(server, 'StateChanged') as state_changed:
+            server.SetProperty(2, 'visible', [0, True], 0)
+
+        self.assertFalse(state_changed.called)
@@ -18,6 +18,7 @@
 #
 
 from dbus import DBusException
+import gc
 import os
 from unittest.mock import call, patch, Mock
 from testtools import TestCase
@@ -31,9 +32,11 @@ from testtools.matchers import (
     raises,
 )
 
+from autopilot import _timeout
 from autopilot.exceptions import ProcessSearchError
+from autopilot.globals import get_poll_interval, set_poll_interval
 from autopilot.utilities import sleep
-from autopilot.introspection import _search as _s
+from autopilot.introspection import _object_registry, _search as _s
 
 from autopilot.introspection import CustomEmulatorBase
 from autopilot.introspection.constants import AUTOPILOT_PATH
@@ -209,6 +212,33 @@ class FiltersFromSearchParametersTests(TestCase):
         self.assertThat(search_parameters.get('high', None), Not(Equals(None)))
 
 
+class InterfaceCheckFromSearchParamsTests(TestCase):
+
+    def test_returns_None_without_object_path(self):
+        self.assertIsNone(
+            _s._interface_check_from_search_params(dict(pid=123))
+        )
+
+    def test_returns_object_path(self):
+        object_path, _ = _s._interface_check_from_search_params(
+            dict(object_path='/path')
+        )
+        self.assertThat(object_path, Equals('/path'))
+
+    def test_matcher_runs_only_filters_before_interface_check(self):
+        _, matcher = _s._interface_check_from_search_params(
+            dict(object_path='/path', pid=123, application_name='app')
+        )
+        self.assertThat(
+            matcher.args[0],
+            Equals([
+                _s.ConnectionIsNotOrgFreedesktopDBus,
+                _s.ConnectionIsNotOurConnection,
+                _s.ConnectionHasPid,
+            ])
+        )
+
+
 class MandatoryFiltersTests(TestCase):
 
     def test_returns_list_containing_mandatory_filters(self):
@@ -322,6 +352,223 @@ class ConnectionIsNotOurConnectionTests(TestCase):
         )
 
 
+class ConnectionDetailsCacheTests(TestCase):
+
+    def setUp(self):
+        super(ConnectionDetailsCacheTests, self).setUp()
+        self.bus = Mock()
+        self.cache = _s._cached_connection_details()
+        patcher = patch.object(
+            _s,
+            '_get_bus_connections_pid',
+            side_effect=lambda bus, name: len(name)
+        )
+        self.get_bus_pid = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_owner_changed_callback(self):
+        return self.bus.add_signal_receiver.call_args[0][0]
+
+    def use_cache_for_filters(self):
+        patcher = patch.object(_s, '_connection_details', new=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_does_not_cache_outside_caching_block(self):
+        self.cache.get_pid(self.bus, ':1.2')
+        self.cache.get_pid(self.bus, ':1.2')
+
+        self.assertThat(self.get_bus_pid.call_count, Equals(2))
+
+    def test_looks_up_pid_once_while_caching(self):
+        with self.cache.caching(self.bus):
+            self.cache.get_pid(self.bus, ':1.2')
+            pid = self.cache.get_pid(self.bus, ':1.2')
+
+        self.assertThat(pid, Equals(4))
+        self.get_bus_pid.assert_called_once_with(self.bus, ':1.2')
+
+    def test_forgets_pid_when_owner_changes(self):
+        with self.cache.caching(self.bus):
+            self.cache.get_pid(self.bus, 'com.example.App')
+            self.get_owner_changed_callback()(
+                'com.example.App', ':1.2', ':1.3'
+            )
+            self.cache.get_pid(self.bus, 'com.example.App')
+
+        self.assertThat(self.get_bus_pid.call_count, Equals(2))
+
+    def test_stops_watching_owners_after_caching_block(self):
+        with self.cache.caching(self.bus):
+            pass
+
+        self.bus.add_signal_receiver.return_value.remove.\
+            assert_called_once_with()
+
+    @patch.object(_s.backends, '_iterate_main_loop_until')
+    @patch.object(_s.backends, '_dispatch_pending_main_loop_events')
+    @patch.object(_s.dbus, 'Interface')
+    def test_prefetches_uncached_pids_together(self, Interface, *args):
+        def get_pid(name, reply_handler, error_handler):
+            reply_handler(100 + len(name))
+        Interface.return_value.GetConnectionUnixProcessID.side_effect = \
+            get_pid
+
+        with self.cache.caching(self.bus):
+            self.cache.get_pid(self.bus, ':1.2')
+            self.cache.prefetch_pids(self.bus, [':1.2', ':1.34', ':1.567'])
+            pids = [
+                self.cache.get_pid(self.bus, name)
+                for name in (':1.2', ':1.34', ':1.567')
+            ]
+
+        self.assertThat(pids, Equals([4, 105, 106]))
+        self.assertThat(
+            Interface.return_value.GetConnectionUnixProcessID.call_count,
+            Equals(2)
+        )
+        self.get_bus_pid.assert_called_once_with(self.bus, ':1.2')
+
+    @patch.object(_s.backends, '_iterate_main_loop_until')
+    @patch.object(_s.dbus, 'Interface')
+    def test_prefetches_interfaces_together(self, Interface, iterate):
+        def get_version(reply_handler, error_handler):
+            name = self.bus.get_object.call_args[0][0]
+            if name == ':1.2':
+                reply_handler('1.7')
+            else:
+                error_handler(DBusException())
+        Interface.return_value.GetVersion.side_effect = get_version
+        iterate.side_effect = lambda predicate: self.assertTrue(predicate())
+        matcher = _s._filter_function_from_search_params(
+            dict(object_path='/path')
+        )
+        self.use_cache_for_filters()
+
+        with self.cache.caching(self.bus):
+            self.cache.add_interface(self.bus, ':1.5', '/path')
+            self.cache.prefetch_interfaces(
+                self.bus,
+                [':1.2', ':1.34', ':1.5'],
+                '/path'
+            )
+            self.assertThat(
+                [matcher((self.bus, n)) for n in (':1.2', ':1.34', ':1.5')],
+                Equals([True, False, True])
+            )
+
+        self.assertThat(
+            sorted(args[0] for args, _ in self.bus.get_object.call_args_list),
+            Equals([':1.2', ':1.34'])
+        )
+        self.assertThat(iterate.call_count, Equals(1))
+
+    @patch.object(_s.backends, '_iterate_main_loop_until')
+    @patch.object(_s.dbus, 'Interface')
+    def test_prefetch_skips_connections_with_interface(self, Interface, _):
+        with self.cache.caching(self.bus):
+            self.cache.add_interface(self.bus, ':1.2', '/path')
+            self.cache.prefetch_interfaces(
+                self.bus,
+                [':1.2', ':1.34'],
+                '/path'
+            )
+
+        self.assertFalse(Interface.return_value.GetVersion.called)
+
+    def test_remembers_interfaces_until_owner_changes(self):
+        with self.cache.caching(self.bus):
+            self.cache.add_interface(self.bus, ':1.2', '/path')
+            self.assertTrue(
+                self.cache.has_interface(self.bus, ':1.2', '/path')
+            )
+            self.assertFalse(self.cache.has_interface(self.bus, ':1.2', '/'))
+            self.get_owner_changed_callback()(':1.2', ':1.2', '')
+            self.assertFalse(
+                self.cache.has_interface(self.bus, ':1.2', '/path')
+            )
+
+
+class WaitForNewConnectionTests(TestCase):
+
+    def test_sleeps_outside_caching_block(self):
+        cache = _s._cached_connection_details()
+        with sleep.mocked() as mocked_sleep:
+            waited = cache.wait_for_new_connection(Mock(), 0.5)
+
+        self.assertThat(waited, Equals(0.5))
+        self.assertThat(mocked_sleep.total_time_slept(), Equals(0.5))
+
+    def test_returns_when_connection_appeared(self):
+        bus = Mock()
+        cache = _s._cached_connection_details()
+        with cache.caching(bus):
+            owner_changed = bus.add_signal_receiver.call_args[0][0]
+            owner_changed(':1.5', '', ':1.5')
+            with patch.object(
+                _s.backends,
+                '_iterate_main_loop_until_or_timeout',
+                side_effect=lambda predicate, timeout: 0.0 if predicate()
+                else timeout
+            ):
+                self.assertThat(
+                    cache.wait_for_new_connection(bus, 0.5),
+                    Equals(0.0)
+                )
+                self.assertThat(
+                    cache.wait_for_new_connection(bus, 0.5),
+                    Equals(0.5)
+                )
+
+
+class IntrospectionXmlAndRootDetailsTests(TestCase):
+
+    def get_backend(self):
+        backend = Mock()
+
+        def introspect(reply_handler, error_handler):
+            reply_handler('<xml/>')
+
+        def get_state(query, reply_handler, error_handler):
+            reply_handler([('/Root', {'id': [0, 1]})])
+
+        backend.dbus_introspection_iface.Introspect.side_effect = introspect
+        backend.introspection_iface.GetState.side_effect = get_state
+        return backend
+
+    def test_makes_both_calls_before_waiting(self):
+        backend = self.get_backend()
+        with patch.object(_s.backends, '_iterate_main_loop_until') as wait:
+            wait.side_effect = lambda predicate: self.assertThat(
+                [
+                    backend.dbus_introspection_iface.Introspect.called,
+                    backend.introspection_iface.GetState.called,
+                ],
+                Equals([True, True])
+            )
+            _s._get_introspection_xml_and_root_details(backend)
+
+        self.assertThat(wait.call_count, Equals(1))
+
+    def test_returns_xml_and_root_details(self):
+        self.assertThat(
+            _s._get_introspection_xml_and_root_details(self.get_backend()),
+            Equals(('<xml/>', ('Root', b'/Root', {'id': [0, 1]})))
+        )
+
+    def test_raises_dbus_errors(self):
+        backend = self.get_backend()
+        backend.introspection_iface.GetState.side_effect = \
+            lambda query, reply_handler, error_handler: error_handler(
+                DBusException("No state")
+            )
+        self.assertRaises(
+            DBusException,
+            _s._get_introspection_xml_and_root_details,
+            backend
+        )
+
+
 class ConnectionHasPathWithAPInterfaceTests(TestCase):
 
     """Tests specific to the ConnectionHasPathWithAPInterface filter."""
@@ -790,7 +1037,10 @@ class ProxyObjectTests(TestCase):
 
         connection_matcher.assert_called_with((bus, "conn1"))
 
+    @patch.object(_timeout, '_POLL_INTERVAL_JITTER', 0.0)
     def test_find_matching_connections_attempts_multiple_times(self):
+        self.addCleanup(set_poll_interval, *get_poll_interval())
+        set_poll_interval(1.0, 1.0)
         bus = ProxyObjectTests.FMCTest()
         connection_matcher = Mock(return_value=False)
 
@@ -800,6 +1050,50 @@ class ProxyObjectTests(TestCase):
         connection_matcher.assert_called_with((bus, "conn1"))
         self.assertEqual(connection_matcher.call_count, 11)
 
+    @patch.object(_timeout, '_POLL_INTERVAL_JITTER', 0.0)
+    def test_find_matching_connections_backs_off_between_attempts(self):
+        self.addCleanup(set_poll_interval, *get_poll_interval())
+        set_poll_interval(0.01, 0.5)
+        bus = ProxyObjectTests.FMCTest()
+
+        with sleep.mocked() as mock_sleep:
+            with patch.object(
+                    _s._connection_details,
+                    'wait_for_new_connection',
+                    side_effect=lambda bus, timeout: sleep(timeout)
+            ) as wait:
+                _s._find_matching_connections(bus, Mock(return_value=False))
+
+            intervals = [round(c[0][1], 6) for c in wait.call_args_list]
+            self.assertThat(
+                intervals[:8],
+                Equals([0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.5, 0.5])
+            )
+            self.assertThat(max(intervals), Equals(0.5))
+            self.assertThat(
+                round(mock_sleep.total_time_slept(), 6),
+                Equals(10.0)
+            )
+
+    def test_find_matching_connections_prefetches_checked_interfaces(self):
+        bus = Mock()
+        bus.list_names.return_value = [':1.2', ':1.34']
+        interface_check = ('/path', lambda dbus_tuple: dbus_tuple[1] == ':1.2')
+
+        with patch.object(_s, '_connection_details') as details:
+            with patch.object(_s, '_dedupe_connections_on_pid'):
+                _s._find_matching_connections(
+                    bus,
+                    lambda *args: True,
+                    interface_check=interface_check
+                )
+
+        details.prefetch_interfaces.assert_called_once_with(
+            bus,
+            [':1.2'],
+            '/path'
+        )
+
     def test_find_matching_connections_dedupes_results_on_pid(self):
         bus = ProxyObjectTests.FMCTest()
 
@@ -810,6 +1104,185 @@ class ProxyObjectTests(TestCase):
                 dedupe.assert_called_once_with(["conn1"], bus)
 
 
+class ProxyObjectCacheTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = _s._cached_proxy_objects()
+        self.bus = Mock()
+        self.bus.get_name_owner.return_value = ':1.42'
+        self.bus.name_has_owner.return_value = True
+        pid_patcher = patch.object(
+            _s._connection_details, 'get_pid', return_value=123
+        )
+        self.get_pid = pid_patcher.start()
+        self.addCleanup(pid_patcher.stop)
+        running_patcher = patch.object(
+            _s, '_pid_is_running', return_value=True
+        )
+        self.pid_is_running = running_patcher.start()
+        self.addCleanup(running_patcher.stop)
+
+    def test_get_returns_none_for_unknown_key(self):
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_get_returns_cached_proxy(self):
+        proxy = Mock()
+        self.cache.add('key', proxy, self.bus, 'com.example.Shell')
+
+        self.assertThat(self.cache.get('key'), Equals(proxy))
+
+    def test_add_records_unique_name_and_pid(self):
+        self.cache.add('key', Mock(), self.bus, 'com.example.Shell')
+        self.cache.get('key')
+
+        self.bus.get_name_owner.assert_called_once_with('com.example.Shell')
+        self.get_pid.assert_called_once_with(self.bus, ':1.42')
+        self.bus.name_has_owner.assert_called_once_with(':1.42')
+        self.pid_is_running.assert_called_with(123)
+
+    def test_get_drops_proxy_when_connection_has_gone(self):
+        self.cache.add('key', Mock(), self.bus, 'com.example.Shell')
+        self.bus.name_has_owner.return_value = False
+
+        self.assertIsNone(self.cache.get('key'))
+        self.bus.name_has_owner.return_value = True
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_get_drops_proxy_when_process_has_gone(self):
+        self.cache.add('key', Mock(), self.bus, 'com.example.Shell')
+        self.pid_is_running.return_value = False
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.bus.name_has_owner.called)
+
+    def test_get_drops_proxy_when_bus_raises(self):
+        self.cache.add('key', Mock(), self.bus, 'com.example.Shell')
+        self.bus.name_has_owner.side_effect = DBusException()
+
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_does_nothing_when_owner_not_found(self):
+        self.bus.get_name_owner.side_effect = DBusException()
+        self.cache.add('key', Mock(), self.bus, 'com.example.Shell')
+
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_drops_proxies_for_exited_processes(self):
+        self.cache.add('old', Mock(), self.bus, 'com.example.Shell')
+        self.pid_is_running.return_value = False
+        self.cache.add('new', Mock(), self.bus, 'com.example.Shell')
+
+        self.assertThat(list(self.cache._proxies), Equals(['new']))
+
+    def test_reset_cache_forgets_proxies(self):
+        self.cache.add('key', Mock(), self.bus, 'com.example.Shell')
+        self.cache.reset_cache()
+
+        self.assertIsNone(self.cache.get('key'))
+
+
+class ProxyCacheKeyTests(TestCase):
+
+    def get_key(self, search_params, dbus_string='session', dbus_bus=None,
+                emulator_base=None):
+        return _s._get_proxy_cache_key(
+            dbus_string,
+            dbus_bus or self.bus,
+            search_params,
+            emulator_base
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.bus = Mock()
+
+    def test_same_search_gives_same_key(self):
+        self.assertThat(
+            self.get_key(dict(pid=1, a='b')),
+            Equals(self.get_key(dict(a='b', pid=1)))
+        )
+
+    def test_key_depends_on_bus(self):
+        self.assertThat(
+            self.get_key(dict(pid=1)),
+            Not(Equals(self.get_key(dict(pid=1), dbus_bus=Mock())))
+        )
+
+    def test_custom_bus_key_depends_on_address(self):
+        self.assertThat(
+            self.get_key(dict(pid=1), 'unix:abstract=/tmp/dbus-a', Mock()),
+            Equals(
+                self.get_key(dict(pid=1), 'unix:abstract=/tmp/dbus-a', Mock())
+            )
+        )
+        self.assertThat(
+            self.get_key(dict(pid=1), 'unix:abstract=/tmp/dbus-a'),
+            Not(Equals(
+                self.get_key(dict(pid=1), 'unix:abstract=/tmp/dbus-b')
+            ))
+        )
+
+    def test_key_depends_on_emulator_base(self):
+        self.assertThat(
+            self.get_key(dict(pid=1)),
+            Not(Equals(self.get_key(dict(pid=1), emulator_base=object)))
+        )
+
+    def test_returns_none_for_unhashable_search(self):
+        self.assertIsNone(self.get_key(dict(pid=[1])))
+
+
+class ExistingProcessProxyCacheTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.proxies = _s._cached_proxy_objects()
+        self.make_proxy = Mock(side_effect=lambda address, base: Mock())
+        for name, kwargs in (
+                ('_proxy_objects', dict(new=self.proxies)),
+                ('_get_dbus_bus_from_string', dict()),
+                ('_find_matching_connections',
+                 dict(return_value=['conn1'])),
+                ('_filter_parent_pids_from_children',
+                 dict(side_effect=lambda pid, conns, bus: conns)),
+                ('_get_dbus_address_object', dict()),
+                ('_make_proxy_object', dict(new=self.make_proxy)),
+                ('_connection_details', dict()),
+                ('_pid_is_running', dict(return_value=True)),
+        ):
+            patcher = patch.object(_s, name, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_second_search_returns_cached_proxy(self):
+        first = _s.get_proxy_object_for_existing_process(pid=123)
+        second = _s.get_proxy_object_for_existing_process(pid=123)
+
+        self.assertThat(second, Equals(first))
+        self.assertThat(self.make_proxy.call_count, Equals(1))
+
+    def test_different_search_is_not_cached(self):
+        _s.get_proxy_object_for_existing_process(pid=123)
+        _s.get_proxy_object_for_existing_process(pid=456)
+
+        self.assertThat(self.make_proxy.call_count, Equals(2))
+
+    def test_search_of_different_session_bus_is_not_cached(self):
+        _s.get_proxy_object_for_existing_process(pid=123)
+        _s._get_dbus_bus_from_string.return_value = Mock()
+        _s.get_proxy_object_for_existing_process(pid=123)
+
+        self.assertThat(self.make_proxy.call_count, Equals(2))
+
+    def test_search_with_process_is_not_cached(self):
+        process = Mock(pid=123)
+        _s.get_proxy_object_for_existing_process(process=process)
+        _s.get_proxy_object_for_existing_process(process=process)
+
+        self.assertThat(self.make_proxy.call_count, Equals(2))
+
+
 class ActualBaseClassTests(TestCase):
 
     def test_dont_raise_passed_base_when_is_only_base(self):
@@ -877,7 +1350,7 @@ class ActualBaseClassTests(TestCase):
 
     def test_dont_raise_when_using_default_emulator_base(self):
         # _make_proxy_object potentially creates a default base.
-        DefaultBase = _s._make_default_emulator_base()
+        DefaultBase = _s._make_default_emulator_base(Mock())
         try:
             _s._raise_if_base_class_not_actually_base(DefaultBase)
         except ValueError:
@@ -900,3 +1373,98 @@ class ActualBaseClassTests(TestCase):
                     actual=ActualBase
                 )
             )
+
+
+class ProxyObjectForTreeTests(TestCase):
+
+    def get_tree(self):
+        return dict(
+            name='App',
+            state=dict(id=[0, 1]),
+            children=[
+                dict(name='Window', state=dict(id=[0, 2]), children=[
+                    dict(name='Button', state=dict(id=[0, 3], text=[0, 'OK'])),
+                    dict(name='Button', state=dict(id=[0, 4], text=[0, 'No'])),
+                ]),
+            ],
+        )
+
+    def test_returns_proxy_for_root(self):
+        app = _s.get_proxy_object_for_tree(self.get_tree())
+        self.assertThat(app.id, Equals(1))
+        self.assertThat(app.__class__.__name__, Equals('App'))
+
+    def test_searches_the_tree(self):
+        app = _s.get_proxy_object_for_tree(self.get_tree())
+        button = app.select_single('Button', text='No')
+
+        self.assertThat(button.id, Equals(4))
+        self.assertThat(button.get_parent().id, Equals(2))
+        self.assertThat(len(app.select_many('Button')), Equals(2))
+
+    def test_uses_custom_proxy_classes(self):
+        class MyBase(CustomEmulatorBase):
+            pass
+
+        class Button(MyBase):
+            def is_ok(self):
+                return self.text == 'OK'
+
+        app = _s.get_proxy_object_for_tree(
+            self.get_tree(),
+            emulator_base=MyBase
+        )
+        buttons = app.select_many(Button)
+
+        self.assertThat(
+            [b.is_ok() for b in buttons],
+            Equals([True, False])
+        )
+
+    def test_registry_does_not_grow_across_launches(self):
+        registries = (
+            _object_registry._object_registry,
+            _object_registry._proxy_extensions,
+            _object_registry._mixed_bases,
+            _object_registry._default_proxy_classes,
+        )
+
+        def launch():
+            app = _s.get_proxy_object_for_tree(self.get_tree())
+            app.select_many('Button')
+            gc.collect()
+
+        launch()
+        sizes = [len(r) for r in registries]
+        for i in range(3):
+            launch()
+
+        self.assertThat([len(r) for r in registries], Equals(sizes))
+
+    def test_raises_on_bad_tree(self):
+        self.assertThat(
+            lambda: _s.get_proxy_object_for_tree(dict(name='App')),
+            raises(ValueError)
+        )
+
+
+class ProxyObjectForRecordingTests(TestCase):
+
+    def test_searches_the_recording(self):
+        recording = [
+            dict(time=0.0, duration=0.0, query='/App',
+                 reply=[['/App', dict(id=[0, 1])]]),
+            dict(time=0.1, duration=0.0, query='/App//Button',
+                 reply=[['/App/Button', dict(id=[0, 2], text=[0, 'OK'])]]),
+            dict(time=0.2, duration=0.0, query='/App/Button[id=2]',
+                 reply=[['/App/Button', dict(id=[0, 2], text=[0, 'OK'])]]),
+        ]
+        with patch.object(
+            _s.backends._traffic,
+            'read_recording',
+            return_value=recording
+        ):
+            app = _s.get_proxy_object_for_recording('traffic.json')
+
+        self.assertThat(app.id, Equals(1))
+        self.assertThat(app.select_single('Button').text, Equals('OK'))
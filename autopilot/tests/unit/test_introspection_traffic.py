@@ -0,0 +1,127 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os.path
+from shutil import rmtree
+import tempfile
+
+from testtools import TestCase
+from testtools.matchers import Equals, raises
+
+from autopilot.introspection import _traffic
+
+
+class TrafficRecordingTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(_traffic.stop_recording)
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(rmtree, temp_dir)
+        self.temp_dir = temp_dir
+
+    def record_query(self, filename):
+        _traffic.start_recording(filename)
+        _traffic.get_recorder().record(
+            b'/App[id=1]',
+            [['/App', {'id': [0, 1]}]],
+            _traffic.get_recorder()._started + 0.5,
+            0.25
+        )
+        _traffic.stop_recording()
+
+    def test_not_recording_by_default(self):
+        self.assertThat(_traffic.get_recorder(), Equals(None))
+
+    def test_recorded_queries_can_be_read(self):
+        filename = os.path.join(self.temp_dir, 'traffic.json')
+        self.record_query(filename)
+
+        self.assertThat(
+            _traffic.read_recording(filename),
+            Equals([dict(
+                time=0.5,
+                duration=0.25,
+                query='/App[id=1]',
+                reply=[['/App', {'id': [0, 1]}]],
+            )])
+        )
+
+    def test_records_connection_name(self):
+        filename = os.path.join(self.temp_dir, 'traffic.json')
+        _traffic.start_recording(filename)
+        _traffic.get_recorder().record(
+            b'/App', [], _traffic.get_recorder()._started, 0.0,
+            connection=':1.42'
+        )
+        _traffic.stop_recording()
+
+        [entry] = _traffic.read_recording(filename)
+        self.assertThat(entry['connection'], Equals(':1.42'))
+
+    def test_byte_arrays_can_be_read(self):
+        filename = os.path.join(self.temp_dir, 'traffic.json')
+        _traffic.start_recording(filename)
+        _traffic.get_recorder().record(
+            b'/App',
+            [['/App', {'id': [0, 1], 'data': [0, b'\x00\xff']}]],
+            _traffic.get_recorder()._started,
+            0.0
+        )
+        _traffic.stop_recording()
+
+        [entry] = _traffic.read_recording(filename)
+        self.assertThat(
+            entry['reply'],
+            Equals([['/App', {'id': [0, 1], 'data': [0, b'\x00\xff']}]])
+        )
+
+    def test_gz_recordings_are_compressed(self):
+        filename = os.path.join(self.temp_dir, 'traffic.json.gz')
+        self.record_query(filename)
+
+        with open(filename, 'rb') as f:
+            self.assertThat(f.read(2), Equals(b'\x1f\x8b'))
+        self.assertThat(len(_traffic.read_recording(filename)), Equals(1))
+
+    def test_stop_recording_when_not_recording_does_nothing(self):
+        _traffic.stop_recording()
+
+    def test_reading_other_files_raises(self):
+        filename = os.path.join(self.temp_dir, 'other.json')
+        with open(filename, 'w') as f:
+            f.write('{"foo": 1}\n')
+
+        self.assertThat(
+            lambda: _traffic.read_recording(filename),
+            raises(ValueError)
+        )
+
+    def test_reading_unknown_version_raises(self):
+        filename = os.path.join(self.temp_dir, 'future.json')
+        with open(filename, 'w') as f:
+            f.write(
+                '{"format": "autopilot-introspection-recording", '
+                '"version": 2}\n'
+            )
+
+        self.assertThat(
+            lambda: _traffic.read_recording(filename),
+            raises(ValueError)
+        )
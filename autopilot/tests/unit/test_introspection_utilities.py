@@ -17,6 +17,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from contextlib import contextmanager
+
 from testtools import TestCase
 
 from autopilot.introspection.dbus import raises
@@ -180,3 +182,29 @@ class SortByKeysTests(TestCase):
         obj = [get_mock_object()]
         output = sort_by_keys(obj, ['x'])
         self.assertEqual(output, obj)
+
+    def test_does_not_refresh_proxy_objects(self):
+        class FakeProxy(object):
+            refreshes = 0
+
+            def __init__(self, y):
+                self._y = y
+                self._refreshing = True
+
+            @contextmanager
+            def no_automatic_refreshing(self):
+                self._refreshing = False
+                yield
+                self._refreshing = True
+
+            @property
+            def y(self):
+                if self._refreshing:
+                    FakeProxy.refreshes += 1
+                return self._y
+
+        objects = [FakeProxy(y) for y in Y_COORDS]
+        sorted_objects = sort_by_keys(objects, ['y'])
+
+        self.assertEqual(FakeProxy.refreshes, 0)
+        self.assertEqual([o._y for o in sorted_objects], sorted(Y_COORDS))
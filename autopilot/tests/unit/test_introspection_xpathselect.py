@@ -19,7 +19,15 @@
 
 from testscenarios import TestWithScenarios
 from testtools import TestCase
-from testtools.matchers import raises
+from testtools.matchers import (
+    Contains,
+    Equals,
+    GreaterThan,
+    LessThan,
+    MatchesAll,
+    Not,
+    raises,
+)
 
 from autopilot.introspection import _xpathselect as xpathselect
 from autopilot.exceptions import InvalidXPathQuery
@@ -47,6 +55,10 @@ class XPathSelectQueryTests(TestCase):
         q = xpathselect.Query.root(b'Foo')
         self.assertEqual(b"/Foo", q.server_query_bytes())
 
+    def test_can_create_root_query_with_filters(self):
+        q = xpathselect.Query.root('Foo', dict(id=1))
+        self.assertEqual(b"/Foo[id=1]", q.server_query_bytes())
+
     def test_can_create_app_name_from_ascii_string(self):
         q = xpathselect.Query.root('Foo')
         self.assertEqual(b"/Foo", q.server_query_bytes())
@@ -356,6 +368,99 @@ class ServerSideParamMatchingTests(TestWithScenarios, TestCase):
         )
 
 
+class ExtendedFilterTermsTests(TestWithScenarios, TestCase):
+
+    """Tests for the extended filter grammar."""
+
+    scenarios = [
+        ('bool', dict(k='visible', v=True, r=[b'visible=True'])),
+        ('int', dict(k='size', v=123, r=[b'size=123'])),
+        ('int64', dict(k='size', v=2**40, r=[b'size=1099511627776'])),
+        ('int too big', dict(k='size', v=2**63, r=None)),
+        ('float', dict(k='opacity', v=0.5, r=[b'opacity=0.5'])),
+        ('float nan', dict(k='opacity', v=float('nan'), r=None)),
+        (
+            'unicode string',
+            dict(k='text', v='H\u2026i', r=['text="H\u2026i"'.encode()])
+        ),
+        (
+            'string escapes',
+            dict(k='text', v='a"b\\c', r=[b'text="a\\"b\\\\c"'])
+        ),
+        ('utf-8 bytes', dict(k='text', v='\u2026'.encode(), r=[
+            'text="\u2026"'.encode()
+        ])),
+        ('invalid bytes', dict(k='text', v=b'\xff', r=None)),
+        ('compound', dict(k='globalRect', v=[0, 0, 10, 20], r=[
+            b'globalRect=[0,0,10,20]'
+        ])),
+        ('compound float', dict(k='pos', v=(0.5, 1), r=[b'pos=[0.5,1]'])),
+        ('empty compound', dict(k='pos', v=[], r=None)),
+        ('compound string', dict(k='pos', v=['a'], r=None)),
+        ('greater than', dict(k='x', v=GreaterThan(5), r=[b'x>5'])),
+        ('less than', dict(k='x', v=LessThan(2.5), r=[b'x<2.5'])),
+        ('not equal', dict(k='x', v=Not(Equals('a')), r=[b'x!="a"'])),
+        ('range', dict(
+            k='x',
+            v=MatchesAll(GreaterThan(1), LessThan(10)),
+            r=[b'x>1', b'x<10']
+        )),
+        ('unsupported range', dict(
+            k='x',
+            v=MatchesAll(GreaterThan(1), Contains(10)),
+            r=None
+        )),
+        ('string comparison', dict(k='x', v=GreaterThan('a'), r=None)),
+        ('callable', dict(k='x', v=lambda x: True, r=None)),
+        ('invalid key', dict(k='k  e', v=1, r=None)),
+    ]
+
+    def test_extended_filter_terms(self):
+        self.assertEqual(
+            xpathselect._get_extended_filter_terms(self.k, self.v),
+            self.r
+        )
+
+
+class ExtendedFilterQueryTests(TestCase):
+
+    def get_query(self):
+        filters = dict(name="\u2026", opacity=0.5, label=lambda value: True)
+        return xpathselect.Query.root("Foo") \
+            .select_child("Bar", dict(visible=True)) \
+            .select_descendant("Baz", filters)
+
+    def test_basic_query_bytes_omit_extended_filters(self):
+        self.assertEqual(
+            b'/Foo/Bar[visible=True]//Baz',
+            self.get_query().server_query_bytes()
+        )
+
+    def test_extended_query_bytes_include_extended_filters(self):
+        self.assertEqual(
+            '/Foo/Bar[visible=True]//Baz[name="\u2026",opacity=0.5]'.encode(),
+            self.get_query().server_query_bytes(extended_filters=True)
+        )
+
+    def test_basic_client_side_filters(self):
+        self.assertEqual(
+            ['label', 'name', 'opacity'],
+            sorted(self.get_query().get_client_side_filters())
+        )
+
+    def test_extended_client_side_filters(self):
+        self.assertEqual(
+            ['label'],
+            sorted(self.get_query().get_client_side_filters(True))
+        )
+
+    def test_no_client_side_filtering_needed_with_extended_filters(self):
+        q = xpathselect.Query.root("Foo") \
+            .select_child("Bar", dict(opacity=0.5))
+        self.assertTrue(q.needs_client_side_filtering())
+        self.assertFalse(q.needs_client_side_filtering(True))
+
+
 class GetClassnameFromPathTests(TestCase):
 
     def test_single_element(self):
@@ -20,6 +20,7 @@
 
 from contextlib import contextmanager
 import dbus
+from unittest.mock import MagicMock
 from testscenarios import TestWithScenarios
 from testtools import TestCase
 from testtools.matchers import (
@@ -34,7 +35,7 @@ from testtools.matchers import (
 from autopilot.introspection import backends
 from autopilot.introspection.dbus import DBusIntrospectionObject
 from autopilot.introspection.types import Color, ValueType
-from autopilot.matchers import Eventually
+from autopilot.matchers import Eventually, _get_state_watcher
 from autopilot.utilities import sleep
 
 
@@ -230,3 +231,37 @@ class EventuallyNonScenariodTests(MockedSleepTests):
             '\u963f\u5e03\u4ece'), timeout=.5).match(attr)
         self.assertThat(
             mismatch.describe(), Contains("阿布从11"))
+
+
+class CallableWaitForTests(MockedSleepTests):
+
+    def make_proxy_method(self, results):
+        results = iter(results)
+
+        class FakeProxy(object):
+            _watch_state_changes = MagicMock()
+
+            def get_value(self):
+                return next(results)
+
+        return FakeProxy().get_value
+
+    def test_method_of_proxy_object_watches_the_object(self):
+        get_value = self.make_proxy_method([False, False, True])
+        watch_state_changes = get_value.__self__._watch_state_changes
+        changes = watch_state_changes.return_value.__enter__.return_value
+
+        Eventually(Equals(True)).match(get_value)
+
+        watch_state_changes.assert_called_once_with()
+        self.assertThat(changes.wait.call_count, Equals(1))
+
+    def test_does_not_watch_when_value_already_matches(self):
+        get_value = self.make_proxy_method([True])
+
+        Eventually(Equals(True)).match(get_value)
+
+        self.assertFalse(get_value.__self__._watch_state_changes.called)
+
+    def test_other_callables_are_polled(self):
+        self.assertThat(_get_state_watcher(lambda: True), Is(None))
@@ -0,0 +1,327 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#
+# Autopilot Functional Test Tool
+# Copyright (C) 2026 Canonical
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from argparse import Namespace
+from io import StringIO
+import threading
+from unittest.mock import Mock, patch
+
+from testtools import (
+    StreamSummary,
+    StreamTagger,
+    StreamToExtendedDecorator,
+    TestCase,
+    TextTestResult,
+    ThreadsafeForwardingResult,
+)
+from testtools.matchers import Contains, Equals, Not
+
+from autopilot import _parallel
+
+
+def make_test_classes():
+    # Defined here so the test loader doesn't find and run them.
+    class FirstTests(TestCase):
+
+        def test_one(self):
+            pass
+
+        def test_two(self):
+            pass
+
+        def test_three(self):
+            pass
+
+    class SecondTests(TestCase):
+
+        def test_one(self):
+            pass
+
+    class ScenarioTests(TestCase):
+
+        scenarios = [('one', {}), ('two', {})]
+
+        def test_one(self):
+            pass
+
+    return FirstTests, SecondTests, ScenarioTests
+
+
+def make_tests():
+    FirstTests, SecondTests, ScenarioTests = make_test_classes()
+    return [
+        FirstTests('test_one'),
+        FirstTests('test_two'),
+        FirstTests('test_three'),
+        SecondTests('test_one'),
+        ScenarioTests('test_one'),
+    ]
+
+
+def make_run_args(**kwargs):
+    defaults = dict(
+        debug_profile='normal',
+        failfast=False,
+        parallel=2,
+        random_order=False,
+        record=False,
+        record_directory='',
+        record_introspection=None,
+        record_options='',
+        suite=['example'],
+        test_config='',
+        test_timeout=0,
+        timeout_profile='normal',
+        verbose=False,
+    )
+    defaults.update(kwargs)
+    return Namespace(**defaults)
+
+
+class PartitionTestsTests(TestCase):
+
+    def test_single_shard_has_every_test_in_order(self):
+        tests = make_tests()
+        self.assertThat(
+            _parallel.partition_tests(tests, 1),
+            Equals([[t.id() for t in tests]])
+        )
+
+    def test_keeps_tests_from_one_class_together(self):
+        tests = make_tests()
+        shards = _parallel.partition_tests(tests, 2)
+
+        self.assertThat(
+            shards,
+            Equals([
+                [t.id() for t in tests[:3]],
+                [t.id() for t in tests[3:]],
+            ])
+        )
+
+    def test_counts_scenarios_when_balancing(self):
+        FirstTests, SecondTests, ScenarioTests = make_test_classes()
+        tests = [
+            ScenarioTests('test_one'),
+            SecondTests('test_one'),
+            FirstTests('test_one'),
+        ]
+        shards = _parallel.partition_tests(tests, 2)
+
+        self.assertThat(
+            shards,
+            Equals([
+                [tests[0].id()],
+                [tests[1].id(), tests[2].id()],
+            ])
+        )
+
+    def test_makes_no_more_shards_than_test_classes(self):
+        shards = _parallel.partition_tests(make_tests(), 10)
+
+        self.assertThat(len(shards), Equals(3))
+
+    def test_returns_no_shards_for_no_tests(self):
+        self.assertThat(_parallel.partition_tests([], 4), Equals([]))
+
+
+class WorkerCommandTests(TestCase):
+
+    def get_command(self, **kwargs):
+        return _parallel._get_worker_command(
+            make_run_args(**kwargs),
+            2,
+            '/tmp/worker-2.list'
+        )
+
+    def test_runs_worker_in_own_dbus_session(self):
+        command = self.get_command()
+
+        self.assertThat(command[:2], Equals(['dbus-run-session', '--']))
+
+    def test_worker_reports_subunit_for_listed_tests(self):
+        command = self.get_command()
+
+        self.assertThat(
+            command[command.index('--format') + 1], Equals('subunit')
+        )
+        self.assertThat(
+            command[command.index('--load-list') + 1],
+            Equals('/tmp/worker-2.list')
+        )
+
+    def test_suites_are_passed_last(self):
+        self.assertThat(self.get_command()[-1], Equals('example'))
+
+    def test_passes_options_to_worker(self):
+        command = self.get_command(
+            failfast=True,
+            random_order=True,
+            verbose=2,
+            test_config='foo=bar',
+        )
+
+        self.assertThat(command, Contains('--failfast'))
+        self.assertThat(command, Contains('--random-order'))
+        self.assertThat(command, Contains('-vv'))
+        self.assertThat(
+            command[command.index('--config') + 1], Equals('foo=bar')
+        )
+
+    def test_does_not_pass_unset_options(self):
+        command = self.get_command()
+
+        self.assertThat(command, Not(Contains('--failfast')))
+        self.assertThat(command, Not(Contains('--record-introspection')))
+
+    def test_each_worker_records_introspection_to_own_file(self):
+        command = self.get_command(record_introspection='/tmp/traffic.gz')
+
+        self.assertThat(
+            command[command.index('--record-introspection') + 1],
+            Equals('/tmp/traffic-worker2.gz')
+        )
+
+    def test_worker_recording_path_without_extension(self):
+        self.assertThat(
+            _parallel._get_worker_recording_path('/tmp/traffic', 0),
+            Equals('/tmp/traffic-worker0')
+        )
+
+
+class RunTestSuiteTests(TestCase):
+
+    @patch.object(_parallel.shutil, 'which', new=lambda name: None)
+    @patch.object(_parallel, 'try_import', new=lambda name: Mock())
+    def test_raises_when_xvfb_missing(self):
+        self.assertRaises(
+            RuntimeError,
+            _parallel.run_test_suite,
+            Mock(),
+            Mock(),
+            make_run_args()
+        )
+
+    @patch.object(_parallel, 'try_import', new=lambda name: None)
+    def test_raises_when_subunit_missing(self):
+        self.assertRaises(
+            RuntimeError,
+            _parallel.run_test_suite,
+            Mock(),
+            Mock(),
+            make_run_args()
+        )
+
+
+class WorkerOutputFilterTests(TestCase):
+
+    def test_writes_non_subunit_output(self):
+        output = StringIO()
+        target = Mock()
+        stream = _parallel._WorkerOutputFilter(target, output)
+        stream.status(file_name='stdout', file_bytes=b'Loading tests')
+
+        self.assertThat(output.getvalue(), Equals('Loading tests'))
+        self.assertFalse(target.status.called)
+
+    def test_forwards_test_events(self):
+        target = Mock()
+        stream = _parallel._WorkerOutputFilter(target, StringIO())
+        stream.status(test_id='test', test_status='success')
+
+        target.status.assert_called_once_with(
+            test_id='test',
+            test_status='success',
+            file_name=None,
+            file_bytes=None,
+        )
+
+
+class WorkerResultMergingTests(TestCase):
+
+    def make_worker_stream(self, result, summary):
+        return _parallel._WorkerOutputFilter(
+            StreamTagger(
+                [
+                    StreamToExtendedDecorator(
+                        _parallel._WorkerTestResult(
+                            ThreadsafeForwardingResult(
+                                result,
+                                threading.Semaphore(1)
+                            )
+                        )
+                    ),
+                    summary,
+                ],
+                add=['autopilot-worker-0']
+            ),
+            StringIO()
+        )
+
+    def test_worker_results_are_added_to_run_result(self):
+        result = TextTestResult(StringIO())
+        result.startTestRun()
+        stream = self.make_worker_stream(result, StreamSummary())
+        stream.startTestRun()
+        stream.status(test_id='test.one', test_status='inprogress')
+        stream.status(test_id='test.one', test_status='success')
+        stream.status(test_id='test.two', test_status='inprogress')
+        stream.status(test_id='test.two', test_status='fail')
+        stream.stopTestRun()
+
+        self.assertThat(result.testsRun, Equals(2))
+        self.assertThat(len(result.failures), Equals(1))
+
+    def test_worker_does_not_restart_run_result(self):
+        result = Mock()
+        stream = self.make_worker_stream(result, StreamSummary())
+        stream.startTestRun()
+        stream.stopTestRun()
+
+        self.assertFalse(result.startTestRun.called)
+        self.assertFalse(result.stopTestRun.called)
+
+    def test_test_running_when_worker_exits_is_reported(self):
+        result = TextTestResult(StringIO())
+        result.startTestRun()
+        stream = self.make_worker_stream(result, StreamSummary())
+        stream.startTestRun()
+        stream.status(test_id='test.one', test_status='inprogress')
+        stream.stopTestRun()
+
+        self.assertFalse(result.wasSuccessful())
+
+    def test_unexpected_worker_exit_is_reported(self):
+        result = TextTestResult(StringIO())
+        worker = _parallel._Worker(0, Mock(returncode=1), result, Mock())
+        worker.summary.startTestRun()
+        worker.summary.stopTestRun()
+        worker.report_unexpected_exit(result)
+
+        self.assertThat(len(result.errors), Equals(1))
+
+    def test_worker_exit_after_failing_test_is_not_reported_again(self):
+        result = TextTestResult(StringIO())
+        worker = _parallel._Worker(0, Mock(returncode=1), result, Mock())
+        worker.summary.startTestRun()
+        worker.summary.status(test_id='test.one', test_status='fail')
+        worker.summary.stopTestRun()
+        worker.report_unexpected_exit(result)
+
+        self.assertThat(len(result.errors), Equals(0))
@@ -94,6 +94,51 @@ class RunUtilityFunctionTests(TestCase):
 
         patched_globals.set_test_timeout.assert_called_once_with(42)
 
+    @patch.object(run, '_traffic')
+    def test_introspection_recording_started_when_requested(self, traffic):
+        args = Namespace(record_introspection='/tmp/traffic.json')
+        run._configure_introspection_recording(args)
+
+        traffic.start_recording.assert_called_once_with('/tmp/traffic.json')
+
+    @patch.object(run, '_traffic')
+    def test_introspection_recording_not_started_by_default(self, traffic):
+        args = Namespace(record_introspection=None)
+        run._configure_introspection_recording(args)
+
+        self.assertFalse(traffic.start_recording.called)
+
+    def test_positive_integer_accepts_one(self):
+        self.assertThat(run._positive_integer('1'), Equals(1))
+
+    def test_positive_integer_rejects_zero(self):
+        self.assertRaises(
+            run.ArgumentTypeError,
+            run._positive_integer,
+            '0'
+        )
+
+    def test_parallel_defaults_to_one(self):
+        args = run._parse_arguments(['run', 'foo'])
+
+        self.assertThat(args.parallel, Equals(1))
+        self.assertThat(args.load_list, Equals(None))
+
+    def test_filter_tests_by_id_list_keeps_listed_tests(self):
+        first = Mock()
+        first.id.return_value = 'tests.first'
+        second = Mock()
+        second.id.return_value = 'tests.second'
+        list_file = tempfile.NamedTemporaryFile('w', delete=False)
+        self.addCleanup(os.remove, list_file.name)
+        with list_file:
+            list_file.write('tests.second\n\n')
+
+        with patch.object(run, 'iterate_tests', return_value=[first, second]):
+            filtered = run._filter_tests_by_id_list(Mock(), list_file.name)
+
+        self.assertThat(list(filtered), Equals([second]))
+
     @patch.object(_video, '_have_video_recording_facilities', new=lambda: True)
     def test_correct_video_record_fixture_is_called_with_record_on(self):
         args = Namespace(record_directory='', record=True)
@@ -987,6 +1032,31 @@ class TestProgramTests(TestCase):
             fake_construct.assert_called_once_with(fake_args)
             load_tests.assert_called_once_with(fake_args.suite)
 
+    def test_run_tests_runs_in_parallel_when_requested(self):
+        fake_args = create_default_run_args(parallel=4)
+        program = run.TestProgram(fake_args)
+        mock_test_suite = Mock()
+        mock_test_result = Mock()
+        mock_test_result.wasSuccessful.return_value = True
+        with ExitStack() as stack:
+            load_tests = stack.enter_context(
+                patch.object(run, 'load_test_suite_from_name')
+            )
+            stack.enter_context(patch.object(run, 'construct_test_result'))
+            configure_recording = stack.enter_context(
+                patch.object(run, '_configure_introspection_recording')
+            )
+            run_parallel = stack.enter_context(
+                patch.object(run._parallel, 'run_test_suite')
+            )
+            load_tests.return_value = (mock_test_suite, False)
+            run_parallel.return_value = mock_test_result
+            program.run()
+
+            self.assertThat(run_parallel.call_count, Equals(1))
+            self.assertFalse(mock_test_suite.run.called)
+            self.assertFalse(configure_recording.called)
+
     def test_dont_run_when_zero_tests_loaded(self):
         fake_args = create_default_run_args()
         program = run.TestProgram(fake_args)
@@ -1015,6 +1085,9 @@ def create_default_run_args(**kwargs):
         suite='foo',
         test_config='',
         test_timeout=0,
+        record_introspection=None,
+        parallel=1,
+        load_list=None,
     )
     defaults.update(kwargs)
     return Namespace(**defaults)
@@ -17,11 +17,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 from testtools import TestCase
 from testtools.matchers import raises
 
+from autopilot import _timeout
+from autopilot.globals import get_poll_interval, set_poll_interval
 from autopilot.testcase import (
+    AutopilotTestCase,
     _compare_system_with_process_snapshot,
     _considered_failing_test,
     _get_application_launch_args,
@@ -63,7 +66,10 @@ class ProcessSnapshotTests(TestCase):
     def test_snapshot_does_not_raise_on_closed_old_app(self):
         _compare_system_with_process_snapshot(lambda: [], ['foo'])
 
+    @patch.object(_timeout, '_POLL_INTERVAL_JITTER', 0.0)
     def test_snapshot_exits_after_first_success(self):
+        self.addCleanup(set_poll_interval, *get_poll_interval())
+        set_poll_interval(0.01, 0.5)
         get_snapshot = Mock()
         get_snapshot.side_effect = [['foo'], []]
 
@@ -72,7 +78,7 @@ class ProcessSnapshotTests(TestCase):
                 get_snapshot,
                 []
             )
-            self.assertEqual(1.0, mock_sleep.total_time_slept())
+            self.assertEqual(0.01, mock_sleep.total_time_slept())
 
 
 class AutopilotTestCaseSupportFunctionTests(TestCase):
@@ -137,3 +143,49 @@ class AutopilotGetApplicationLaunchArgsTests(TestCase):
         kwargs = dict(app_type=app_type_value)
         _get_application_launch_args(kwargs)
         self.assertEqual(kwargs, dict())
+
+
+class UseSharedApplicationTests(TestCase):
+
+    def make_shared_application(self, launches):
+        shared = Mock(launch_count=0)
+
+        def get_proxy():
+            shared.launch_count += launches
+            return shared.proxy
+
+        shared.get_proxy.side_effect = get_proxy
+        return shared
+
+    def use_shared_application(self, case, shared):
+        with patch(
+            'autopilot.testcase._get_process_snapshot',
+            return_value=['new']
+        ):
+            return AutopilotTestCase.use_shared_application(case, shared)
+
+    def test_returns_proxy(self):
+        shared = self.make_shared_application(launches=0)
+        case = Mock(_app_snapshot=['old'])
+        self.assertEqual(
+            self.use_shared_application(case, shared),
+            shared.proxy
+        )
+
+    def test_retakes_snapshot_when_application_launched(self):
+        shared = self.make_shared_application(launches=1)
+        case = Mock(_app_snapshot=['old'])
+        self.use_shared_application(case, shared)
+        self.assertEqual(case._app_snapshot, ['new'])
+
+    def test_keeps_snapshot_when_application_reused(self):
+        shared = self.make_shared_application(launches=0)
+        case = Mock(_app_snapshot=['old'])
+        self.use_shared_application(case, shared)
+        self.assertEqual(case._app_snapshot, ['old'])
+
+    def test_does_not_take_snapshot_when_snapshots_disabled(self):
+        shared = self.make_shared_application(launches=1)
+        case = Mock(_app_snapshot=None)
+        self.use_shared_application(case, shared)
+        self.assertIsNone(case._app_snapshot)
@@ -17,16 +17,20 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from unittest.mock import Mock, patch
 from testtools import TestCase
-from testtools.matchers import Equals, GreaterThan
+from testtools.matchers import Equals, GreaterThan, LessThan
 
+from autopilot import _timeout
 from autopilot.globals import (
     get_default_timeout_period,
     get_long_timeout_period,
+    get_poll_interval,
     set_default_timeout_period,
     set_long_timeout_period,
+    set_poll_interval,
 )
-from autopilot._timeout import Timeout
+from autopilot._timeout import Poller, Timeout
 from autopilot.utilities import sleep
 
 
@@ -86,3 +90,58 @@ class TimeoutClassTests(TestCase):
     def test_long_timeout_final_call(self):
         set_long_timeout_period(0.0)
         self.assertThat(len(list(Timeout.long())), Equals(1))
+
+
+class PollerTests(TestCase):
+
+    def setUp(self):
+        super(PollerTests, self).setUp()
+        self.addCleanup(set_poll_interval, *get_poll_interval())
+        set_poll_interval(0.01, 0.5)
+        sleep.enable_mock()
+        self.addCleanup(sleep.disable_mock)
+
+    def get_intervals(self, poller, count):
+        return [round(poller.next_interval(), 6) for _ in range(count)]
+
+    @patch.object(_timeout, '_POLL_INTERVAL_JITTER', 0.0)
+    def test_interval_doubles_up_to_maximum(self):
+        poller = Poller(10)
+        self.assertThat(
+            self.get_intervals(poller, 8),
+            Equals([0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.5, 0.5])
+        )
+
+    def test_interval_is_jittered(self):
+        poller = Poller(10)
+        with patch.object(_timeout.random, 'uniform', return_value=1.1):
+            self.assertThat(self.get_intervals(poller, 1), Equals([0.011]))
+
+    @patch.object(_timeout, '_POLL_INTERVAL_JITTER', 0.0)
+    def test_interval_stops_at_deadline(self):
+        set_poll_interval(1.0, 1.0)
+        poller = Poller(1.5)
+        poller.wait()
+        self.assertThat(poller.next_interval(), Equals(0.5))
+
+    def test_expires_at_deadline(self):
+        poller = Poller(0.5)
+        self.assertFalse(poller.expired)
+        sleep(0.5)
+        self.assertTrue(poller.expired)
+        self.assertThat(poller.time_left, Equals(0.0))
+
+    def test_time_spent_polling_counts_towards_timeout(self):
+        poller = Poller(10)
+        # Something slow, like a DBus call, between waits:
+        sleep(4)
+        poller.wait()
+        self.assertThat(poller.time_left, LessThan(6))
+
+    def test_wait_calls_wait_fn_with_interval(self):
+        poller = Poller(10)
+        wait_fn = Mock()
+        poller.wait(wait_fn)
+
+        interval, = wait_fn.call_args[0]
+        self.assertThat(interval, LessThan(0.02))
@@ -23,7 +23,7 @@ from testtools import TestCase
 from testtools.matchers import Equals, IsInstance, NotEquals, raises
 
 import dbus
-from unittest.mock import patch, Mock
+from unittest.mock import patch, MagicMock, Mock
 
 from autopilot.tests.functional.fixtures import Timezone
 from autopilot.introspection.types import (
@@ -48,6 +48,7 @@ from autopilot.introspection.types import (
     _get_repr_callable_for_value_class,
     _boolean_str,
     _integer_str,
+    _plain_type_classes,
 )
 from autopilot.introspection.dbus import DBusIntrospectionObject
 from autopilot.utilities import compatible_repr
@@ -111,6 +112,98 @@ class PlainTypeTests(TestWithScenarios, TestCase):
             ))
         )
 
+    def test_parent_and_name_are_stored_on_instance(self):
+        parent = object()
+        p = PlainType(self.t(self.v), parent=parent, name='attr')
+
+        self.assertThat(p.parent, Equals(parent))
+        self.assertThat(p.name, Equals('attr'))
+
+
+class PlainPythonValueTests(TestCase):
+
+    def test_can_construct_from_plain_bool(self):
+        p = PlainType(True)
+
+        self.assertThat(p, Equals(True))
+        self.assertThat(repr(p), Equals('True'))
+
+    def test_create_value_instance_with_plain_bool(self):
+        p = create_value_instance([ValueType.PLAIN, False], None, 'enabled')
+
+        self.assertThat(p, Equals(False))
+        self.assertThat(str(p), Equals('False'))
+
+
+class WaitForTests(TestCase):
+
+    def make_value(self, parent):
+        return PlainType(dbus.Int32(1), parent=parent, name='attr')
+
+    def test_does_not_watch_when_value_already_matches(self):
+        parent = Mock()
+        parent._get_new_state.return_value = ('/path', dict(attr=[0, 2]))
+
+        self.make_value(parent).wait_for(2)
+
+        self.assertFalse(parent._watch_state_changes.called)
+
+    def test_watches_until_value_matches(self):
+        parent = MagicMock()
+        parent._get_new_state.side_effect = [
+            ('/path', dict(attr=[0, 1])),
+            ('/path', dict(attr=[0, 1])),
+            ('/path', dict(attr=[0, 2])),
+        ]
+        changes = parent._watch_state_changes.return_value.__enter__.\
+            return_value
+
+        self.make_value(parent).wait_for(2)
+
+        parent._watch_state_changes.assert_called_once_with(
+            properties=['attr']
+        )
+        self.assertThat(changes.wait.call_count, Equals(1))
+
+
+class PlainTypeClassCacheTests(TestCase):
+
+    def test_same_value_class_reuses_plain_type_class(self):
+        first = PlainType(dbus.Int32(1), parent=object(), name='a')
+        second = PlainType(dbus.Int32(2), parent=object(), name='b')
+
+        self.assertThat(type(first), Equals(type(second)))
+
+    def test_instances_of_shared_class_keep_own_parent_and_name(self):
+        parent_one, parent_two = object(), object()
+        first = PlainType(dbus.String('x'), parent=parent_one, name='a')
+        second = PlainType(dbus.String('y'), parent=parent_two, name='b')
+
+        self.assertThat(first.parent, Equals(parent_one))
+        self.assertThat(first.name, Equals('a'))
+        self.assertThat(second.parent, Equals(parent_two))
+        self.assertThat(second.name, Equals('b'))
+
+    def test_decoding_many_properties_creates_no_new_classes(self):
+        values = [dbus.Int32(1), dbus.String('text'), dbus.Boolean(True)]
+        for value in values:
+            PlainType(value)
+        cache_size = len(_plain_type_classes)
+
+        for i in range(1000):
+            create_value_instance(
+                dbus.Array([dbus.Int32(ValueType.PLAIN), values[i % 3]]),
+                object(),
+                'attr%d' % i
+            )
+
+        self.assertThat(len(_plain_type_classes), Equals(cache_size))
+
+    def test_plain_type_of_plain_type_does_not_nest_classes(self):
+        p = PlainType(dbus.Int32(5))
+
+        self.assertThat(type(PlainType(p)), Equals(type(p)))
+
 
 class RectangleTypeTests(TestCase):
 
@@ -896,11 +989,15 @@ class DBusIntrospectionObjectTests(TestCase):
         bad data from the autopilot backend.
 
         """
-        DBusIntrospectionObject(
+        obj = DBusIntrospectionObject(
             dict(foo=[0], id=[0, 42]),
             b'/some/dummy/path',
             Mock()
         )
+        # Values are decoded when they're first read:
+        self.assertFalse(error_logger.called)
+        with obj.no_automatic_refreshing():
+            self.assertFalse(hasattr(obj, 'foo'))
         error_logger.assert_called_once_with(
             "While constructing attribute '%s.%s': %s",
             "ProxyBase",
@@ -90,6 +90,17 @@ class MockableSleepTests(TestCase):
             sleep(0.5)
             self.assertThat(sleep_counter.total_time_slept(), Equals(2.0))
 
+    def test_mocked_clock_advances_by_time_slept(self):
+        with sleep.mocked():
+            start_time = sleep.monotonic()
+            sleep(2.5)
+            self.assertThat(sleep.monotonic() - start_time, Equals(2.5))
+
+    def test_unmocked_clock_is_time_monotonic(self):
+        with patch('autopilot.utilities.time') as patched_time:
+            patched_time.monotonic.return_value = 123.0
+            self.assertThat(sleep.monotonic(), Equals(123.0))
+
     def test_unmocked_sleep_calls_real_time_sleep_function(self):
         with patch('autopilot.utilities.time') as patched_time:
             sleep(1.0)
@@ -430,6 +430,17 @@ class MockableSleep(object):
     def total_time_slept(self):
         return self._mock_count
 
+    def monotonic(self):
+        """Return the value of a monotonic clock, in seconds.
+
+        While sleep is mocked, this is the total time slept, so code that
+        measures elapsed time sees mocked sleeps take as long as they claim.
+
+        """
+        if self._mocked:
+            return self._mock_count
+        return time.monotonic()
+
 
 sleep = MockableSleep()
 